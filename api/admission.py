@@ -0,0 +1,266 @@
+"""Per-user admission control for expensive endpoints"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+import uuid
+import logging
+from functools import wraps
+from typing import Dict
+from flask import jsonify, request, session
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Request refused; the client should retry after ``retry_after`` seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _TokenBucket:
+    __slots__ = ('tokens', 'updated_at')
+
+    def __init__(self, burst: float):
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+
+class AdmissionController:
+    """Token-bucket rate limits, per-user concurrency and weighted fair queuing.
+
+    Each user gets a token bucket (``rate`` per second, up to ``burst``) and
+    at most ``per_user`` requests running at once; ``total`` bounds running
+    requests across users. When slots are taken, waiters are granted in
+    order of their virtual finish time (start-time fair queuing), so a user
+    with many queued requests cannot starve one with a single request.
+    Users idle long enough to have a full bucket and no queue position are
+    forgotten.
+
+    Limits apply per worker process. gunicorn.conf.py only allows several
+    workers behind sticky sessions, so a user's requests all reach one
+    worker and per-user limits hold as configured. ``total`` guards that
+    worker's own pool and threads, so it is per worker by design.
+    """
+
+    def __init__(self, name: str, total: int, per_user: int, rate: float, burst: float,
+                 queue_timeout: float, max_queued_per_user: int):
+        self.name = name
+        self._total = max(total, 1)
+        self._per_user = max(per_user, 1)
+        self._rate = rate
+        self._burst = max(burst, 1)
+        self._queue_timeout = queue_timeout
+        self._max_queued_per_user = max_queued_per_user
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self._running: Dict[str, int] = {}
+        self._queued: Dict[str, int] = {}
+        self._last_finish: Dict[str, float] = {}
+        self._waiters = []  # heap of (finish_tag, seq, user)
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._in_flight = 0
+        self._swept_at = time.monotonic()
+
+    def _take_token(self, user: str):
+        bucket = self._buckets.get(user)
+        if bucket is None:
+            bucket = self._buckets[user] = _TokenBucket(self._burst)
+        now = time.monotonic()
+        bucket.tokens = min(self._burst, bucket.tokens + (now - bucket.updated_at) * self._rate)
+        bucket.updated_at = now
+        if bucket.tokens < 1:
+            raise AdmissionRejected(
+                'Too many requests, please slow down.', (1 - bucket.tokens) / self._rate if self._rate > 0 else 60
+            )
+        bucket.tokens -= 1
+
+    def _sweep(self, now: float):
+        # Caller holds the lock. A refilled bucket behaves exactly like a
+        # missing one; an idle user's finish tag is at most one request ahead
+        # of the virtual clock, so forgetting it costs no real fairness.
+        self._swept_at = now
+        busy = self._running.keys() | self._queued.keys()
+        for user, bucket in list(self._buckets.items()):
+            if user not in busy and bucket.tokens + (now - bucket.updated_at) * self._rate >= self._burst:
+                del self._buckets[user]
+                self._last_finish.pop(user, None)
+        for user, finish in list(self._last_finish.items()):
+            if user not in busy and finish <= self._virtual_time:
+                del self._last_finish[user]
+
+    def _grantable(self, user: str, entry) -> bool:
+        if self._in_flight >= self._total or self._running.get(user, 0) >= self._per_user:
+            return False
+        # Only the earliest-tagged waiter whose user has a free slot goes next
+        for waiter in sorted(self._waiters):
+            if self._running.get(waiter[2], 0) < self._per_user:
+                return waiter is entry
+        return False
+
+    def acquire(self, user: str, weight: float = 1.0):
+        """Block until ``user`` may start a request; raises AdmissionRejected"""
+        with self._cond:
+            now = time.monotonic()
+            if now - self._swept_at >= Config.ADMISSION_IDLE_SWEEP_SECONDS:
+                self._sweep(now)
+            self._take_token(user)
+            if self._queued.get(user, 0) >= self._max_queued_per_user:
+                raise AdmissionRejected('Too many requests waiting, please retry shortly.', 1)
+
+            start = max(self._virtual_time, self._last_finish.get(user, 0.0))
+            self._last_finish[user] = start + 1.0 / max(weight, 1e-6)
+            entry = (self._last_finish[user], next(self._seq), user)
+            heapq.heappush(self._waiters, entry)
+            self._queued[user] = self._queued.get(user, 0) + 1
+
+            deadline = time.monotonic() + self._queue_timeout
+            try:
+                while not self._grantable(user, entry):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise AdmissionRejected('Server is busy, please retry shortly.', max(1, self._queue_timeout / 2))
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._queued[user] -= 1
+                if not self._queued[user]:
+                    del self._queued[user]
+                # Another waiter may have become the head of the queue
+                self._cond.notify_all()
+
+            self._virtual_time = max(self._virtual_time, start)
+            self._in_flight += 1
+            self._running[user] = self._running.get(user, 0) + 1
+
+    def release(self, user: str):
+        with self._cond:
+            self._in_flight -= 1
+            self._running[user] -= 1
+            if not self._running[user]:
+                del self._running[user]
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {'running': self._in_flight, 'queued': len(self._waiters), 'users_running': len(self._running),
+                    'users_tracked': len(self._buckets)}
+
+
+class _ThreadBudget:
+    """Requests each user holds in this process across all controllers.
+
+    Every admitted or queued request occupies a server thread, so a user is
+    refused at once when they already hold their share instead of queueing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._held: Dict[str, int] = {}
+
+    def enter(self, user: str) -> bool:
+        with self._lock:
+            held = self._held.get(user, 0)
+            if held >= Config.ADMISSION_MAX_THREADS_PER_USER:
+                return False
+            self._held[user] = held + 1
+            return True
+
+    def leave(self, user: str):
+        with self._lock:
+            self._held[user] -= 1
+            if not self._held[user]:
+                del self._held[user]
+
+
+_thread_budget = _ThreadBudget()
+
+
+_controllers = {
+    'sql': AdmissionController(
+        'sql', Config.SQL_ADMISSION_TOTAL, Config.SQL_ADMISSION_PER_USER,
+        Config.SQL_ADMISSION_RATE, Config.SQL_ADMISSION_BURST,
+        Config.ADMISSION_QUEUE_TIMEOUT, Config.ADMISSION_MAX_QUEUED_PER_USER
+    ),
+    'llm': AdmissionController(
+        'llm', Config.LLM_ADMISSION_TOTAL, Config.LLM_ADMISSION_PER_USER,
+        Config.LLM_ADMISSION_RATE, Config.LLM_ADMISSION_BURST,
+        Config.ADMISSION_QUEUE_TIMEOUT, Config.ADMISSION_MAX_QUEUED_PER_USER
+    ),
+}
+
+
+def get_admission_stats() -> Dict:
+    return {name: controller.stats() for name, controller in _controllers.items()}
+
+
+def _client_key() -> str:
+    """Who a request is charged to: the signed-in user, else the browser session.
+
+    Anonymous sessions get a random id on their first request, so users
+    sharing a proxy or NAT address are limited separately. That first
+    request, and clients that never send the cookie back, fall back to the
+    remote address.
+    """
+    user = session.get('user')
+    if user:
+        return user
+    client_id = session.get('admission_client')
+    if client_id:
+        return f"session:{client_id}"
+    session['admission_client'] = uuid.uuid4().hex
+    return request.remote_addr or 'anonymous'
+
+
+def _rejected(kind: str, user: str, error: AdmissionRejected):
+    logger.info(f"Rejected {kind} request from {user}: {error}")
+    response = jsonify({'status': 'error', 'message': str(error)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(math.ceil(error.retry_after))
+    return response
+
+
+def admission_controlled(kind: str):
+    """Admit the view through the ``kind`` controller, answering 429 when refused.
+
+    For streamed responses the slot is held until the stream is closed.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not Config.ADMISSION_ENABLED:
+                return f(*args, **kwargs)
+            controller = _controllers[kind]
+            user = _client_key()
+            if not _thread_budget.enter(user):
+                return _rejected(kind, user, AdmissionRejected('Too many requests in progress, please retry shortly.', 1))
+            try:
+                controller.acquire(user)
+            except AdmissionRejected as e:
+                _thread_budget.leave(user)
+                return _rejected(kind, user, e)
+
+            def release():
+                controller.release(user)
+                _thread_budget.leave(user)
+
+            try:
+                response = f(*args, **kwargs)
+            except BaseException:
+                release()
+                raise
+            streamed = getattr(response, 'is_streamed', False)
+            if streamed:
+                response.call_on_close(release)
+            else:
+                release()
+            return response
+        return decorated_function
+    return decorator
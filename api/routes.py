@@ -1,12 +1,16 @@
 # File: api/routes.py
 """API routes for the application"""
 
-from flask import Blueprint, render_template, request, jsonify, session, Response
+from flask import Blueprint, render_template, request, jsonify, session, Response, current_app
 from auth.decorators import login_required
-from database.operations import get_databases, fetch_database_info, execute_sql_query
+from api.admission import admission_controlled
+from database.operations import get_databases, fetch_database_info, execute_sql_query, execute_sql_queries
 from database.connection import update_db_config, get_current_db_name, get_executor
+from database.prefetch import QueryPrefetchService, SqlBlockScanner
+from database.workspace import ResultWorkspace
 from services.gemini_service import GeminiService
 from services.firestore_service import FirestoreService
+from config import Config
 import uuid
 import logging
 
@@ -23,6 +27,7 @@ def index():
     return render_template('index.html')
 
 @api_bp.route('/pass_userinput_to_gemini', methods=['POST'])
+@admission_controlled('llm')
 def pass_userinput_to_gemini():
     data = request.get_json()
     prompt = data['prompt']
@@ -42,12 +47,22 @@ def pass_userinput_to_gemini():
         user_id = session['user']
         FirestoreService.store_conversation(conversation_id, 'user', prompt, user_id)
 
+        # The generator runs after the app context is gone, so bind the encoder now
+        dumps = current_app.json.dumps
+
+        # Called before the Response exists, so failures up to the first chunk
+        # still get the JSON error below instead of a truncated 200
+        responses = GeminiService.send_message(conversation_id, prompt)
+
         def generate():
             full_response_content = []
-            responses = GeminiService.send_message(conversation_id, prompt)
+            sql_blocks = SqlBlockScanner()
             for chunk in responses:
                 text_chunk = chunk.text
                 full_response_content.append(text_chunk)
+                # Start finished SELECT blocks now so "Run" finds their results waiting
+                for sql_query in sql_blocks.feed(text_chunk):
+                    QueryPrefetchService.schedule(sql_query, dumps)
                 yield text_chunk
 
             # Store the complete conversation in Firestore after streaming
@@ -112,7 +127,7 @@ def connect_db():
 
     # If all connection fields present -> treat as server connection request
     if all([host, port, user, password]):
-        return _handle_server_connection(host, port, user, password)
+        return _handle_server_connection(host, port, user, password, data.get('replicas'))
 
     # If only db_name present -> treat as selecting a database on the server
     if db_name:
@@ -123,33 +138,24 @@ def connect_db():
 
 
 def _reset_db_connection_pool(db_connection):
-    """Reset the module-level connection pool and any thread-local connection."""
-    # Reset pool and thread-local connection
-    with db_connection._pool_lock:
-        if db_connection._connection_pool:
-            try:
-                db_connection._connection_pool._remove_connections()
-            except Exception as e:
-                logger.debug('Failed to remove connections from pool: %s', e)
-        db_connection._connection_pool = None
+    """Close the module-level connection pool and release this request's lease."""
+    db_connection.reset_pool()
 
-    if hasattr(db_connection.thread_local, 'connection'):
-        try:
-            db_connection.thread_local.connection.close()
-        except Exception as e:
-            logger.debug('Failed to close thread-local connection: %s', e)
-        try:
-            delattr(db_connection.thread_local, 'connection')
-        except Exception:
-            # ignore if attribute already removed
-            pass
 
+def _refresh_db_status():
+    """Have the status service re-check now so SSE subscribers see the change quickly."""
+    from database.status import DatabaseStatusService
+    DatabaseStatusService.refresh_now()
 
-def _handle_server_connection(host, port, user, password):
-    """Apply new server config, reset state, test connection and return schemas."""
+
+def _handle_server_connection(host, port, user, password, replicas=None):
+    """Apply new server config, reset state, test connection and return schemas.
+
+    ``replicas`` optionally lists read replicas ("host[:port[:weight]]" strings
+    or {host, port, weight} objects); without it MYSQL_REPLICAS applies.
+    """
     from database import connection as db_connection
-    # Clear any cached DB metadata so subsequent get_databases() call returns
-    # fresh results for the newly-configured server.
+    # Clear any cached DB metadata from the previous server selection
     try:
         from database.operations import DatabaseOperations
         DatabaseOperations.clear_cache()
@@ -164,14 +170,21 @@ def _handle_server_connection(host, port, user, password):
         'password': password
     })
 
+    try:
+        db_connection.set_replica_endpoints(replicas)
+    except (TypeError, ValueError) as err:
+        return jsonify({'status': 'error', 'message': f'Invalid replicas: {err}'})
+
     _reset_db_connection_pool(db_connection)
 
     # Test connection and fetch schemas
     try:
         conn = db_connection.get_db_connection()
+        _refresh_db_status()
         if conn.is_connected():
             from database.operations import get_databases as _get_databases
-            dbs_result = _get_databases()
+            # Just connected: list the server's databases as they are now
+            dbs_result = _get_databases(force_refresh=True)
             if dbs_result.get('status') == 'success':
                 return jsonify({'status': 'connected', 'message': 'Connected to database server at {host}:{port}'.format(host=host, port=port), 'schemas': dbs_result['databases']})
             return jsonify({'status': 'connected', 'message': 'Connected, but failed to fetch schemas', 'schemas': []})
@@ -188,6 +201,7 @@ def _handle_db_selection(db_name, conversation_id=None):
     from services.gemini_service import GeminiService
 
     update_db_config(db_name)
+    _refresh_db_status()
     try:
         db_info, detailed_info = fetch_database_info(db_name)
         conversation_id = session.get('conversation_id', conversation_id)
@@ -195,24 +209,41 @@ def _handle_db_selection(db_name, conversation_id=None):
             GeminiService.notify_gemini(conversation_id, db_info)
         if detailed_info and detailed_info.strip():
             GeminiService.notify_gemini(conversation_id, detailed_info)
+        # From here on, DDL changes reach the assistant as deltas
+        from database.schema_watcher import SchemaWatcher
+        SchemaWatcher.watch()
         return jsonify({'status': 'connected', 'message': 'Connected to database {db}'.format(db=db_name)})
     except Exception as err:
         logger.exception('Error while selecting database %s', db_name)
         return jsonify({'status': 'error', 'message': str(err)})
 
 @api_bp.route('/run_sql_query', methods=['POST'])
+@admission_controlled('sql')
 def run_sql_query():
     data = request.get_json()
     sql_query = data['sql_query']
     conversation_id = session.get('conversation_id')
+    db_name = get_current_db_name()
+    
+    prefetched = QueryPrefetchService.take(sql_query)
+    if prefetched is not None:
+        GeminiService.notify_gemini(conversation_id, f'SELECT query executed on {db_name}. Retrieved {prefetched["row_count"]} rows.')
+        if 'payload' in prefetched:
+            return current_app.response_class(prefetched['payload'], mimetype='application/json')
+        result = prefetched['result']
+        result_id = ResultWorkspace.store(_job_owner(), result['result']['fields'], result['result']['rows'])
+        return jsonify({**result, 'workspace_result_id': result_id})
     
     result = execute_sql_query(sql_query)
     
     # Notify Gemini about the query execution
-    db_name = get_current_db_name()
     if result['status'] == 'success':
         if 'result' in result:  # SELECT query
             notify_msg = f'SELECT query executed on {db_name}. Retrieved {result["row_count"]} rows.'
+            if ResultWorkspace.enabled():
+                # Copy: concurrent identical queries share one result dict
+                result_id = ResultWorkspace.store(_job_owner(), result['result']['fields'], result['result']['rows'])
+                result = {**result, 'workspace_result_id': result_id}
         else:  # Other queries
             notify_msg = f'Query executed on {db_name} in table {result.get("table_name", "unknown")}. Affected rows: {result["affected_rows"]}. Query: {sql_query}'
         GeminiService.notify_gemini(conversation_id, notify_msg)
@@ -223,6 +254,212 @@ def run_sql_query():
     return jsonify(result)
 
 
+@api_bp.route('/run_sql_queries', methods=['POST'])
+@admission_controlled('sql')
+def run_sql_queries():
+    """Run several independent SELECTs concurrently.
+
+    Results stream back as newline-delimited JSON in completion order; each
+    line carries the ``index`` of the statement it answers. Unlike
+    ``/run_sql_query``, batch results are not kept in the result workspace
+    and prefetched results are not used.
+    """
+    data = request.get_json() or {}
+    sql_queries = data.get('sql_queries')
+    if not isinstance(sql_queries, list) or not sql_queries:
+        return jsonify({'status': 'error', 'message': 'sql_queries must be a non-empty list.'}), 400
+    if len(sql_queries) > Config.BATCH_QUERY_MAX_STATEMENTS:
+        return jsonify({'status': 'error', 'message': f'At most {Config.BATCH_QUERY_MAX_STATEMENTS} queries are allowed per batch.'}), 400
+    if not all(isinstance(q, str) for q in sql_queries):
+        return jsonify({'status': 'error', 'message': 'Every query must be a string.'}), 400
+
+    conversation_id = session.get('conversation_id')
+    db_name = get_current_db_name()
+    # The generator runs after the app context is gone, so bind the encoder now
+    dumps = current_app.json.dumps
+
+    def generate():
+        succeeded = 0
+        for index, result in execute_sql_queries(sql_queries, Config.BATCH_QUERY_CONCURRENCY):
+            if result['status'] == 'success':
+                succeeded += 1
+            yield dumps({'index': index, **result}) + '\n'
+
+        GeminiService.notify_gemini(
+            conversation_id,
+            f'Batch of {len(sql_queries)} SELECT queries executed on {db_name}: {succeeded} succeeded, {len(sql_queries) - succeeded} failed.'
+        )
+
+    headers = {'Cache-Control': 'no-cache, no-transform', 'X-Accel-Buffering': 'no'}
+    return Response(generate(), mimetype='application/x-ndjson', headers=headers)
+
+
+def _job_owner():
+    """Query jobs belong to the session user (or the client address without one)."""
+    return session.get('user') or request.remote_addr or 'anonymous'
+
+
+@api_bp.route('/query_jobs', methods=['POST'])
+@admission_controlled('sql')
+def submit_query_job():
+    """Start a SELECT in the background; returns the job id to poll, subscribe to or cancel."""
+    from database.jobs import QueryJobService, JobError
+
+    data = request.get_json() or {}
+    sql_query = data.get('sql_query')
+    if not isinstance(sql_query, str) or not sql_query.strip():
+        return jsonify({'status': 'error', 'message': 'sql_query is required.'}), 400
+    try:
+        job = QueryJobService.submit(_job_owner(), sql_query)
+        return jsonify({'status': 'success', 'job': job}), 202
+    except (ValueError, JobError) as err:
+        return jsonify({'status': 'error', 'message': str(err)}), 400
+
+
+@api_bp.route('/query_jobs/<job_id>', methods=['GET'])
+def query_job_status(job_id):
+    from database.jobs import QueryJobService, JobError
+
+    try:
+        return jsonify({'status': 'success', 'job': QueryJobService.status(job_id, _job_owner())})
+    except JobError as err:
+        return jsonify({'status': 'error', 'message': str(err)}), 404
+
+
+@api_bp.route('/query_jobs/<job_id>/rows', methods=['GET'])
+def query_job_rows(job_id):
+    """One page of a finished job's result: ?offset=0&limit=500"""
+    from database.jobs import QueryJobService, JobError
+
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', 500, type=int)
+    try:
+        page = QueryJobService.fetch_page(job_id, _job_owner(), offset, limit)
+        return jsonify({'status': 'success', **page})
+    except JobError as err:
+        return jsonify({'status': 'error', 'message': str(err)}), 409
+
+
+@api_bp.route('/query_jobs/<job_id>/events', methods=['GET'])
+def query_job_events(job_id):
+    """Server-sent progress events until the job finishes."""
+    import json
+    from database.jobs import QueryJobService, JobError, FINISHED
+
+    owner = _job_owner()
+    try:
+        job = QueryJobService.status(job_id, owner)
+    except JobError as err:
+        return jsonify({'status': 'error', 'message': str(err)}), 404
+
+    def generate():
+        current = job
+        yield f"retry: 3000\ndata: {json.dumps(current, default=str)}\n\n"
+        while current['status'] not in FINISHED:
+            try:
+                changed = QueryJobService.wait_for_change(job_id, owner, current['version'], Config.STATUS_STREAM_HEARTBEAT)
+            except JobError:
+                return
+            if changed is None:
+                yield ': keepalive\n\n'
+                continue
+            current = changed
+            yield f"data: {json.dumps(current, default=str)}\n\n"
+
+    headers = {'Cache-Control': 'no-cache, no-transform', 'X-Accel-Buffering': 'no'}
+    return Response(generate(), mimetype='text/event-stream', headers=headers)
+
+
+@api_bp.route('/query_jobs/<job_id>', methods=['DELETE'])
+def cancel_query_job(job_id):
+    """Cancel a queued/running job, or discard a finished one and its result files."""
+    from database.jobs import QueryJobService, JobError
+
+    try:
+        return jsonify({'status': 'success', 'job': QueryJobService.cancel(job_id, _job_owner())})
+    except JobError as err:
+        return jsonify({'status': 'error', 'message': str(err)}), 404
+
+
+@api_bp.route('/workspace/<result_id>/query', methods=['POST'])
+def query_workspace_result(result_id):
+    """Filter, sort, aggregate or pivot a kept result locally instead of re-querying MySQL.
+
+    Body: {"filters": [{"column", "op", "value"}], "sort": [{"column", "desc"}],
+    "group_by": [...], "aggregates": [{"fn", "column", "alias"}],
+    "pivot": {"on", "value", "fn", "rows"}, "limit", "offset"}
+    """
+    from database.workspace import WorkspaceError
+
+    spec = request.get_json() or {}
+    try:
+        return jsonify({'status': 'success', **ResultWorkspace.query(_job_owner(), result_id, spec)})
+    except (WorkspaceError, ValueError, TypeError) as err:
+        return jsonify({'status': 'error', 'message': str(err)}), 400
+    except Exception as err:
+        logger.warning(f"Workspace query on {result_id} failed: {err}")
+        return jsonify({'status': 'error', 'message': str(err)}), 500
+
+
+@api_bp.route('/query_stats', methods=['GET'])
+@login_required
+def query_stats():
+    """Top statements by digest: ?order_by=total_time|mean_time|calls|rows|errors&limit=20&database=x"""
+    from database.query_stats import QueryStatsService
+
+    order_by = request.args.get('order_by', 'total_time')
+    limit = min(request.args.get('limit', 20, type=int), 500)
+    try:
+        stats = QueryStatsService.top(order_by, limit, request.args.get('database'))
+        return jsonify({'status': 'success', **stats})
+    except ValueError as err:
+        return jsonify({'status': 'error', 'message': str(err)}), 400
+
+
+@api_bp.route('/query_stats', methods=['DELETE'])
+@login_required
+def reset_query_stats():
+    """Start statement statistics afresh (the index advisor's workload too)."""
+    from database.query_stats import QueryStatsService
+
+    QueryStatsService.reset()
+    logger.info(f"Statement statistics reset by {session['user']}")
+    return jsonify({'status': 'success'})
+
+
+@api_bp.route('/index_recommendations', methods=['GET'])
+def index_recommendations():
+    """Composite index candidates ranked from the recorded workload: ?database=x&limit=10"""
+    from database.index_advisor import IndexAdvisor
+    from database.operations import DatabaseOperationError
+
+    try:
+        advice = IndexAdvisor.recommend(request.args.get('database'), request.args.get('limit', type=int))
+        return jsonify({'status': 'success', **advice})
+    except ValueError as err:
+        return jsonify({'status': 'error', 'message': str(err)}), 400
+    except DatabaseOperationError as err:
+        return jsonify({'status': 'error', 'message': str(err)}), 500
+
+
+@api_bp.route('/table_row_counts', methods=['GET'])
+def table_row_counts():
+    """Row counts for the selected database, each flagged exact or estimated with its age."""
+    from database.operations import DatabaseOperations, DatabaseOperationError
+
+    db_name = get_current_db_name()
+    if not db_name:
+        return jsonify({'status': 'error', 'message': 'No database selected.'}), 400
+    try:
+        counts = {
+            table: DatabaseOperations.get_table_row_count_info(table, db_name)
+            for table in DatabaseOperations.get_tables(db_name)
+        }
+        return jsonify({'status': 'success', 'database': db_name, 'row_counts': counts})
+    except (ValueError, DatabaseOperationError) as err:
+        return jsonify({'status': 'error', 'message': str(err)}), 500
+
+
 @api_bp.route('/disconnect_db', methods=['POST'])
 def disconnect_db():
     """Disconnect the server-side DB connection pool and thread-local connections."""
@@ -231,6 +468,8 @@ def disconnect_db():
         from database.operations import DatabaseOperations
 
         close_all_connections()
+        _refresh_db_status()
+        ResultWorkspace.drop(_job_owner())
         # Clear any cached DB metadata so UI cannot operate on stale data after disconnect
         try:
             DatabaseOperations.clear_cache()
@@ -248,49 +487,55 @@ def db_status():
 
     This endpoint is intended for UI autodiscovery on page load. It will not
     expose credentials; only high-level connection state and an optional list
-    of user databases (names) when available.
+    of user databases (names) when available. The answer is a snapshot kept
+    by ``DatabaseStatusService``, so polling never reaches MySQL.
     """
     try:
-        from database import connection as db_connection
-        # Quick check: if a connection pool exists and a thread-local connection
-        # is live, we consider the server connected.
-        pool_exists = getattr(db_connection, '_connection_pool', None) is not None
-        thread_conn_alive = False
-        try:
-            if hasattr(db_connection.thread_local, 'connection'):
-                thread_conn_alive = bool(db_connection.thread_local.connection.is_connected())
-        except Exception:
-            thread_conn_alive = False
-
-        connected = pool_exists or thread_conn_alive
-
-        result = {'status': 'ok', 'connected': bool(connected)}
-
-        # If connected, attempt to retrieve the database list (non-fatal)
-        if connected:
-            try:
-                from database.operations import get_databases
-                dbs = get_databases()
-                if isinstance(dbs, dict) and dbs.get('status') == 'success':
-                    result['databases'] = dbs.get('databases', [])
-                else:
-                    result['databases'] = []
-            except Exception as e:
-                logger.debug('db_status: failed to fetch databases: %s', e)
-                result['databases'] = []
-
-        # Provide current selected database name if present (do not expose secrets)
-        try:
-            current_db = db_connection.get_current_db_name()
-            result['current_database'] = current_db
-        except Exception:
-            result['current_database'] = None
-
-        return jsonify(result)
+        from database.status import DatabaseStatusService
+
+        version, snapshot = DatabaseStatusService.get_snapshot()
+        return jsonify({
+            'status': 'ok', 'version': version, **snapshot,
+            # How the page should follow changes: SSE when enabled, otherwise polling
+            'stream': Config.STATUS_STREAM_ENABLED,
+            'poll_interval': Config.STATUS_POLL_INTERVAL,
+        })
     except Exception as e:
         logger.exception('Error while checking DB status')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+
+@api_bp.route('/db_status_stream', methods=['GET'])
+def db_status_stream():
+    """Server-sent events: the current status snapshot, then one event per change.
+
+    Off unless STATUS_STREAM_ENABLED: with threaded workers every open page
+    would hold a thread. The stream ends after STATUS_STREAM_MAX_SECONDS;
+    EventSource reconnects on its own.
+    """
+    import json
+    import time
+    from database.status import DatabaseStatusService
+
+    if not Config.STATUS_STREAM_ENABLED:
+        return jsonify({'status': 'error', 'message': 'Status stream is disabled; poll /db_status.'}), 404
+
+    def generate():
+        version, snapshot = DatabaseStatusService.get_snapshot()
+        yield f"retry: 3000\ndata: {json.dumps({'version': version, **snapshot}, default=str)}\n\n"
+        deadline = time.monotonic() + Config.STATUS_STREAM_MAX_SECONDS
+        while time.monotonic() < deadline:
+            changed = DatabaseStatusService.wait_for_change(version, Config.STATUS_STREAM_HEARTBEAT)
+            if changed is None:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': keepalive\n\n'
+                continue
+            version, snapshot = changed
+            yield f"data: {json.dumps({'version': version, **snapshot}, default=str)}\n\n"
+
+    headers = {'Cache-Control': 'no-cache, no-transform', 'X-Accel-Buffering': 'no'}
+    return Response(generate(), mimetype='text/event-stream', headers=headers)
+
 @api_bp.route('/delete_conversation/<conversation_id>', methods=['DELETE'])
 @login_required
 def delete_conversation(conversation_id):
@@ -1,31 +1,57 @@
 """Main Flask application entry point"""
 
 import logging
+import time
 from flask import Flask
 from config import Config
 from auth.routes import auth_bp
 from api.routes import api_bp
-from services.firestore_service import FirestoreService
+from database.connection import release_db_connection
+
+logger = logging.getLogger(__name__)
 
 def create_app():
-    """Application factory pattern"""
+    """Application factory pattern.
+
+    Gemini, Firestore and MySQL clients are created on first use, so building
+    the app is cheap and safe to do in a pre-fork master (gunicorn preload).
+    """
+    started = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(Config)
     
     # Set up logging
     logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL))
     
-    # Initialize services
-    FirestoreService.initialize()
+    # Fail fast on missing Firebase settings without importing the SDK
+    if Config.FIRESTORE_BACKEND == 'firebase' and not Config.validate_firebase_credentials():
+        raise ValueError("Firebase credentials validation failed")
+    
+    # Return each request's pooled DB connection when its context ends
+    app.teardown_appcontext(release_db_connection)
     
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(api_bp)
     
+    logger.debug(f"Application created in {(time.perf_counter() - started) * 1000:.1f}ms")
     return app
 
+def preload_sdks():
+    """Import the heavy Google SDK modules without creating any clients.
+
+    Meant for a pre-fork master: workers then share the imported modules
+    copy-on-write, while clients and gRPC channels (which are not fork-safe)
+    are still created lazily inside each worker.
+    """
+    if Config.LLM_BACKEND == 'gemini':
+        import google.generativeai  # noqa: F401
+    if Config.FIRESTORE_BACKEND == 'firebase':
+        import firebase_admin  # noqa: F401
+        from firebase_admin import credentials, firestore  # noqa: F401
+
 # Create the app instance
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
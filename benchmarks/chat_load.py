@@ -0,0 +1,230 @@
+"""Offline load generator for the chat streaming path.
+
+Runs the real Flask app against the simulated LLM (``LLM_BACKEND=fake``)
+and the in-memory Firestore emulator (``FIRESTORE_BACKEND=memory``) on a
+local HTTP server with a fixed number of worker threads, then drives N
+simultaneous chats through ``/pass_userinput_to_gemini``. Reports
+time-to-first-byte, stream throughput and worker saturation as JSON::
+
+    python -m benchmarks.chat_load --clients 64 --workers 16 --duration 20
+    python -m benchmarks.chat_load --first-token-ms 800 --tokens-per-sec 30
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+
+def _configure_environment(args):
+    # Must happen before config.py is imported
+    os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret')
+    os.environ['LLM_BACKEND'] = 'fake'
+    os.environ['FIRESTORE_BACKEND'] = 'memory'
+    # Measure the streaming path, not the per-user rate limits
+    os.environ['ADMISSION_ENABLED'] = 'false'
+    os.environ['FAKE_LLM_FIRST_TOKEN_MS'] = str(args.first_token_ms)
+    os.environ['FAKE_LLM_TOKENS_PER_SEC'] = str(args.tokens_per_sec)
+    os.environ['FAKE_LLM_RESPONSE_TOKENS'] = str(args.response_tokens)
+
+
+def _make_server(app, port, workers):
+    from werkzeug.serving import BaseWSGIServer
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """WSGI server that handles requests on a fixed-size thread pool"""
+
+        multithread = True
+
+        def __init__(self):
+            super().__init__('127.0.0.1', port, app)
+            self.workers = workers
+            self.active = 0
+            self.queued = 0
+            self._counter_lock = threading.Lock()
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wsgi-worker')
+
+        def process_request(self, request, client_address):
+            with self._counter_lock:
+                self.queued += 1
+            self._pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            with self._counter_lock:
+                self.queued -= 1
+                self.active += 1
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self._counter_lock:
+                    self.active -= 1
+
+        def server_close(self):
+            super().server_close()
+            self._pool.shutdown(wait=False)
+
+    return PooledWSGIServer()
+
+
+def _open_session(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        body = json.dumps({'user': f'load-{threading.get_ident()}'})
+        conn.request('POST', '/set_session', body=body, headers={'Content-Type': 'application/json'})
+        resp = conn.getresponse()
+        resp.read()
+        cookie = resp.getheader('Set-Cookie', '')
+        return cookie.split(';', 1)[0]
+    finally:
+        conn.close()
+
+
+def _run_chat(port, cookie, prompt):
+    """Send one prompt and time the streamed answer"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    try:
+        body = json.dumps({'prompt': prompt, 'conversation_id': None})
+        start = time.perf_counter()
+        conn.request('POST', '/pass_userinput_to_gemini', body=body,
+                     headers={'Content-Type': 'application/json', 'Cookie': cookie})
+        resp = conn.getresponse()
+        ttfb = None
+        received = 0
+        while True:
+            data = resp.read1(65536)
+            if not data:
+                break
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            received += len(data)
+        total = time.perf_counter() - start
+        return {'ok': resp.status == 200 and received > 0, 'ttfb': ttfb, 'total': total, 'bytes': received}
+    finally:
+        conn.close()
+
+
+def _percentiles(values):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return {}
+    pick = lambda pct: values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+    summary = {f'p{p}_ms': round(pick(p) * 1000, 2) for p in (50, 95, 99)}
+    summary['max_ms'] = round(values[-1] * 1000, 2)
+    return summary
+
+
+def run(args):
+    _configure_environment(args)
+    from app import create_app
+
+    app = create_app()
+    server = _make_server(app, args.port, args.workers)
+    port = server.server_address[1]
+    serve_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    serve_thread.start()
+
+    samples = []
+    stop = threading.Event()
+
+    def sample_workers():
+        while not stop.wait(0.05):
+            samples.append((server.active, server.queued))
+
+    sampler = threading.Thread(target=sample_workers, daemon=True)
+    sampler.start()
+
+    results = []
+    results_lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def client(index):
+        cookie = _open_session(port)
+        n = 0
+        while time.perf_counter() < deadline:
+            outcome = _run_chat(port, cookie, f'client {index} question {n}: show top customers by revenue')
+            with results_lock:
+                results.append(outcome)
+            n += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        for future in [pool.submit(client, i) for i in range(args.clients)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    sampler.join()
+    server.shutdown()
+    server.server_close()
+
+    ok = [r for r in results if r['ok']]
+    streaming = [r['bytes'] / (r['total'] - r['ttfb']) for r in ok if r['ttfb'] is not None and r['total'] > r['ttfb']]
+    busy = [active / args.workers for active, _ in samples]
+    return {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'clients': args.clients,
+            'workers': args.workers,
+            'duration_s': args.duration,
+            'fake_llm': {
+                'first_token_ms': args.first_token_ms,
+                'tokens_per_sec': args.tokens_per_sec,
+                'response_tokens': args.response_tokens,
+            },
+        },
+        'chats': {
+            'completed': len(ok),
+            'failed': len(results) - len(ok),
+            'chats_per_s': round(len(ok) / elapsed, 2) if elapsed else None,
+        },
+        'ttfb': _percentiles([r['ttfb'] for r in ok]),
+        'total_time': _percentiles([r['total'] for r in ok]),
+        'stream_throughput_bytes_per_s': {
+            'mean': round(sum(streaming) / len(streaming), 1) if streaming else None,
+            'min': round(min(streaming), 1) if streaming else None,
+        },
+        'worker_saturation': {
+            'mean_busy_ratio': round(sum(busy) / len(busy), 3) if busy else None,
+            'peak_busy_workers': max((a for a, _ in samples), default=0),
+            'peak_queued_requests': max((q for _, q in samples), default=0),
+            'fully_saturated_ratio': round(sum(1 for b in busy if b >= 1) / len(busy), 3) if busy else None,
+        },
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=32, help='simultaneous chats')
+    parser.add_argument('--workers', type=int, default=16, help='server worker threads')
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--port', type=int, default=0, help='0 picks a free port')
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--tokens-per-sec', type=float, default=50)
+    parser.add_argument('--response-tokens', type=int, default=200)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    report = run(args)
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
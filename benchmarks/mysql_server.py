@@ -0,0 +1,123 @@
+"""Throwaway local MySQL/MariaDB server for benchmarks"""
+
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import logging
+import mysql.connector
+
+logger = logging.getLogger(__name__)
+
+BENCH_USER = 'bench'
+BENCH_PASSWORD = 'bench'
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LocalMySQLServer:
+    """Boot ``mariadbd``/``mysqld`` from PATH into a temporary data directory.
+
+    Use as a context manager; ``connect_kwargs`` holds TCP credentials for a
+    ``bench`` user with full privileges. Set ``BENCH_MYSQL_HOST`` (plus
+    ``BENCH_MYSQL_PORT``/``USER``/``PASSWORD``) to benchmark an existing
+    server instead.
+    """
+
+    def __init__(self, buffer_pool_size: str = '512M'):
+        self.buffer_pool_size = buffer_pool_size
+        self.datadir = None
+        self.process = None
+        self.connect_kwargs = None
+        self._log = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        if os.getenv('BENCH_MYSQL_HOST'):
+            self.connect_kwargs = {
+                'host': os.getenv('BENCH_MYSQL_HOST'),
+                'port': int(os.getenv('BENCH_MYSQL_PORT', 3306)),
+                'user': os.getenv('BENCH_MYSQL_USER', 'root'),
+                'password': os.getenv('BENCH_MYSQL_PASSWORD', ''),
+            }
+            logger.info(f"Using existing server at {self.connect_kwargs['host']}:{self.connect_kwargs['port']}")
+            return
+
+        server = shutil.which('mariadbd') or shutil.which('mysqld')
+        if not server:
+            raise RuntimeError('mariadbd/mysqld not found on PATH; set BENCH_MYSQL_HOST to use an existing server')
+
+        self.datadir = tempfile.mkdtemp(prefix='dbgenie-bench-')
+        data = os.path.join(self.datadir, 'data')
+        sock = os.path.join(self.datadir, 'mysqld.sock')
+        port = _free_port()
+        run_as = ['--user=root'] if hasattr(os, 'geteuid') and os.geteuid() == 0 else []
+
+        install_db = shutil.which('mariadb-install-db') or shutil.which('mysql_install_db')
+        if 'mariadb' in os.path.basename(server) and install_db:
+            init_cmd = [install_db, f'--datadir={data}', '--auth-root-authentication-method=normal',
+                        '--skip-test-db'] + run_as
+        else:
+            init_cmd = [server, '--initialize-insecure', f'--datadir={data}'] + run_as
+        subprocess.run(init_cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        log_path = os.path.join(self.datadir, 'server.log')
+        self._log = open(log_path, 'w')
+        self.process = subprocess.Popen(
+            [server, '--no-defaults', f'--datadir={data}', f'--socket={sock}', f'--port={port}',
+             '--bind-address=127.0.0.1', f'--pid-file={os.path.join(self.datadir, "mysqld.pid")}',
+             f'--innodb-buffer-pool-size={self.buffer_pool_size}', '--skip-log-bin',
+             '--max-connections=1000', '--table-open-cache=20000'] + run_as,
+            stdout=subprocess.DEVNULL, stderr=self._log
+        )
+
+        admin = self._wait_ready(sock)
+        try:
+            cursor = admin.cursor()
+            cursor.execute(f"CREATE USER '{BENCH_USER}'@'%' IDENTIFIED BY '{BENCH_PASSWORD}'")
+            cursor.execute(f"GRANT ALL PRIVILEGES ON *.* TO '{BENCH_USER}'@'%'")
+            cursor.close()
+        finally:
+            admin.close()
+
+        self.connect_kwargs = {'host': '127.0.0.1', 'port': port, 'user': BENCH_USER, 'password': BENCH_PASSWORD}
+        logger.info(f"Local server {os.path.basename(server)} ready on port {port} (log: {log_path})")
+
+    def _wait_ready(self, sock: str, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'Benchmark server exited with code {self.process.returncode}')
+            try:
+                return mysql.connector.connect(unix_socket=sock, user='root', password='', autocommit=True)
+            except mysql.connector.Error:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.25)
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self.datadir:
+            shutil.rmtree(self.datadir, ignore_errors=True)
+            self.datadir = None
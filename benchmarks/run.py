@@ -0,0 +1,404 @@
+"""DB-Genie benchmark harness.
+
+Boots a throwaway MySQL/MariaDB server (or uses ``BENCH_MYSQL_HOST``),
+generates synthetic schemas and measures the database layer with Gemini and
+Firestore replaced by local fakes. Results are written as JSON for
+regression tracking::
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --suites analyze,query --large-rows 100000
+    python -m benchmarks.run --suites drivers --drivers mysql-connector,mysqlclient
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Config refuses to load without a secret key; benchmarks never serve requests
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret')
+# Keep Gemini and Firestore local: simulated LLM, in-memory conversation store
+os.environ['LLM_BACKEND'] = 'fake'
+os.environ['FIRESTORE_BACKEND'] = 'memory'
+# Time the code paths, not the per-user rate limits
+os.environ['ADMISSION_ENABLED'] = 'false'
+os.environ.setdefault('FAKE_LLM_FIRST_TOKEN_MS', '0')
+
+from config import Config
+from database import connection
+from database.operations import fetch_database_info, execute_sql_query
+from database.drivers import DRIVERS, get_driver
+from database.security import DatabaseSecurity
+from benchmarks.mysql_server import LocalMySQLServer
+from benchmarks import schema
+
+logger = logging.getLogger('benchmarks')
+
+ALL_SUITES = ('analyze', 'metadata', 'query', 'pool', 'http', 'drivers')
+
+LARGE_DB = 'bench_large'
+WIDE_DB = 'bench_wide'
+DECODE_DB = 'bench_decode'
+DECODE_WIDE_DB = 'bench_decode_wide'
+
+ANALYZE_CORPUS = (
+    "SELECT * FROM orders WHERE id = 42",
+    "SELECT customer_id, SUM(amount) AS revenue FROM orders GROUP BY customer_id ORDER BY revenue DESC LIMIT 10",
+    "SELECT o.id, c.name FROM orders o JOIN customers c ON c.id = o.customer_id WHERE o.status IN ('open', 'paid')",
+    "DELETE FROM orders WHERE id = 1",
+    "SELECT * FROM users; DROP TABLE users",
+    "SELECT name FROM products WHERE note LIKE '%x%' -- trailing comment",
+)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize(latencies, elapsed, errors=0):
+    latencies = sorted(latencies)
+    to_ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        'operations': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_ops_s': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'mean_ms': to_ms(sum(latencies) / len(latencies)) if latencies else None,
+        'p50_ms': to_ms(_percentile(latencies, 50)),
+        'p95_ms': to_ms(_percentile(latencies, 95)),
+        'p99_ms': to_ms(_percentile(latencies, 99)),
+        'max_ms': to_ms(latencies[-1]) if latencies else None,
+    }
+
+
+def _run_load(operation, concurrency, duration):
+    """Call ``operation()`` from ``concurrency`` threads for ``duration`` seconds.
+
+    ``operation`` returns True on success. Returns (latencies, errors, elapsed).
+    """
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            ok = operation()
+            if ok:
+                local.append(time.perf_counter() - start)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return latencies, errors[0], time.perf_counter() - start
+
+
+def _select_database(server, db_name):
+    connection.db_config.update(server.connect_kwargs)
+    connection.update_db_config(db_name)
+
+
+def bench_analyze(args, server):
+    results = []
+    analyze = DatabaseSecurity.analyze_sql_query
+    count = 0
+    start = time.perf_counter()
+    deadline = start + args.duration
+    while time.perf_counter() < deadline:
+        for query in ANALYZE_CORPUS:
+            analyze(query)
+        count += len(ANALYZE_CORPUS)
+    elapsed = time.perf_counter() - start
+    results.append({
+        'name': 'analyze_sql_query',
+        'params': {'corpus_size': len(ANALYZE_CORPUS)},
+        'operations': count,
+        'elapsed_s': round(elapsed, 3),
+        'ops_per_s': round(count / elapsed, 1),
+    })
+    return results
+
+
+def bench_metadata(args, server):
+    results = []
+    targets = [(f'bench_tables_{n}', n) for n in args.table_counts]
+    for db_name, table_count in targets:
+        if not args.skip_setup:
+            logger.info(f"Creating {table_count} tables in {db_name}")
+            schema.create_many_tables(server.connect_kwargs, db_name, table_count)
+        results.append(_measure_fetch_info(server, db_name, {'tables': table_count}))
+
+    if not args.skip_setup:
+        logger.info(f"Creating wide table with {args.wide_columns} columns")
+        schema.create_wide_table(server.connect_kwargs, WIDE_DB, args.wide_columns)
+    results.append(_measure_fetch_info(server, WIDE_DB, {'tables': 1, 'columns': args.wide_columns}))
+    return results
+
+
+def _measure_fetch_info(server, db_name, params):
+    _select_database(server, db_name)  # also clears metadata caches
+    start = time.perf_counter()
+    db_info, detailed = fetch_database_info(db_name)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    fetch_database_info(db_name)
+    warm = time.perf_counter() - start
+    return {
+        'name': 'fetch_database_info',
+        'params': params,
+        'ok': db_info is not None,
+        'cold_ms': round(cold * 1000, 3),
+        'warm_ms': round(warm * 1000, 3),
+        'schema_text_bytes': len(detailed or ''),
+    }
+
+
+def bench_query(args, server):
+    if not args.skip_setup:
+        logger.info(f"Creating {args.large_rows}-row table")
+        schema.create_large_table(server.connect_kwargs, LARGE_DB, args.large_rows)
+    _select_database(server, LARGE_DB)
+
+    max_id = max(1, args.large_rows)
+    workloads = {
+        'point_lookup': lambda: f"SELECT * FROM big WHERE id = {random.randint(1, max_id)}",
+        'index_range': lambda: (
+            lambda k: f"SELECT k, COUNT(*) FROM big WHERE k BETWEEN {k} AND {k + 50} GROUP BY k"
+        )(random.randint(0, 99_950)),
+        'fetch_500_rows': lambda: f"SELECT * FROM big WHERE id > {random.randint(1, max(1, max_id - 500))} LIMIT 500",
+    }
+
+    results = []
+    for name, make_query in workloads.items():
+        for concurrency in args.concurrency:
+            operation = lambda: execute_sql_query(make_query())['status'] == 'success'
+            latencies, errors, elapsed = _run_load(operation, concurrency, args.duration)
+            results.append({
+                'name': f'execute_sql_query.{name}',
+                'params': {'concurrency': concurrency, 'rows': args.large_rows},
+                **_summarize(latencies, elapsed, errors),
+            })
+    return results
+
+
+def bench_pool(args, server):
+    """Drive more threads than connections and record queueing behaviour"""
+    _select_database(server, None)
+    saved = (Config.DB_POOL_SIZE, Config.DB_POOL_CHECKOUT_TIMEOUT)
+    results = []
+    try:
+        Config.DB_POOL_SIZE = args.pool_size
+        Config.DB_POOL_CHECKOUT_TIMEOUT = args.pool_timeout
+        for concurrency in (args.pool_size, args.pool_size * 4, args.pool_size * 16):
+            connection.reset_pool()
+            peak = {'in_use': 0, 'waiting': 0}
+            stop = threading.Event()
+
+            def sample():
+                while not stop.wait(0.005):
+                    stats = connection.get_pool_stats() or {}
+                    peak['in_use'] = max(peak['in_use'], stats.get('in_use', 0))
+                    peak['waiting'] = max(peak['waiting'], stats.get('waiting', 0))
+
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+            operation = lambda: execute_sql_query("SELECT SLEEP(0.005)")['status'] == 'success'
+            latencies, errors, elapsed = _run_load(operation, concurrency, args.duration)
+            stop.set()
+            sampler.join()
+            results.append({
+                'name': 'pool.saturation',
+                'params': {'pool_size': args.pool_size, 'concurrency': concurrency,
+                           'checkout_timeout_s': args.pool_timeout},
+                'peak_in_use': peak['in_use'],
+                'peak_waiting': peak['waiting'],
+                **_summarize(latencies, elapsed, errors),
+            })
+    finally:
+        Config.DB_POOL_SIZE, Config.DB_POOL_CHECKOUT_TIMEOUT = saved
+        connection.reset_pool()
+    return results
+
+
+def bench_http(args, server):
+    """/run_sql_query through the Flask stack, with fake Gemini/Firestore"""
+    from app import create_app
+
+    app = create_app()
+    _select_database(server, None)
+    results = []
+    for concurrency in args.concurrency:
+        clients = threading.local()
+
+        def operation():
+            client = getattr(clients, 'client', None)
+            if client is None:
+                client = clients.client = app.test_client()
+            resp = client.post('/run_sql_query', json={'sql_query': 'SELECT 1'})
+            return resp.status_code == 200 and resp.get_json()['status'] == 'success'
+
+        latencies, errors, elapsed = _run_load(operation, concurrency, args.duration)
+        results.append({
+            'name': 'http.run_sql_query',
+            'params': {'concurrency': concurrency},
+            **_summarize(latencies, elapsed, errors),
+        })
+    return results
+
+
+def bench_drivers(args, server):
+    """Rows/sec of execute + fetchall for each installed driver, narrow and wide rows"""
+    if not args.skip_setup:
+        logger.info(f"Creating {args.decode_rows}-row decode tables")
+        schema.create_large_table(server.connect_kwargs, DECODE_DB, args.decode_rows)
+        schema.create_wide_table(server.connect_kwargs, DECODE_WIDE_DB, 100, args.decode_rows // 10)
+    tables = {
+        'narrow': (DECODE_DB, 'SELECT * FROM big'),
+        'wide_100_cols': (DECODE_WIDE_DB, 'SELECT * FROM wide'),
+    }
+
+    results = []
+    for name in args.drivers:
+        try:
+            driver = get_driver(name)
+        except RuntimeError as e:
+            logger.warning(f"Skipping driver {name}: {e}")
+            results.append({'name': 'driver.decode', 'params': {'driver': name}, 'skipped': str(e)})
+            continue
+        for shape, (db_name, query) in tables.items():
+            for dictionary in (False, True):
+                conn = driver.connect(dict(server.connect_kwargs, database=db_name, autocommit=True))
+                try:
+                    timings, rows = [], 0
+                    deadline = time.perf_counter() + args.duration
+                    while time.perf_counter() < deadline or not timings:
+                        start = time.perf_counter()
+                        cursor = conn.cursor(dictionary=dictionary, buffered=True)
+                        cursor.execute(query)
+                        rows = len(cursor.fetchall())
+                        cursor.close()
+                        timings.append(time.perf_counter() - start)
+                finally:
+                    conn.close()
+                best = min(timings)
+                results.append({
+                    'name': 'driver.decode',
+                    'params': {'driver': name, 'shape': shape, 'dictionary': dictionary, 'rows': rows},
+                    **driver.describe(),
+                    'runs': len(timings),
+                    'best_ms': round(best * 1000, 3),
+                    'rows_per_s': round(rows / best, 1) if best else None,
+                })
+    return results
+
+
+SUITES = {
+    'analyze': bench_analyze,
+    'metadata': bench_metadata,
+    'query': bench_query,
+    'pool': bench_pool,
+    'http': bench_http,
+    'drivers': bench_drivers,
+}
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def _server_version(server):
+    import mysql.connector
+    conn = mysql.connector.connect(**server.connect_kwargs)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT VERSION()")
+        return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suites', default=','.join(ALL_SUITES),
+                        help=f"comma-separated subset of {', '.join(ALL_SUITES)}")
+    parser.add_argument('--table-counts', type=_int_list, default=[10, 100, 1000, 10000])
+    parser.add_argument('--wide-columns', type=int, default=1000)
+    parser.add_argument('--large-rows', type=int, default=10_000_000)
+    parser.add_argument('--concurrency', type=_int_list, default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per measurement')
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--pool-timeout', type=float, default=2.0)
+    parser.add_argument('--decode-rows', type=int, default=200_000, help='rows fetched per driver decode run')
+    parser.add_argument('--drivers', default=','.join(DRIVERS),
+                        help='comma-separated drivers for the drivers suite (missing ones are skipped)')
+    parser.add_argument('--skip-setup', action='store_true', help='reuse schemas from a previous run')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+    args.suites = [s for s in args.suites.split(',') if s]
+    args.drivers = [d for d in args.drivers.split(',') if d]
+    unknown_drivers = set(args.drivers) - set(DRIVERS)
+    if unknown_drivers:
+        parser.error(f"unknown drivers: {', '.join(sorted(unknown_drivers))}")
+    unknown = set(args.suites) - set(ALL_SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL), stream=sys.stderr)
+
+    report = {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'suites': args.suites,
+        },
+        'results': [],
+    }
+
+    with LocalMySQLServer() as server:
+        report['meta']['server_version'] = _server_version(server)
+        for suite in args.suites:
+            logger.info(f"Running {suite} benchmarks")
+            report['results'].extend(SUITES[suite](args, server))
+        connection.close_all_connections()
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Synthetic schema generators for benchmarks"""
+
+import logging
+import mysql.connector
+
+logger = logging.getLogger(__name__)
+
+_TABLE_COLUMNS = (
+    "id INT PRIMARY KEY AUTO_INCREMENT, customer_id INT NOT NULL, status VARCHAR(16), "
+    "amount DECIMAL(12,2), note VARCHAR(255), created_at DATETIME, updated_at DATETIME, "
+    "KEY idx_customer (customer_id)"
+)
+
+
+def _connect(connect_kwargs, database=None):
+    kwargs = dict(connect_kwargs, autocommit=True)
+    if database:
+        kwargs['database'] = database
+    return mysql.connector.connect(**kwargs)
+
+
+def _recreate_database(cursor, db_name: str):
+    cursor.execute(f"DROP DATABASE IF EXISTS `{db_name}`")
+    cursor.execute(f"CREATE DATABASE `{db_name}` CHARACTER SET utf8mb4")
+
+
+def create_many_tables(connect_kwargs, db_name: str, table_count: int, rows_per_table: int = 10):
+    """Create ``table_count`` identical small tables (``t_00001`` ...)"""
+    conn = _connect(connect_kwargs)
+    try:
+        cursor = conn.cursor()
+        _recreate_database(cursor, db_name)
+        cursor.execute(f"USE `{db_name}`")
+        values = ", ".join(
+            f"({i % 7}, 'open', {i}.50, 'n{i}', NOW(), NOW())" for i in range(rows_per_table)
+        )
+        for i in range(1, table_count + 1):
+            table = f"t_{i:05d}"
+            cursor.execute(f"CREATE TABLE `{table}` ({_TABLE_COLUMNS}) ENGINE=InnoDB")
+            if rows_per_table:
+                cursor.execute(
+                    f"INSERT INTO `{table}` (customer_id, status, amount, note, created_at, updated_at) VALUES {values}"
+                )
+            if i % 1000 == 0:
+                logger.info(f"{db_name}: created {i}/{table_count} tables")
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def create_wide_table(connect_kwargs, db_name: str, column_count: int = 1000, rows: int = 1000):
+    """Create a single table with ``column_count`` INT columns"""
+    conn = _connect(connect_kwargs)
+    try:
+        cursor = conn.cursor()
+        _recreate_database(cursor, db_name)
+        cursor.execute(f"USE `{db_name}`")
+        columns = ", ".join(f"c{i:04d} INT" for i in range(column_count))
+        cursor.execute(f"CREATE TABLE wide (id INT PRIMARY KEY AUTO_INCREMENT, {columns}) ENGINE=InnoDB")
+        names = ", ".join(f"c{i:04d}" for i in range(column_count))
+        row = "(" + ", ".join(str(i) for i in range(column_count)) + ")"
+        batch = 100
+        for start in range(0, rows, batch):
+            count = min(batch, rows - start)
+            cursor.execute(f"INSERT INTO wide ({names}) VALUES " + ", ".join([row] * count))
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def create_large_table(connect_kwargs, db_name: str, rows: int = 10_000_000):
+    """Create ``big`` with ``rows`` rows by repeatedly doubling a seed batch"""
+    conn = _connect(connect_kwargs)
+    try:
+        cursor = conn.cursor()
+        _recreate_database(cursor, db_name)
+        cursor.execute(f"USE `{db_name}`")
+        cursor.execute(
+            "CREATE TABLE big (id BIGINT PRIMARY KEY AUTO_INCREMENT, k INT NOT NULL, v VARCHAR(32), "
+            "created_at DATETIME, KEY idx_k (k)) ENGINE=InnoDB"
+        )
+        seed = min(rows, 1000)
+        cursor.execute(
+            "INSERT INTO big (k, v, created_at) VALUES "
+            + ", ".join(f"({i}, 'v{i}', NOW())" for i in range(seed))
+        )
+        total = seed
+        while total < rows:
+            step = min(total, rows - total)
+            cursor.execute(
+                f"INSERT INTO big (k, v, created_at) SELECT (k * 31 + {total}) % 100000, v, created_at "
+                f"FROM big LIMIT {step}"
+            )
+            total += step
+            logger.info(f"{db_name}.big: {total}/{rows} rows")
+        cursor.execute("ANALYZE TABLE big")
+        cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
@@ -0,0 +1,80 @@
+"""Import-time and boot-cost profile for the application.
+
+Imports ``app`` in a fresh interpreter under ``python -X importtime`` and
+reports the total import time, the slowest modules (cumulative) and the
+resident memory after boot, as JSON::
+
+    python -m benchmarks.startup --top 25
+    python -m benchmarks.startup --preload   # also import the Google SDKs
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+_CHILD = """
+import resource, time
+t = time.perf_counter()
+import app
+{preload}
+boot = time.perf_counter() - t
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print('BOOT', boot, rss)
+"""
+
+
+def _parse_importtime(stderr):
+    """Yield (module, self_us, cumulative_us) from -X importtime output"""
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # column header
+        yield fields[2].strip(), self_us, cumulative_us
+
+
+def profile(top, preload):
+    env = dict(os.environ)
+    env.setdefault('SECRET_KEY', 'startup-profile-only')
+    code = _CHILD.format(preload='app.preload_sdks()' if preload else '')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'Importing app failed:\n{proc.stderr[-4000:]}')
+
+    boot_line = next(line for line in proc.stdout.splitlines() if line.startswith('BOOT '))
+    _, boot_s, maxrss = boot_line.split()
+    modules = list(_parse_importtime(proc.stderr))
+    slowest = sorted(modules, key=lambda m: m[2], reverse=True)[:top]
+    return {
+        'preload_sdks': preload,
+        'boot_ms': round(float(boot_s) * 1000, 1),
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        'max_rss_mb': round(int(maxrss) / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1),
+        'modules_imported': len(modules),
+        'slowest_imports': [
+            {'module': name, 'cumulative_ms': round(cum / 1000, 2), 'self_ms': round(own / 1000, 2)}
+            for name, own, cum in slowest
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--preload', action='store_true', help='include preload_sdks() in the measurement')
+    args = parser.parse_args(argv)
+    print(json.dumps(profile(args.top, args.preload), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,15 @@
 """Application configuration settings"""
 
 import os
+import tempfile
+import logging
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class Config:
     # Secret key - should always be set in environment
     SECRET_KEY = os.getenv('SECRET_KEY')
@@ -25,6 +29,25 @@ class Config:
     # Gemini API Configuration
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     
+    # Backends: 'gemini'/'firebase' in production, 'fake'/'memory' for offline load tests
+    LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini').lower()
+    FIRESTORE_BACKEND = os.getenv('FIRESTORE_BACKEND', 'firebase').lower()
+    
+    # Simulated LLM stream (LLM_BACKEND=fake)
+    FAKE_LLM_FIRST_TOKEN_MS = float(os.getenv('FAKE_LLM_FIRST_TOKEN_MS', 300))
+    FAKE_LLM_TOKENS_PER_SEC = float(os.getenv('FAKE_LLM_TOKENS_PER_SEC', 50))
+    FAKE_LLM_RESPONSE_TOKENS = int(os.getenv('FAKE_LLM_RESPONSE_TOKENS', 200))
+    FAKE_LLM_CHUNK_TOKENS = int(os.getenv('FAKE_LLM_CHUNK_TOKENS', 8))
+    
+    # LLM streaming resilience: jittered exponential backoff, circuit breaker, optional fallback
+    LLM_RETRY_ATTEMPTS = int(os.getenv('LLM_RETRY_ATTEMPTS', 3))  # before the first chunk
+    LLM_RESUME_ATTEMPTS = int(os.getenv('LLM_RESUME_ATTEMPTS', 1))  # after text was streamed
+    LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 0.5))  # seconds
+    LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', 8))  # seconds
+    LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', 5))
+    LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', 30))
+    GEMINI_FALLBACK_MODEL = os.getenv('GEMINI_FALLBACK_MODEL', '')
+    
     # Firebase credentials from environment variables
     @staticmethod
     def get_firebase_credentials():
@@ -79,16 +102,151 @@ class Config:
             if '@' not in credentials['client_email']:
                 raise ValueError("Firebase client_email format is invalid")
                 
-            print("✅ Firebase credentials validation passed")
+            logger.debug("Firebase credentials validation passed")
             return True
             
         except Exception as e:
-            print(f"❌ Firebase credentials validation failed: {e}")
+            logger.error(f"Firebase credentials validation failed: {e}")
             return False
     
     # Thread Pool Configuration
     MAX_WORKERS = int(os.getenv('MAX_WORKERS', 32))
     
+    # Database Connection Pool Configuration
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', min(MAX_WORKERS * 2, 32)))
+    DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', 5))  # seconds to wait for a free connection
+    DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', 1800))  # recycle connections older than this
+    DB_POOL_VALIDATE_INTERVAL = float(os.getenv('DB_POOL_VALIDATE_INTERVAL', 30))  # background idle ping interval
+    # 'request' holds one connection per request; 'multiplex' leases per cursor
+    # so many web threads can share a small pool
+    DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'request').lower()
+    # Client driver: 'mysql-connector' (C extension when installed), 'mysqlclient',
+    # or the asyncio drivers 'asyncmy' / 'aiomysql'
+    DB_DRIVER = os.getenv('DB_DRIVER', 'mysql-connector').lower()
+    
+    # Read replicas: SELECTs and metadata reads go to healthy replicas, else the primary.
+    # MYSQL_REPLICAS is "host[:port[:weight]],..." (same credentials as the primary);
+    # /connect_db may also pass a "replicas" list
+    MYSQL_REPLICAS = os.getenv('MYSQL_REPLICAS', '')
+    REPLICA_ROUTING = os.getenv('REPLICA_ROUTING', 'least_connections').lower()  # or 'weighted'
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 30))
+    REPLICA_HEALTH_INTERVAL = float(os.getenv('REPLICA_HEALTH_INTERVAL', 5))  # seconds
+    REPLICA_POOL_SIZE = int(os.getenv('REPLICA_POOL_SIZE', DB_POOL_SIZE))  # per replica
+    
+    # Batch query execution (/run_sql_queries)
+    BATCH_QUERY_MAX_STATEMENTS = int(os.getenv('BATCH_QUERY_MAX_STATEMENTS', 20))
+    BATCH_QUERY_CONCURRENCY = int(os.getenv('BATCH_QUERY_CONCURRENCY', 4))  # per-batch cap
+    
+    # Per-user admission control for SQL and chat endpoints (429 + Retry-After when refused).
+    # Limits are per worker process; see AdmissionController for multi-worker setups
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 10))  # seconds a request may wait
+    ADMISSION_MAX_QUEUED_PER_USER = int(os.getenv('ADMISSION_MAX_QUEUED_PER_USER', 8))
+    # Requests one user may hold (running or queued, SQL and chat together) in a worker;
+    # keep it below the worker's thread count so others always get a thread
+    ADMISSION_MAX_THREADS_PER_USER = int(os.getenv(
+        'ADMISSION_MAX_THREADS_PER_USER', max(1, int(os.getenv('GUNICORN_THREADS', 8)) // 2)
+    ))
+    ADMISSION_IDLE_SWEEP_SECONDS = float(os.getenv('ADMISSION_IDLE_SWEEP_SECONDS', 60))  # forget idle users
+    SQL_ADMISSION_TOTAL = int(os.getenv('SQL_ADMISSION_TOTAL', DB_POOL_SIZE))
+    SQL_ADMISSION_PER_USER = int(os.getenv('SQL_ADMISSION_PER_USER', 4))
+    SQL_ADMISSION_RATE = float(os.getenv('SQL_ADMISSION_RATE', 5))  # requests per second
+    SQL_ADMISSION_BURST = float(os.getenv('SQL_ADMISSION_BURST', 20))
+    LLM_ADMISSION_TOTAL = int(os.getenv('LLM_ADMISSION_TOTAL', MAX_WORKERS))
+    LLM_ADMISSION_PER_USER = int(os.getenv('LLM_ADMISSION_PER_USER', 2))
+    LLM_ADMISSION_RATE = float(os.getenv('LLM_ADMISSION_RATE', 0.5))  # prompts per second
+    LLM_ADMISSION_BURST = float(os.getenv('LLM_ADMISSION_BURST', 5))
+    
+    # Asynchronous query jobs: results spill to column files and are fetched page by page
+    QUERY_JOB_WORKERS = int(os.getenv('QUERY_JOB_WORKERS', 4))
+    QUERY_JOB_MAX_QUEUED = int(os.getenv('QUERY_JOB_MAX_QUEUED', 32))
+    QUERY_JOB_BATCH_ROWS = int(os.getenv('QUERY_JOB_BATCH_ROWS', 5000))
+    QUERY_JOB_MAX_ROWS = int(os.getenv('QUERY_JOB_MAX_ROWS', 5000000))  # larger results are truncated
+    QUERY_JOB_TIMEOUT_MS = int(os.getenv('QUERY_JOB_TIMEOUT_MS', 1800000))
+    QUERY_JOB_PAGE_MAX = int(os.getenv('QUERY_JOB_PAGE_MAX', 5000))
+    QUERY_JOB_TTL = int(os.getenv('QUERY_JOB_TTL', 3600))  # seconds a finished job is kept
+    QUERY_JOB_SWEEP_INTERVAL = float(os.getenv('QUERY_JOB_SWEEP_INTERVAL', 60))  # seconds between expiry sweeps
+    QUERY_JOB_SPILL_DIR = os.getenv('QUERY_JOB_SPILL_DIR', os.path.join(tempfile.gettempdir(), 'dbgenie-jobs'))
+
+    # Statement digest statistics (/query_stats), aggregated per normalized query and database
+    QUERY_STATS_ENABLED = os.getenv('QUERY_STATS_ENABLED', 'true').lower() == 'true'
+    QUERY_STATS_MAX_DIGESTS = int(os.getenv('QUERY_STATS_MAX_DIGESTS', 5000))  # coldest 5% evicted when full
+    QUERY_STATS_MAX_TEXT = int(os.getenv('QUERY_STATS_MAX_TEXT', 2000))  # characters of normalized text kept
+    
+    # Index advisor: composite index candidates ranked from the recorded workload
+    INDEX_ADVISOR_MAX_CANDIDATES = int(os.getenv('INDEX_ADVISOR_MAX_CANDIDATES', 10))
+    INDEX_ADVISOR_MAX_COLUMNS = int(os.getenv('INDEX_ADVISOR_MAX_COLUMNS', 4))
+    INDEX_ADVISOR_MIN_ROWS = int(os.getenv('INDEX_ADVISOR_MIN_ROWS', 1000))  # smaller tables are skipped
+
+    # Per-session DuckDB workspace for local filter/sort/aggregate/pivot of results (needs duckdb)
+    WORKSPACE_ENABLED = os.getenv('WORKSPACE_ENABLED', 'false').lower() == 'true'
+    WORKSPACE_MEMORY_LIMIT = os.getenv('WORKSPACE_MEMORY_LIMIT', '256MB')  # per session
+    WORKSPACE_THREADS = int(os.getenv('WORKSPACE_THREADS', 2))
+    WORKSPACE_MAX_SESSIONS = int(os.getenv('WORKSPACE_MAX_SESSIONS', 32))  # least recently used evicted
+    WORKSPACE_MAX_RESULTS = int(os.getenv('WORKSPACE_MAX_RESULTS', 5))  # per session
+    WORKSPACE_MAX_ROWS = int(os.getenv('WORKSPACE_MAX_ROWS', 1000000))  # larger results are not kept
+    WORKSPACE_IDLE_TTL = int(os.getenv('WORKSPACE_IDLE_TTL', 1800))  # seconds
+    WORKSPACE_LOAD_WORKERS = int(os.getenv('WORKSPACE_LOAD_WORKERS', 2))
+    WORKSPACE_LOAD_TIMEOUT = float(os.getenv('WORKSPACE_LOAD_TIMEOUT', 30))  # seconds
+    WORKSPACE_MAX_PAGE = int(os.getenv('WORKSPACE_MAX_PAGE', 5000))
+    WORKSPACE_PIVOT_MAX_COLUMNS = int(os.getenv('WORKSPACE_PIVOT_MAX_COLUMNS', 50))
+    
+    # Cache/state backend: 'local' (per-process LRU), 'shared' (SQLite on /dev/shm,
+    # shared by all workers on the host) or 'redis' (any Redis-compatible server)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'local').lower()
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+    CACHE_DEFAULT_TTL = int(os.getenv('CACHE_DEFAULT_TTL', 3600))  # seconds
+    CACHE_SHARED_PATH = os.getenv('CACHE_SHARED_PATH')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CHAT_HISTORY_TTL = int(os.getenv('CHAT_HISTORY_TTL', 86400))  # shared chat history lifetime
+    
+    # Per-server database list: fresh for CACHE_TTL, then served stale while
+    # refreshing in the background until STALE_TTL
+    DATABASES_CACHE_TTL = int(os.getenv('DATABASES_CACHE_TTL', 60))
+    DATABASES_STALE_TTL = int(os.getenv('DATABASES_STALE_TTL', 900))
+    
+    # Row counts: tables estimated at or below the threshold are counted exactly inline,
+    # larger ones are counted in the background
+    ROW_COUNT_EXACT_THRESHOLD = int(os.getenv('ROW_COUNT_EXACT_THRESHOLD', 50000))
+    ROW_COUNT_CACHE_TTL = int(os.getenv('ROW_COUNT_CACHE_TTL', 600))  # seconds
+    ROW_COUNT_REFRESH_WORKERS = int(os.getenv('ROW_COUNT_REFRESH_WORKERS', 2))
+    ROW_COUNT_TIMEOUT_MS = int(os.getenv('ROW_COUNT_TIMEOUT_MS', 60000))
+    ROW_COUNT_INLINE_TIMEOUT_MS = int(os.getenv('ROW_COUNT_INLINE_TIMEOUT_MS', 2000))  # exact counts on the request path
+    ROW_COUNT_MAX_ENTRIES = int(os.getenv('ROW_COUNT_MAX_ENTRIES', 10000))  # least recently used dropped
+    
+    # Connection status: checked in the background; browsers poll the snapshot, or
+    # subscribe over SSE when enabled. Each open SSE stream holds a server thread, so
+    # only enable it with an async worker class (gunicorn -k gevent / eventlet).
+    STATUS_REFRESH_INTERVAL = float(os.getenv('STATUS_REFRESH_INTERVAL', 15))  # seconds
+    STATUS_POLL_INTERVAL = float(os.getenv('STATUS_POLL_INTERVAL', 15))  # seconds between browser polls
+    STATUS_STREAM_ENABLED = os.getenv('STATUS_STREAM_ENABLED', 'false').lower() == 'true'
+    STATUS_STREAM_HEARTBEAT = float(os.getenv('STATUS_STREAM_HEARTBEAT', 20))  # seconds
+    STATUS_STREAM_MAX_SECONDS = int(os.getenv('STATUS_STREAM_MAX_SECONDS', 300))  # client reconnects after this
+    
+    # Schema watcher: re-fingerprint the selected database and push DDL deltas (0 disables)
+    SCHEMA_WATCH_INTERVAL = float(os.getenv('SCHEMA_WATCH_INTERVAL', 30))  # seconds
+    
+    # Semantic response cache (opt-in): replay answers to near-identical questions
+    # asked against the same schema fingerprint
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'false').lower() == 'true'
+    RESPONSE_CACHE_THRESHOLD = float(os.getenv('RESPONSE_CACHE_THRESHOLD', 0.8))  # estimated Jaccard similarity
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 3600))  # seconds
+    RESPONSE_CACHE_MAX_PER_BAND = int(os.getenv('RESPONSE_CACHE_MAX_PER_BAND', 16))
+    RESPONSE_CACHE_REPLAY_CHUNK_CHARS = int(os.getenv('RESPONSE_CACHE_REPLAY_CHUNK_CHARS', 64))
+    
+    # Answer template questions (list tables, describe/count/preview a table) without the LLM
+    NL_FAST_PATH_ENABLED = os.getenv('NL_FAST_PATH_ENABLED', 'true').lower() == 'true'
+    NL_FAST_PATH_MAX_ROWS = int(os.getenv('NL_FAST_PATH_MAX_ROWS', 1000))
+    
+    # Speculative execution of SELECT blocks while the assistant streams them
+    QUERY_PREFETCH_ENABLED = os.getenv('QUERY_PREFETCH_ENABLED', 'true').lower() == 'true'
+    QUERY_PREFETCH_WORKERS = int(os.getenv('QUERY_PREFETCH_WORKERS', 2))
+    QUERY_PREFETCH_MAX_PENDING = int(os.getenv('QUERY_PREFETCH_MAX_PENDING', 4))
+    QUERY_PREFETCH_MAX_ROWS = int(os.getenv('QUERY_PREFETCH_MAX_ROWS', 1000))  # larger results are not kept
+    QUERY_PREFETCH_TIMEOUT_MS = int(os.getenv('QUERY_PREFETCH_TIMEOUT_MS', 3000))
+    QUERY_PREFETCH_CHECKOUT_TIMEOUT = float(os.getenv('QUERY_PREFETCH_CHECKOUT_TIMEOUT', 0.05))  # seconds
+    QUERY_PREFETCH_TTL = int(os.getenv('QUERY_PREFETCH_TTL', 60))  # seconds
+    
     # Logging Configuration
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
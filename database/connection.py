@@ -1,16 +1,18 @@
 """Optimized Database connection management"""
 
 import mysql.connector
-from mysql.connector import pooling
 import threading
 from concurrent.futures import ThreadPoolExecutor
 from config import Config
+from database.pool import ConnectionPool, PoolExhaustedError
+from database.replicas import ReplicaSet, parse_endpoints
+from flask import g, has_app_context
 import logging
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
-# Thread-local storage for database connections
+# Fallback lease storage for code running outside a Flask app context
 thread_local = threading.local()
 executor = ThreadPoolExecutor(max_workers=Config.MAX_WORKERS)
 
@@ -18,11 +20,39 @@ executor = ThreadPoolExecutor(max_workers=Config.MAX_WORKERS)
 _connection_pool = None
 _pool_lock = threading.Lock()
 
+# Optional read replicas (same credentials and database as the primary)
+replica_endpoints = parse_endpoints(Config.MYSQL_REPLICAS)
+_replica_set = None
+
 # Current database configuration
 db_config = Config.MYSQL_CONFIG.copy()
 # Whether the server/db credentials have been configured (set by connect flow)
 server_configured = bool(db_config.get('host') and db_config.get('user'))
 
+# Errors after which a connection cannot be trusted and must not go back to the pool
+_BROKEN_CONNECTION_ERRORS = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError)
+
+# Lease modes: 'request' pins one connection per app context until teardown,
+# 'multiplex' leases per cursor so many threads can share a small pool
+POOL_MODE_REQUEST = 'request'
+POOL_MODE_MULTIPLEX = 'multiplex'
+
+def _connect_config():
+    """Connection arguments shared by the primary and replica pools"""
+    connect_config = db_config.copy()
+    connect_config.update({
+        # Read-only workload: autocommit gives every SELECT a fresh
+        # snapshot and lets checkin skip the rollback round trip
+        'autocommit': True,
+        'use_unicode': True,
+        'charset': 'utf8mb4',
+        'collation': 'utf8mb4_unicode_ci',
+        'sql_mode': 'STRICT_TRANS_TABLES,NO_ZERO_DATE,NO_ZERO_IN_DATE,ERROR_FOR_DIVISION_BY_ZERO',
+        'connect_timeout': 10,
+        'buffered': True  # Enable buffered cursors by default
+    })
+    return connect_config
+
 def _initialize_pool():
     """Initialize connection pool with optimized settings"""
     global _connection_pool
@@ -33,73 +63,157 @@ def _initialize_pool():
     if _connection_pool is None:
         with _pool_lock:
             if _connection_pool is None:  # Double-check locking
-                pool_config = db_config.copy()
-                pool_config.update({
-                    'pool_name': 'db_pool',
-                    'pool_size': min(Config.MAX_WORKERS * 2, 32),  # Optimized pool size
-                    'pool_reset_session': True,
-                    'autocommit': False,  # Explicit transaction control
-                    'use_unicode': True,
-                    'charset': 'utf8mb4',
-                    'collation': 'utf8mb4_unicode_ci',
-                    'sql_mode': 'STRICT_TRANS_TABLES,NO_ZERO_DATE,NO_ZERO_IN_DATE,ERROR_FOR_DIVISION_BY_ZERO',
-                    'connect_timeout': 10,
-                    'buffered': True  # Enable buffered cursors by default
-                })
-                
                 try:
-                    _connection_pool = pooling.MySQLConnectionPool(**pool_config)
-                    logger.info(f"Connection pool initialized with size {pool_config['pool_size']}")
+                    _connection_pool = ConnectionPool(
+                        _connect_config(),
+                        size=Config.DB_POOL_SIZE,
+                        checkout_timeout=Config.DB_POOL_CHECKOUT_TIMEOUT,
+                        max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+                        validate_interval=Config.DB_POOL_VALIDATE_INTERVAL
+                    )
+                    logger.info(f"Connection pool initialized with size {Config.DB_POOL_SIZE}")
                 except Exception as e:
                     logger.error(f"Failed to initialize connection pool: {e}")
                     raise
 
-def get_db_connection():
-    """Get optimized database connection from pool"""
-    global _connection_pool
-    
+def _get_pool():
+    """Return the active pool, creating it on first use"""
     # Initialize pool if not already done
     if _connection_pool is None:
         # If server is not configured, raise a clear error instead of silently reconnecting
         if not db_config.get('host') or not db_config.get('user'):
             raise RuntimeError('Database server not configured')
         _initialize_pool()
-    
-    # Use thread-local connection if available and valid
-    if hasattr(thread_local, 'connection'):
-        try:
-            # Test connection validity
-            if thread_local.connection.is_connected():
-                return thread_local.connection
-        except Exception as e:
-            # Connection is stale or check failed, remove it and log debug info
-            logger.debug('Thread-local connection validity check failed: %s', e)
-            try:
-                delattr(thread_local, 'connection')
-            except Exception:
-                # ignore if attr removal fails
-                pass
-    
-    # Get new connection from pool
+
+    pool = _connection_pool
+    if pool is None:
+        raise RuntimeError('Database server not configured')
+    return pool
+
+def _get_replica_set():
+    """Return the replica set for the configured server, or None without replicas"""
+    global _replica_set
+    if not replica_endpoints or not is_server_configured():
+        return None
+    if _replica_set is None:
+        with _pool_lock:
+            if _replica_set is None:
+                _replica_set = ReplicaSet(replica_endpoints, _connect_config())
+                logger.info(f"Routing reads across {len(_replica_set.replicas)} replica(s)")
+    return _replica_set
+
+def _close_replicas():
+    global _replica_set
+    with _pool_lock:
+        replica_set, _replica_set = _replica_set, None
+    if replica_set is not None:
+        replica_set.close()
+
+def set_replica_endpoints(endpoints):
+    """Replace the replica endpoints (see ``parse_endpoints``); None restores MYSQL_REPLICAS"""
+    global replica_endpoints
+    _close_replicas()
+    replica_endpoints = parse_endpoints(Config.MYSQL_REPLICAS if endpoints is None else endpoints)
+
+def _checkout(pool, timeout=None):
     try:
-        thread_local.connection = _connection_pool.get_connection()
-        return thread_local.connection
-    except Exception as e:
-        logger.error(f"Failed to get connection from pool: {e}")
-        # Fallback to direct connection
-        # Only attempt a direct connect if server is configured
-        if db_config.get('host') and db_config.get('user'):
-            return mysql.connector.connect(**db_config)
+        return pool.checkout(timeout)
+    except PoolExhaustedError as e:
+        logger.warning(f"Connection pool exhausted: {e}")
         raise
 
+def _lease_store():
+    """Where the current lease lives: the app context if any, else the thread"""
+    return g if has_app_context() else thread_local
+
+def get_db_connection():
+    """Get the connection leased by the current app context, checking one out if needed.
+
+    Connections are validated in the background by the pool, so this path
+    makes no round trip to the server. Raises ``PoolExhaustedError`` when
+    the pool stays saturated past the checkout timeout.
+    """
+    store = _lease_store()
+    connection = getattr(store, 'db_connection', None)
+    if connection is not None:
+        return connection
+
+    pool = _get_pool()
+    connection = _checkout(pool)
+    store.db_connection = connection
+    store.db_pool = pool
+    return connection
+
+def release_db_connection(exc=None, discard=False):
+    """Return the connection leased by the current app context to its pool.
+
+    Registered as an app-context teardown handler so each request gives its
+    connection back; also safe to call from worker threads when done.
+    """
+    store = _lease_store()
+    connection = getattr(store, 'db_connection', None)
+    if connection is None:
+        return
+    pool = getattr(store, 'db_pool', None)
+    store.db_connection = None
+    store.db_pool = None
+    if pool is not None:
+        pool.checkin(connection, discard=discard)
+    else:
+        try:
+            connection.close()
+        except Exception as e:
+            logger.debug('Failed to close unpooled connection: %s', e)
+
+def _uses_scoped_lease() -> bool:
+    """True when cursors should share the app context's lease.
+
+    Outside an app context (executor threads) and in multiplex mode,
+    cursors lease a connection only for their own lifetime.
+    """
+    if getattr(_lease_store(), 'db_connection', None) is not None:
+        return True
+    return Config.DB_POOL_MODE != POOL_MODE_MULTIPLEX and has_app_context()
+
 @contextmanager
-def get_cursor(dictionary=False, buffered=True):
-    """Context manager for optimized cursor handling"""
-    conn = get_db_connection()
+def get_cursor(dictionary=False, buffered=True, checkout_timeout=None, read_only=False):
+    """Context manager for optimized cursor handling.
+
+    ``checkout_timeout`` gives the cursor its own short-lived lease that
+    waits at most that long for a free connection (for background work).
+    ``read_only`` cursors run on a healthy replica when one is configured,
+    falling back to the primary.
+    """
+    replica_set = _get_replica_set() if read_only else None
+    replica = replica_set.choose() if replica_set is not None else None
+    if replica is not None:
+        pool = replica.pool
+        conn = _checkout(pool, checkout_timeout)
+    elif checkout_timeout is None and _uses_scoped_lease():
+        pool = None
+        conn = get_db_connection()
+    else:
+        pool = _get_pool()
+        conn = _checkout(pool, checkout_timeout)
     cursor = None
+    broken = False
     try:
         cursor = conn.cursor(dictionary=dictionary, buffered=buffered)
         yield cursor
+    except _BROKEN_CONNECTION_ERRORS as e:
+        # Do not hand a dead connection to the next request
+        broken = True
+        if replica is not None:
+            replica_set.mark_failed(replica, e)
+        if cursor:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            cursor = None
+        if pool is None:
+            release_db_connection(discard=True)
+        raise
     except Exception as e:
         if conn.in_transaction:
             conn.rollback()
@@ -107,38 +221,86 @@ def get_cursor(dictionary=False, buffered=True):
     finally:
         if cursor:
             cursor.close()
+        if pool is not None:
+            pool.checkin(conn, discard=broken)
+
+# Session variable that bounds statement run time, per server identity (None: unsupported)
+_timeout_variables = {}
+_TIMEOUT_VARIABLES = ('max_execution_time', 'max_statement_time')
+_ER_UNKNOWN_SYSTEM_VARIABLE = 1193
+
+@contextmanager
+def statement_timeout(cursor, timeout_ms):
+    """Bound statements run on ``cursor`` inside the block to ``timeout_ms``.
+
+    Uses ``max_execution_time`` (MySQL 5.7.8+, milliseconds, SELECTs only)
+    or ``max_statement_time`` (MariaDB 10.1+, seconds); older servers run
+    without a server-side limit. The session value is restored on exit so
+    the pooled connection goes back clean.
+    """
+    identity = get_server_identity()
+    known = identity in _timeout_variables
+    candidates = [_timeout_variables[identity]] if known else _TIMEOUT_VARIABLES
+    variable = None
+    for candidate in filter(None, candidates):
+        value = int(timeout_ms) if candidate == 'max_execution_time' else timeout_ms / 1000
+        try:
+            cursor.execute(f"SET SESSION {candidate} = {value}")
+        except mysql.connector.errors.DatabaseError as e:
+            if e.errno != _ER_UNKNOWN_SYSTEM_VARIABLE:
+                raise
+            continue
+        variable = candidate
+        break
+    if not known:
+        if variable is None:
+            logger.warning("Server supports neither max_execution_time nor max_statement_time; "
+                           "statements run without a server-side time limit")
+        _timeout_variables[identity] = variable
+    try:
+        yield
+    finally:
+        if variable is not None:
+            cursor.execute(f"SET SESSION {variable} = DEFAULT")
 
 def get_executor():
     """Get thread pool executor"""
     return executor
 
+def reset_pool():
+    """Close the current pool and release this thread's lease.
+
+    Connections still leased by other threads are closed when they are
+    checked back in to the retired pool.
+    """
+    global _connection_pool
+
+    release_db_connection()
+    _close_replicas()
+    with _pool_lock:
+        pool, _connection_pool = _connection_pool, None
+    if pool is not None:
+        try:
+            pool.close()
+        except Exception as e:
+            logger.debug('Failed to close existing pool: %s', e)
+
+def get_pool_stats():
+    """Return occupancy of the active pool, or None when no pool exists"""
+    pool = _connection_pool
+    return pool.stats() if pool is not None else None
+
+def get_replica_stats():
+    """Health, lag and pool occupancy per replica; empty without replicas"""
+    replica_set = _replica_set
+    return replica_set.stats() if replica_set is not None else []
+
 def update_db_config(database_name):
     """Update database configuration with selected database"""
-    global db_config, _connection_pool
-    
     db_config['database'] = database_name
     
     # Reset pool to use new database
-    with _pool_lock:
-        if _connection_pool:
-            try:
-                # Close existing pool connections
-                _connection_pool._remove_connections()
-            except Exception as e:
-                logger.debug('Failed to remove connections from existing pool: %s', e)
-        _connection_pool = None
-    
-    # Clear thread-local connections
-    if hasattr(thread_local, 'connection'):
-        try:
-            thread_local.connection.close()
-        except Exception as e:
-            logger.debug('Failed to close thread-local connection during config update: %s', e)
-        try:
-            delattr(thread_local, 'connection')
-        except Exception:
-            # ignore if attribute already removed
-            pass
+    reset_pool()
 
     # Clear any cached DB metadata that may have been populated for the
     # previous database selection so callers will fetch fresh metadata.
@@ -153,37 +315,24 @@ def get_current_db_name():
     return db_config.get('database')
 
 
+def get_server_identity():
+    """Stable identity of the configured server (user@host:port), or None"""
+    if not is_server_configured():
+        return None
+    return f"{db_config.get('user')}@{db_config.get('host')}:{db_config.get('port') or 3306}"
+
 def is_server_configured():
     """Return True when host/user credentials are present in db_config."""
     return bool(db_config.get('host') and db_config.get('user'))
 
 def close_all_connections():
     """Close all connections and cleanup"""
-    global _connection_pool
-    
-    # Close thread-local connection
-    if hasattr(thread_local, 'connection'):
-        try:
-            thread_local.connection.close()
-        except Exception as e:
-            logger.debug('Failed to close thread-local connection during shutdown: %s', e)
-        try:
-            delattr(thread_local, 'connection')
-        except Exception:
-            # ignore if attribute already removed
-            pass
-    
-    # Close pool connections
-    with _pool_lock:
-        if _connection_pool:
-            try:
-                _connection_pool._remove_connections()
-            except Exception as e:
-                logger.debug('Failed to remove connections from pool during shutdown: %s', e)
-            _connection_pool = None
+    global executor
+    reset_pool()
     
-    # Shutdown executor
-    executor.shutdown(wait=True)
+    # Shutdown executor, leaving a fresh one for the next connection
+    previous_executor, executor = executor, ThreadPoolExecutor(max_workers=Config.MAX_WORKERS)
+    previous_executor.shutdown(wait=True)
     # Clear sensitive configuration so the server will not auto-reconnect
     try:
         db_config.update({
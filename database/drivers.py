@@ -0,0 +1,273 @@
+"""Interchangeable MySQL client drivers behind one connection/cursor interface"""
+
+import asyncio
+import inspect
+import threading
+import logging
+from typing import Dict, Optional
+import mysql.connector
+from mysql.connector import errors
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DRIVER_MYSQL_CONNECTOR = 'mysql-connector'
+DRIVER_MYSQLCLIENT = 'mysqlclient'
+DRIVER_ASYNCMY = 'asyncmy'
+DRIVER_AIOMYSQL = 'aiomysql'
+DRIVERS = (DRIVER_MYSQL_CONNECTOR, DRIVER_MYSQLCLIENT, DRIVER_ASYNCMY, DRIVER_AIOMYSQL)
+
+
+def _translate(error: Exception) -> errors.Error:
+    """The mysql.connector exception matching another driver's error.
+
+    Callers catch ``mysql.connector.Error`` and treat OperationalError /
+    InterfaceError as a broken connection, whichever driver is in use.
+    """
+    errno = error.args[0] if error.args and isinstance(error.args[0], int) else None
+    message = str(error.args[1]) if errno is not None and len(error.args) > 1 else str(error)
+    if errno is None or 2000 <= errno < 3000:
+        # Client-side failures (lost connection, server gone away, closed cursor)
+        return errors.OperationalError(msg=message, errno=errno)
+    return errors.get_mysql_exception(errno, message)
+
+
+def _session_init(kwargs: Dict) -> Optional[str]:
+    """mysql-connector's sql_mode/collation options as an init command for DB-API drivers"""
+    settings = []
+    if kwargs.get('sql_mode'):
+        settings.append(f"sql_mode = '{kwargs['sql_mode']}'")
+    if kwargs.get('collation'):
+        settings.append(f"collation_connection = '{kwargs['collation']}'")
+    return f"SET SESSION {', '.join(settings)}" if settings else None
+
+
+class _Cursor:
+    """mysql-connector style cursor over a DB-API cursor"""
+
+    def __init__(self, connection: '_Connection', raw):
+        self._connection = connection
+        self._raw = raw
+
+    def execute(self, operation, params=None):
+        self._connection._call(self._raw.execute, operation, params)
+
+    def fetchone(self):
+        return self._connection._call(self._raw.fetchone)
+
+    def fetchmany(self, size=1):
+        return self._connection._call(self._raw.fetchmany, size)
+
+    def fetchall(self):
+        return self._connection._call(self._raw.fetchall)
+
+    def close(self):
+        self._connection._call(self._raw.close)
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    @property
+    def column_names(self):
+        return tuple(d[0] for d in self._raw.description or ())
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+
+class _Connection:
+    """mysql-connector style connection over a DB-API (or asyncio DB-API) connection.
+
+    ``cursor_classes`` maps (dictionary, buffered) to the driver's cursor
+    class; with an event loop, every call runs on that loop and blocks the
+    caller until it completes.
+    """
+
+    def __init__(self, raw, cursor_classes: Dict, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._raw = raw
+        self._cursor_classes = cursor_classes
+        self._loop = loop
+
+    def _call(self, fn, *args):
+        try:
+            if self._loop is None:
+                return fn(*args)
+
+            async def run():
+                result = fn(*args)
+                return await result if inspect.isawaitable(result) else result
+
+            return asyncio.run_coroutine_threadsafe(run(), self._loop).result()
+        except errors.Error:
+            raise
+        except Exception as e:
+            if isinstance(e, (TypeError, ValueError, AttributeError)):
+                raise
+            raise _translate(e) from e
+
+    def cursor(self, dictionary=False, buffered=True):
+        return _Cursor(self, self._call(self._raw.cursor, self._cursor_classes[(dictionary, buffered)]))
+
+    @property
+    def in_transaction(self) -> bool:
+        # Pooled connections always run with autocommit on
+        return False
+
+    def rollback(self):
+        self._call(self._raw.rollback)
+
+    def ping(self, reconnect=False):
+        self._call(self._raw.ping, reconnect)
+
+    def is_connected(self) -> bool:
+        try:
+            self.ping()
+            return True
+        except errors.Error:
+            return False
+
+    def close(self):
+        self._call(self._raw.close)
+
+
+class Driver:
+    """Opens connections for the pool; ``connect`` takes mysql-connector keyword arguments"""
+
+    name = DRIVER_MYSQL_CONNECTOR
+
+    def connect(self, kwargs: Dict):
+        if getattr(mysql.connector, 'HAVE_CEXT', False):
+            # Prefer the C extension; use_pure=False raises ImportError without it
+            return mysql.connector.connect(use_pure=False, **kwargs)
+        return mysql.connector.connect(**kwargs)
+
+    def describe(self) -> Dict:
+        return {'driver': self.name, 'c_extension': bool(getattr(mysql.connector, 'HAVE_CEXT', False))}
+
+
+class MySQLClientDriver(Driver):
+    name = DRIVER_MYSQLCLIENT
+
+    def __init__(self):
+        import MySQLdb
+        import MySQLdb.cursors
+        self._module = MySQLdb
+        self._cursor_classes = {
+            (False, True): MySQLdb.cursors.Cursor,
+            (True, True): MySQLdb.cursors.DictCursor,
+            (False, False): MySQLdb.cursors.SSCursor,
+            (True, False): MySQLdb.cursors.SSDictCursor,
+        }
+
+    def connect(self, kwargs: Dict):
+        options = {
+            'host': kwargs.get('host'),
+            'port': int(kwargs.get('port') or 3306),
+            'user': kwargs.get('user'),
+            'passwd': kwargs.get('password') or '',
+            'charset': kwargs.get('charset', 'utf8mb4'),
+            'autocommit': kwargs.get('autocommit', True),
+            'connect_timeout': kwargs.get('connect_timeout', 10),
+        }
+        if kwargs.get('database'):
+            options['db'] = kwargs['database']
+        init_command = _session_init(kwargs)
+        if init_command:
+            options['init_command'] = init_command
+        try:
+            raw = self._module.connect(**options)
+        except self._module.Error as e:
+            raise _translate(e) from e
+        return _Connection(raw, self._cursor_classes)
+
+    def describe(self) -> Dict:
+        return {'driver': self.name, 'c_extension': True}
+
+
+class AsyncDriver(Driver):
+    """asyncmy or aiomysql, driven from a private event-loop thread.
+
+    The web and worker code stays synchronous; each call is handed to the
+    loop and awaited there, so these drivers' (Cython, for asyncmy) protocol
+    and row decoding can be used unchanged behind ``get_cursor``.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        if name == DRIVER_ASYNCMY:
+            import asyncmy as module
+            from asyncmy import cursors
+        else:
+            import aiomysql as module
+            from aiomysql import cursors
+        self._module = module
+        self._cursor_classes = {
+            (False, True): cursors.Cursor,
+            (True, True): cursors.DictCursor,
+            (False, False): cursors.SSCursor,
+            (True, False): cursors.SSDictCursor,
+        }
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name=f'db-{name}-loop', daemon=True).start()
+
+    def connect(self, kwargs: Dict):
+        options = {
+            'host': kwargs.get('host'),
+            'port': int(kwargs.get('port') or 3306),
+            'user': kwargs.get('user'),
+            'password': kwargs.get('password') or '',
+            'charset': kwargs.get('charset', 'utf8mb4'),
+            'autocommit': kwargs.get('autocommit', True),
+            'connect_timeout': kwargs.get('connect_timeout', 10),
+        }
+        if kwargs.get('database'):
+            options['db'] = kwargs['database']
+        init_command = _session_init(kwargs)
+        if init_command:
+            options['init_command'] = init_command
+        try:
+            raw = asyncio.run_coroutine_threadsafe(self._module.connect(**options), self._loop).result()
+        except errors.Error:
+            raise
+        except Exception as e:
+            raise _translate(e) from e
+        return _Connection(raw, self._cursor_classes, self._loop)
+
+    def describe(self) -> Dict:
+        return {'driver': self.name, 'c_extension': self.name == DRIVER_ASYNCMY}
+
+
+_drivers: Dict[str, Driver] = {}
+_drivers_lock = threading.Lock()
+
+
+def get_driver(name: Optional[str] = None) -> Driver:
+    """The driver named by ``name`` (default DB_DRIVER), created once per process"""
+    name = (name or Config.DB_DRIVER).lower()
+    if name not in DRIVERS:
+        raise ValueError(f"Unknown DB_DRIVER '{name}'; expected one of {', '.join(DRIVERS)}")
+    with _drivers_lock:
+        driver = _drivers.get(name)
+        if driver is None:
+            try:
+                if name == DRIVER_MYSQLCLIENT:
+                    driver = MySQLClientDriver()
+                elif name in (DRIVER_ASYNCMY, DRIVER_AIOMYSQL):
+                    driver = AsyncDriver(name)
+                else:
+                    driver = Driver()
+            except ImportError as e:
+                raise RuntimeError(f"DB_DRIVER={name} requires the '{name}' package") from e
+            info = driver.describe()
+            if name == DRIVER_MYSQL_CONNECTOR and not info['c_extension']:
+                logger.warning('mysql-connector C extension is not available; rows are decoded in pure Python')
+            else:
+                logger.info(f"Using database driver {info}")
+            _drivers[name] = driver
+    return driver
@@ -0,0 +1,304 @@
+"""Workload-driven composite index recommendations"""
+
+import math
+import re
+import logging
+import mysql.connector
+from typing import Dict, List, Optional, Set, Tuple
+from config import Config
+from database.connection import get_cursor, get_current_db_name
+from database.query_stats import QueryStatsService
+
+logger = logging.getLogger(__name__)
+
+_IDENT = r"(?:`[^`]+`|[A-Za-z_][\w$]*)"
+_COLUMN_REF = re.compile(rf"^(?:({_IDENT})\.)?({_IDENT})$")
+_TABLE_REF = re.compile(
+    rf"\b(?:FROM|JOIN)\s+(?:({_IDENT})\.)?({_IDENT})(?:\s+(?:AS\s+)?({_IDENT}))?"
+)
+_CLAUSE_END = r"(?=\s+(?:(?:LEFT|RIGHT|INNER|CROSS|STRAIGHT_JOIN|NATURAL)\s+|JOIN\s|WHERE\s|GROUP BY\s|HAVING\s|ORDER BY\s|LIMIT\s|UNION\s)|\)|$)"
+_ON_CLAUSE = re.compile(rf"\bON\s+(.+?){_CLAUSE_END}")
+_WHERE_CLAUSE = re.compile(r"\bWHERE\s+(.+?)(?=\s+(?:GROUP BY|HAVING|ORDER BY|LIMIT|UNION)\s|$)")
+_ORDER_CLAUSE = re.compile(r"\bORDER BY\s+(.+?)(?=\s+(?:LIMIT|UNION)\s|\)|$)")
+_GROUP_CLAUSE = re.compile(r"\bGROUP BY\s+(.+?)(?=\s+(?:HAVING|ORDER BY|LIMIT|UNION)\s|\)|$)")
+_BETWEEN = re.compile(r"\bBETWEEN \? AND \?")
+
+_EQUALITY = re.compile(rf"^({_IDENT}(?:\.{_IDENT})?) (?:=|<=>) \?$|^\? = ({_IDENT}(?:\.{_IDENT})?)$"
+                       rf"|^({_IDENT}(?:\.{_IDENT})?) (?:IN \(.*\)|IS NULL)$")
+_RANGE = re.compile(rf"^({_IDENT}(?:\.{_IDENT})?) (?:<|>|<=|>=|BETWEEN|LIKE) \?$")
+_JOIN = re.compile(rf"^({_IDENT}(?:\.{_IDENT})?) = ({_IDENT}(?:\.{_IDENT})?)$")
+_NOT_ALIASES = frozenset((
+    'WHERE', 'ON', 'USING', 'JOIN', 'LEFT', 'RIGHT', 'INNER', 'CROSS', 'GROUP', 'ORDER', 'LIMIT',
+    'HAVING', 'UNION', 'NATURAL', 'STRAIGHT_JOIN', 'FOR', 'WINDOW',
+))
+
+
+def _unquote(name: Optional[str]) -> Optional[str]:
+    return name.strip('`') if name else name
+
+
+class _TableUse:
+    """How one statement filters, joins and sorts one table"""
+
+    def __init__(self):
+        self.equality: List[str] = []
+        self.range: List[str] = []
+        self.sort: List[str] = []
+
+    def add(self, bucket: List[str], column: str):
+        if column not in bucket:
+            bucket.append(column)
+
+    def candidate(self) -> Tuple[str, ...]:
+        """Equality columns, then one range column or the sort columns"""
+        equality = sorted(self.equality)
+        tail = [c for c in self.range if c not in equality][:1] or [c for c in self.sort if c not in equality]
+        return tuple((equality + tail)[:Config.INDEX_ADVISOR_MAX_COLUMNS])
+
+
+class IndexAdvisor:
+    """Rank composite index candidates from the recorded workload.
+
+    Statements come from ``QueryStatsService`` (normalized SELECT digests with
+    call counts and total time). For each table a statement touches, the
+    candidate index is its equality and join columns followed by a range or
+    ORDER BY/GROUP BY column. Candidates already served by a leftmost prefix
+    of an index in ``information_schema.STATISTICS`` are dropped; shorter
+    candidates are folded into longer ones they prefix. The estimated
+    benefit is the time spent by the statements a candidate serves, scaled
+    by how much of it existing indexes already cover and by table size.
+    """
+
+    @staticmethod
+    def _existing_indexes(db_name: str) -> Dict[str, Dict[str, List[str]]]:
+        indexes: Dict[str, Dict[str, List[str]]] = {}
+        with get_cursor(read_only=True) as cursor:
+            cursor.execute(
+                "SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX",
+                (db_name,)
+            )
+            for table, index, column in cursor.fetchall():
+                columns = indexes.setdefault(table, {}).setdefault(index, [])
+                # Functional key parts have no column; later parts are unusable by name
+                if column is None:
+                    columns.append(None)
+                elif None not in columns:
+                    columns.append(column)
+        result = {}
+        for table, table_indexes in indexes.items():
+            primary = [c for c in table_indexes.get('PRIMARY', []) if c]
+            # InnoDB secondary indexes carry the primary key columns after their own
+            result[table] = {
+                name: [c for c in columns if c] + ([] if name == 'PRIMARY' or None in columns
+                                                   else [c for c in primary if c not in columns])
+                for name, columns in table_indexes.items()
+            }
+        return result
+
+    @staticmethod
+    def _parse(query: str, db_name: str, tables: Set[str], columns_of) -> Dict[str, _TableUse]:
+        """Per table, the columns ``query`` filters, joins and sorts on"""
+        aliases = {}
+        for schema, table, alias in _TABLE_REF.findall(query):
+            table = _unquote(table)
+            if table not in tables or (schema and _unquote(schema) != db_name):
+                continue
+            aliases[table] = table
+            if alias and alias.upper() not in _NOT_ALIASES:
+                aliases[_unquote(alias)] = table
+        if not aliases:
+            return {}
+        referenced = sorted(set(aliases.values()))
+
+        def resolve(ref: str) -> Optional[Tuple[str, str]]:
+            match = _COLUMN_REF.match(ref.strip())
+            if not match:
+                return None
+            qualifier, column = _unquote(match.group(1)), _unquote(match.group(2))
+            if qualifier:
+                table = aliases.get(qualifier)
+                return (table, column) if table else None
+            owners = [t for t in referenced if column in columns_of(t)]
+            return (owners[0], column) if len(owners) == 1 else None
+
+        uses: Dict[str, _TableUse] = {}
+
+        def use(table: str) -> _TableUse:
+            return uses.setdefault(table, _TableUse())
+
+        predicates = [m.group(1) for m in _ON_CLAUSE.finditer(query)]
+        predicates += [m.group(1) for m in _WHERE_CLAUSE.finditer(query)]
+        for clause in predicates:
+            for term in _BETWEEN.sub('BETWEEN ?', clause).split(' AND '):
+                term = term.strip().strip('()').strip()
+                if ' OR ' in term:
+                    continue
+                join = _JOIN.match(term)
+                if join:
+                    for ref in join.groups():
+                        resolved = resolve(ref)
+                        if resolved:
+                            use(resolved[0]).add(use(resolved[0]).equality, resolved[1])
+                    continue
+                equality = _EQUALITY.match(term)
+                if equality:
+                    resolved = resolve(next(g for g in equality.groups() if g))
+                    if resolved:
+                        use(resolved[0]).add(use(resolved[0]).equality, resolved[1])
+                    continue
+                ranged = _RANGE.match(term)
+                if ranged:
+                    resolved = resolve(ranged.group(1))
+                    if resolved:
+                        use(resolved[0]).add(use(resolved[0]).range, resolved[1])
+
+        for pattern in (_ORDER_CLAUSE, _GROUP_CLAUSE):
+            clause = pattern.search(query)
+            if not clause:
+                continue
+            refs = [re.sub(r"\s+(?:ASC|DESC)$", '', part.strip()) for part in clause.group(1).split(',')]
+            resolved = [resolve(ref) for ref in refs]
+            # An index only helps the sort when every key comes from one table
+            if resolved and all(resolved) and len({t for t, _ in resolved}) == 1:
+                table_use = use(resolved[0][0])
+                for _, column in resolved:
+                    table_use.add(table_use.sort, column)
+        return uses
+
+    @staticmethod
+    def _covered_prefix(candidate: Tuple[str, ...], equality_count: int, indexes: Dict[str, List[str]]) -> int:
+        """How many leading candidate columns the best existing index already serves"""
+        best = 0
+        for columns in indexes.values():
+            matched = 0
+            for position, column in enumerate(candidate):
+                if position >= len(columns):
+                    break
+                if position < equality_count:
+                    # Equality columns may appear in any order within the prefix
+                    if set(columns[:position + 1]) <= set(candidate[:equality_count]):
+                        matched = position + 1
+                        continue
+                    break
+                if columns[position] != column:
+                    break
+                matched = position + 1
+            best = max(best, matched)
+        return best
+
+    @staticmethod
+    def recommend(db_name: Optional[str] = None, limit: Optional[int] = None) -> Dict:
+        """Ranked ``CREATE INDEX`` candidates for ``db_name`` (default: the selected database)"""
+        from database.operations import DatabaseOperations, DatabaseOperationError
+
+        db_name = db_name or get_current_db_name()
+        if not db_name:
+            raise ValueError('No database selected.')
+        limit = limit or Config.INDEX_ADVISOR_MAX_CANDIDATES
+        statements = QueryStatsService.statements(db_name)
+        tables = set(DatabaseOperations.get_tables(db_name))
+        try:
+            existing = IndexAdvisor._existing_indexes(db_name)
+        except mysql.connector.Error as err:
+            logger.error(f"Database error reading index metadata: {err}")
+            raise DatabaseOperationError("Failed to retrieve index metadata")
+        schema_columns = {}
+
+        def columns_of(table: str) -> Set[str]:
+            if table not in schema_columns:
+                schema_columns[table] = {c['name'] for c in DatabaseOperations.get_table_schema(table, db_name)}
+            return schema_columns[table]
+
+        candidates: Dict[Tuple[str, Tuple[str, ...]], Dict] = {}
+        for statement in statements:
+            if not statement['query'].startswith(('SELECT', 'WITH')):
+                continue
+            for table, table_use in IndexAdvisor._parse(statement['query'], db_name, tables, columns_of).items():
+                columns = table_use.candidate()
+                if not columns:
+                    continue
+                entry = candidates.setdefault((table, columns), {
+                    'equality': len([c for c in columns if c in table_use.equality]),
+                    'calls': 0, 'total_ms': 0.0, 'digests': [],
+                })
+                entry['calls'] += statement['calls']
+                entry['total_ms'] += statement['total_ms']
+                entry['digests'].append((statement['total_ms'], statement['digest'], statement['query']))
+
+        # A longer candidate also serves statements that need only its prefix
+        for (table, columns), entry in sorted(candidates.items(), key=lambda item: len(item[0][1])):
+            longer = [key for key in candidates if key[0] == table and len(key[1]) > len(columns)
+                      and key[1][:len(columns)] == columns]
+            if longer:
+                target = candidates[max(longer, key=lambda key: candidates[key]['total_ms'])]
+                target['calls'] += entry['calls']
+                target['total_ms'] += entry['total_ms']
+                target['digests'] += entry['digests']
+                entry['merged'] = True
+
+        ranked = []
+        for (table, columns), entry in candidates.items():
+            if entry.get('merged'):
+                continue
+            covered = IndexAdvisor._covered_prefix(columns, entry['equality'], existing.get(table, {}))
+            if covered >= len(columns):
+                continue
+            rows = DatabaseOperations.get_table_row_count_info(table, db_name)['count']
+            if rows < Config.INDEX_ADVISOR_MIN_ROWS:
+                continue
+            benefit_ms = entry['total_ms'] * (1 - covered / len(columns))
+            name = f"idx_{table}_{'_'.join(columns)}"[:64]
+            column_list = ', '.join(f"`{c}`" for c in columns)
+            ranked.append({
+                'table': table,
+                'columns': list(columns),
+                'ddl': f"CREATE INDEX `{name}` ON `{table}` ({column_list})",
+                'score': round(benefit_ms * math.log10(max(rows, 10)), 3),
+                'estimated_benefit_ms': round(benefit_ms, 3),
+                'calls': entry['calls'],
+                'table_rows': rows,
+                'existing_prefix_columns': covered,
+                'example_queries': [q for _, _, q in sorted(entry['digests'], reverse=True)[:3]],
+            })
+        ranked.sort(key=lambda c: c['score'], reverse=True)
+        return {
+            'database': db_name,
+            'statements_analyzed': len(statements),
+            'candidates': ranked[:limit],
+            'existing_indexes': {t: {i: cols for i, cols in idx.items()} for t, idx in existing.items()},
+        }
+
+    @staticmethod
+    def is_index_question(prompt: str) -> bool:
+        text = prompt.lower()
+        return any(word in text for word in ('index', 'indices', 'slow', 'optimiz', 'optimis', 'performance'))
+
+    @staticmethod
+    def assistant_context(db_name: Optional[str] = None) -> Optional[str]:
+        """Ranked candidates as text for the assistant, or None without a workload"""
+        try:
+            advice = IndexAdvisor.recommend(db_name)
+        except Exception as e:
+            logger.warning(f"Index advice unavailable: {e}")
+            return None
+        if not advice['statements_analyzed']:
+            return None
+        lines = [
+            f"[Index advisor for {advice['database']}: {advice['statements_analyzed']} observed query patterns. "
+            "Base index advice on these measured candidates rather than guesses.]"
+        ]
+        if not advice['candidates']:
+            lines.append('No new indexes recommended: existing indexes already serve the observed workload.')
+        for rank, candidate in enumerate(advice['candidates'], 1):
+            lines.append(
+                f"{rank}. {candidate['ddl']} -- {candidate['calls']} calls, "
+                f"{candidate['estimated_benefit_ms']:.0f} ms of query time, {candidate['table_rows']} rows; "
+                f"e.g. {candidate['example_queries'][0]}"
+            )
+        tables = {c['table'] for c in advice['candidates']}
+        for table in sorted(tables):
+            indexes = advice['existing_indexes'].get(table, {})
+            described = ', '.join(f"{name}({', '.join(cols)})" for name, cols in indexes.items()) or 'none'
+            lines.append(f"Existing indexes on {table}: {described}")
+        return '\n'.join(lines)
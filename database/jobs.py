@@ -0,0 +1,315 @@
+"""Asynchronous query jobs with results spilled to memory-mapped column files"""
+
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import logging
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from database.connection import get_current_db_name, get_cursor, statement_timeout
+from database.query_stats import QueryStatsService
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobError(Exception):
+    """Job cannot be submitted or read (unknown id, full queue, not finished)"""
+
+
+class ColumnarSpill:
+    """Append-only result store: per column, JSON-encoded values plus an offset index.
+
+    ``col{i}.data`` holds the encoded values back to back and ``col{i}.idx``
+    the int64 end offset of each one, so any page of rows is read through
+    ``mmap`` without loading the rest of the result.
+    """
+
+    def __init__(self, path: str, column_count: int):
+        self.path = path
+        self.column_count = column_count
+        self.row_count = 0
+        self._data = [open(os.path.join(path, f"col{i}.data"), 'wb') for i in range(column_count)]
+        self._idx = [open(os.path.join(path, f"col{i}.idx"), 'wb') for i in range(column_count)]
+        self._offsets = [0] * column_count
+
+    def append(self, rows: List[Tuple]):
+        for i in range(self.column_count):
+            ends = array('q')
+            encoded = []
+            offset = self._offsets[i]
+            for row in rows:
+                value = json.dumps(row[i], default=str, separators=(',', ':')).encode('utf-8')
+                encoded.append(value)
+                offset += len(value)
+                ends.append(offset)
+            self._data[i].write(b''.join(encoded))
+            ends.tofile(self._idx[i])
+            self._offsets[i] = offset
+        self.row_count += len(rows)
+
+    def close(self):
+        for handle in self._data + self._idx:
+            handle.close()
+
+    @staticmethod
+    def read(path: str, column_count: int, offset: int, limit: int, total: int) -> List[List]:
+        """Rows ``offset`` to ``offset + limit`` of a closed spill"""
+        end = min(offset + limit, total)
+        if offset >= end:
+            return []
+        columns = []
+        for i in range(column_count):
+            with open(os.path.join(path, f"col{i}.idx"), 'rb') as idx_file, \
+                    open(os.path.join(path, f"col{i}.data"), 'rb') as data_file:
+                with mmap.mmap(idx_file.fileno(), 0, access=mmap.ACCESS_READ) as idx_map:
+                    ends = memoryview(idx_map).cast('q')
+                    try:
+                        bounds = [ends[offset - 1] if offset else 0] + list(ends[offset:end])
+                    finally:
+                        ends.release()
+                with mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as data_map:
+                    columns.append([
+                        json.loads(data_map[bounds[j]:bounds[j + 1]]) for j in range(end - offset)
+                    ])
+        return [list(row) for row in zip(*columns)]
+
+
+class _Job:
+    def __init__(self, owner: str, sql_query: str, db_name: str):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.sql_query = sql_query
+        self.db_name = db_name
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.fields: List[str] = []
+        self.rows_fetched = 0
+        self.truncated = False
+        self.error = None
+        self.spill_path = None
+        self.connection_id = None
+        self.cancel_requested = False
+        self.version = 0
+
+    def describe(self) -> Dict:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'database': self.db_name,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'fields': self.fields,
+            'rows_fetched': self.rows_fetched,
+            'truncated': self.truncated,
+            'error': self.error,
+            'version': self.version,
+        }
+
+
+class QueryJobService:
+    """Run long SELECTs off the request path.
+
+    Jobs queue on a bounded pool (QUERY_JOB_WORKERS running, at most
+    QUERY_JOB_MAX_QUEUED waiting) and stream rows from an unbuffered cursor
+    into a ``ColumnarSpill`` in batches, so memory stays flat whatever the
+    result size. Cancelling a running job issues ``KILL QUERY`` for its
+    connection. Finished jobs and their files are removed QUERY_JOB_TTL
+    seconds after completion by a sweeper thread.
+
+    Jobs are held per process: gunicorn.conf.py runs a single worker unless
+    sticky sessions keep each user on one worker.
+    """
+
+    _jobs: Dict[str, _Job] = {}
+    _cond = threading.Condition()
+    _executor = ThreadPoolExecutor(max_workers=Config.QUERY_JOB_WORKERS, thread_name_prefix='query-job')
+    _sweeper = None
+
+    @staticmethod
+    def submit(owner: str, sql_query: str) -> Dict:
+        from database.operations import _check_select_query
+
+        blocked = _check_select_query(sql_query)
+        if blocked:
+            raise JobError(blocked['message'])
+        db_name = get_current_db_name()
+        if not db_name:
+            raise JobError('No database selected.')
+
+        QueryJobService._ensure_sweeper()
+        job = _Job(owner, sql_query, db_name)
+        with QueryJobService._cond:
+            queued = sum(1 for j in QueryJobService._jobs.values() if j.status == QUEUED)
+            if queued >= Config.QUERY_JOB_MAX_QUEUED:
+                raise JobError('Too many queued jobs, please retry later.')
+            QueryJobService._jobs[job.id] = job
+        QueryJobService._executor.submit(QueryJobService._run, job)
+        logger.info(f"Query job {job.id} submitted by {owner}")
+        return job.describe()
+
+    @staticmethod
+    def _get(job_id: str, owner: str) -> _Job:
+        with QueryJobService._cond:
+            job = QueryJobService._jobs.get(job_id)
+        if job is None or job.owner != owner:
+            raise JobError('Job not found.')
+        return job
+
+    @staticmethod
+    def status(job_id: str, owner: str) -> Dict:
+        job = QueryJobService._get(job_id, owner)
+        with QueryJobService._cond:
+            return job.describe()
+
+    @staticmethod
+    def wait_for_change(job_id: str, owner: str, since_version: int, timeout: float) -> Optional[Dict]:
+        """Block until the job's progress moves past ``since_version``; None on timeout"""
+        job = QueryJobService._get(job_id, owner)
+        with QueryJobService._cond:
+            if not QueryJobService._cond.wait_for(lambda: job.version != since_version, timeout):
+                return None
+            return job.describe()
+
+    @staticmethod
+    def fetch_page(job_id: str, owner: str, offset: int, limit: int) -> Dict:
+        job = QueryJobService._get(job_id, owner)
+        if job.status != SUCCEEDED:
+            raise JobError(f'Job is {job.status}; results are available once it succeeds.')
+        limit = max(1, min(limit, Config.QUERY_JOB_PAGE_MAX))
+        offset = max(offset, 0)
+        rows = ColumnarSpill.read(job.spill_path, len(job.fields), offset, limit, job.rows_fetched)
+        return {'fields': job.fields, 'rows': rows, 'offset': offset, 'total': job.rows_fetched}
+
+    @staticmethod
+    def cancel(job_id: str, owner: str) -> Dict:
+        """Cancel a queued or running job; a finished job is discarded with its results"""
+        job = QueryJobService._get(job_id, owner)
+        with QueryJobService._cond:
+            if job.status in FINISHED:
+                QueryJobService._jobs.pop(job.id, None)
+                QueryJobService._remove_files(job)
+                return job.describe()
+            job.cancel_requested = True
+            connection_id = job.connection_id if job.status == RUNNING else None
+        if connection_id is not None:
+            QueryJobService._kill_query(connection_id)
+        return QueryJobService.status(job_id, owner)
+
+    @staticmethod
+    def _update(job: _Job, **changes):
+        with QueryJobService._cond:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            QueryJobService._cond.notify_all()
+
+    @staticmethod
+    def _run(job: _Job):
+        if job.cancel_requested:
+            QueryJobService._update(job, status=CANCELLED, finished_at=time.time())
+            return
+        spill = None
+        try:
+            os.makedirs(Config.QUERY_JOB_SPILL_DIR, exist_ok=True)
+            path = tempfile.mkdtemp(prefix=f"job-{job.id}-", dir=Config.QUERY_JOB_SPILL_DIR)
+            QueryJobService._update(job, status=RUNNING, started_at=time.time(), spill_path=path)
+            with get_cursor(buffered=False) as cursor, statement_timeout(cursor, Config.QUERY_JOB_TIMEOUT_MS):
+                cursor.execute("SELECT CONNECTION_ID()")
+                QueryJobService._update(job, connection_id=cursor.fetchone()[0])
+                cursor.execute(job.sql_query)
+                fields = list(cursor.column_names)
+                spill = ColumnarSpill(path, len(fields))
+                QueryJobService._update(job, fields=fields)
+                killed = False
+                while True:
+                    # Keep reading until the server ends the result, even after a
+                    # cancel, so the connection goes back to the pool clean
+                    rows = cursor.fetchmany(Config.QUERY_JOB_BATCH_ROWS)
+                    if not rows:
+                        break
+                    if killed:
+                        continue
+                    spill.append(rows)
+                    QueryJobService._update(job, rows_fetched=spill.row_count)
+                    if spill.row_count >= Config.QUERY_JOB_MAX_ROWS:
+                        QueryJobService._update(job, truncated=True)
+                    if (job.cancel_requested or job.truncated) and not killed:
+                        killed = True
+                        QueryJobService._kill_query(job.connection_id)
+            spill.close()
+            status = CANCELLED if job.cancel_requested else SUCCEEDED
+            QueryJobService._update(job, status=status, finished_at=time.time(), connection_id=None)
+        except Exception as e:
+            if spill:
+                spill.close()
+            if job.cancel_requested or job.truncated:
+                # Interrupted by our own KILL QUERY
+                status = CANCELLED if job.cancel_requested else SUCCEEDED
+                QueryJobService._update(job, status=status, finished_at=time.time(), connection_id=None)
+            else:
+                logger.warning(f"Query job {job.id} failed: {e}")
+                QueryJobService._update(job, status=FAILED, error=str(e), finished_at=time.time(), connection_id=None)
+        finally:
+            if job.status != SUCCEEDED:
+                QueryJobService._remove_files(job)
+            if job.status in (SUCCEEDED, FAILED) and job.started_at:
+                QueryStatsService.record(
+                    job.sql_query, (job.finished_at - job.started_at) * 1000, job.rows_fetched,
+                    error=job.status == FAILED, database=job.db_name
+                )
+
+    @staticmethod
+    def _kill_query(connection_id: int):
+        try:
+            with get_cursor() as cursor:
+                cursor.execute("KILL QUERY %s", (int(connection_id),))
+        except Exception as e:
+            logger.warning(f"Failed to kill query on connection {connection_id}: {e}")
+
+    @staticmethod
+    def _remove_files(job: _Job):
+        if job.spill_path:
+            shutil.rmtree(job.spill_path, ignore_errors=True)
+
+    @staticmethod
+    def _ensure_sweeper():
+        """Expire finished jobs on a timer, so idle periods do not keep their files"""
+        with QueryJobService._cond:
+            if QueryJobService._sweeper is None:
+                QueryJobService._sweeper = threading.Thread(
+                    target=QueryJobService._sweep_forever, name='query-job-sweeper', daemon=True
+                )
+                QueryJobService._sweeper.start()
+
+    @staticmethod
+    def _sweep_forever():
+        while True:
+            time.sleep(Config.QUERY_JOB_SWEEP_INTERVAL)
+            try:
+                QueryJobService._sweep()
+            except Exception as e:
+                logger.warning(f"Query job sweep failed: {e}")
+
+    @staticmethod
+    def _sweep():
+        """Drop finished jobs (and their files) older than QUERY_JOB_TTL"""
+        cutoff = time.time() - Config.QUERY_JOB_TTL
+        with QueryJobService._cond:
+            expired = [j for j in QueryJobService._jobs.values() if j.status in FINISHED and j.finished_at < cutoff]
+            for job in expired:
+                del QueryJobService._jobs[job.id]
+        for job in expired:
+            QueryJobService._remove_files(job)
@@ -1,17 +1,25 @@
 """Optimized secure database operations and queries - READ-ONLY VERSION"""
 
 import mysql.connector
-from database.connection import get_cursor
+from database.connection import get_cursor, get_current_db_name, get_executor, get_server_identity
+from database.pool import PoolExhaustedError
 from database.security import DatabaseSecurity
+from database.query_stats import QueryStatsService
+from database.row_counts import RowCountService
+from database.single_flight import SingleFlight, normalize_query
+from services.cache_service import CacheService
 import logging
 import time
-from typing import Dict, List, Tuple, Optional
-from functools import lru_cache
-from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import threading
+from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Concurrent identical metadata loads and SELECTs share one execution
+_flights = SingleFlight()
+
 
 class DatabaseOperationError(Exception):
     """Specific exception type for database operation failures."""
@@ -20,26 +28,49 @@ class DatabaseOperationError(Exception):
 class DatabaseOperations:
     """Optimized secure database operations class - READ-ONLY VERSION"""
     
-    # Cache for database and table information
-    _info_cache = {}
-    _cache_lock = threading.Lock()
+    # Database and table information lives in the shared cache backend so all
+    # workers see the same warm metadata; keys are scoped to the server
+    METADATA_NAMESPACE = 'db_metadata'
+    
+    @staticmethod
+    def _metadata_key(key: str) -> str:
+        return f"{get_server_identity()}|{key}"
+    
+    @staticmethod
+    def _cache_get(key: str):
+        return CacheService.get(DatabaseOperations.METADATA_NAMESPACE, DatabaseOperations._metadata_key(key))
+    
+    @staticmethod
+    def _cache_set(key: str, value):
+        CacheService.set(DatabaseOperations.METADATA_NAMESPACE, DatabaseOperations._metadata_key(key), value)
+    
+    @staticmethod
+    def _cache_delete(key: str):
+        CacheService.delete(DatabaseOperations.METADATA_NAMESPACE, DatabaseOperations._metadata_key(key))
+    
+    # Database lists per server: fresh for DATABASES_CACHE_TTL, then served
+    # stale while a background refresh runs, up to DATABASES_STALE_TTL
+    DATABASES_NAMESPACE = 'server_databases'
+    _refreshing = set()
+    _refresh_lock = threading.Lock()
     
     @staticmethod
-    @lru_cache(maxsize=32)
-    def get_databases() -> Dict:
-        """Cached fetch of available databases - SECURE & FAST VERSION"""
+    def get_databases(force_refresh: bool = False) -> Dict:
+        """Cached fetch of available databases for the connected server - SECURE & FAST VERSION"""
+        server = get_server_identity()
+        if server is None:
+            return {'status': 'error', 'message': 'Database server not configured'}
+        
+        if not force_refresh:
+            entry = CacheService.get(DatabaseOperations.DATABASES_NAMESPACE, server)
+            if entry:
+                age = time.time() - entry['fetched_at']
+                if age >= Config.DATABASES_CACHE_TTL:
+                    DatabaseOperations._refresh_databases_async(server)
+                return {'status': 'success', 'databases': entry['databases'], 'age_seconds': round(age, 1)}
+        
         try:
-            with get_cursor() as cursor:
-                cursor.execute("SHOW DATABASES")
-                databases = [db[0] for db in cursor.fetchall()]
-            
-            # Filter out system databases for security
-            system_dbs = {'information_schema', 'mysql', 'performance_schema', 'sys'}
-            user_databases = [db for db in databases if db.lower() not in system_dbs]
-            
-            logger.info(f"Retrieved {len(user_databases)} user databases")
-            return {'status': 'success', 'databases': user_databases}
-            
+            return _flights.do(('databases', server), lambda: DatabaseOperations._load_databases(server))
         except mysql.connector.Error as err:
             logger.error(f"Database error in get_databases: {err}")
             return {'status': 'error', 'message': 'Failed to retrieve databases'}
@@ -47,6 +78,52 @@ class DatabaseOperations:
             logger.error(f"Unexpected error in get_databases: {err}")
             return {'status': 'error', 'message': 'Internal server error'}
     
+    @staticmethod
+    def _load_databases(server: str) -> Dict:
+        """Query the server and cache its database list under ``server``"""
+        with get_cursor(read_only=True) as cursor:
+            cursor.execute("SHOW DATABASES")
+            databases = [db[0] for db in cursor.fetchall()]
+        
+        # Filter out system databases for security
+        system_dbs = {'information_schema', 'mysql', 'performance_schema', 'sys'}
+        user_databases = [db for db in databases if db.lower() not in system_dbs]
+        
+        # Never file one server's list under another's identity
+        if get_server_identity() == server:
+            CacheService.set(
+                DatabaseOperations.DATABASES_NAMESPACE, server,
+                {'databases': user_databases, 'fetched_at': time.time()},
+                ttl=Config.DATABASES_STALE_TTL
+            )
+        
+        logger.info(f"Retrieved {len(user_databases)} user databases")
+        return {'status': 'success', 'databases': user_databases, 'age_seconds': 0.0}
+    
+    @staticmethod
+    def _refresh_databases_async(server: str):
+        with DatabaseOperations._refresh_lock:
+            if server in DatabaseOperations._refreshing:
+                return
+            DatabaseOperations._refreshing.add(server)
+        
+        def refresh():
+            try:
+                if get_server_identity() == server:
+                    DatabaseOperations._load_databases(server)
+            except Exception as e:
+                logger.warning(f"Background refresh of database list failed: {e}")
+            finally:
+                with DatabaseOperations._refresh_lock:
+                    DatabaseOperations._refreshing.discard(server)
+        
+        try:
+            get_executor().submit(refresh)
+        except RuntimeError as e:
+            logger.debug('Database list refresh not scheduled: %s', e)
+            with DatabaseOperations._refresh_lock:
+                DatabaseOperations._refreshing.discard(server)
+    
     @staticmethod
     def get_tables(db_name: str) -> List[str]:
         """Optimized get all tables in a database - SECURE VERSION"""
@@ -56,24 +133,27 @@ class DatabaseOperations:
             
             # Check cache first
             cache_key = f"tables_{validated_db}"
-            with DatabaseOperations._cache_lock:
-                if cache_key in DatabaseOperations._info_cache:
-                    return DatabaseOperations._info_cache[cache_key]
-            
-            with get_cursor() as cursor:
-                # Optimized query using information_schema
-                cursor.execute(
-                    "SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE'", 
-                    (validated_db,)
-                )
-                tables = [table[0] for table in cursor.fetchall()]
+            cached = DatabaseOperations._cache_get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Cache the result
-            with DatabaseOperations._cache_lock:
-                DatabaseOperations._info_cache[cache_key] = tables
+            def load():
+                with get_cursor(read_only=True) as cursor:
+                    # Optimized query using information_schema
+                    cursor.execute(
+                        "SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE'", 
+                        (validated_db,)
+                    )
+                    tables = [table[0] for table in cursor.fetchall()]
+                
+                # Cache the result
+                DatabaseOperations._cache_set(cache_key, tables)
+                
+                logger.info(f"Retrieved {len(tables)} tables from database {validated_db}")
+                return tables
             
-            logger.info(f"Retrieved {len(tables)} tables from database {validated_db}")
-            return tables
+            # Concurrent misses (e.g. right after clear_cache) share one query
+            return _flights.do(('tables', get_server_identity(), validated_db), load)
             
         except ValueError as err:
             logger.warning(f"Validation error in get_tables: {err}")
@@ -92,28 +172,30 @@ class DatabaseOperations:
             
             # Check cache first
             cache_key = f"schema_{validated_db}_{validated_table}"
-            with DatabaseOperations._cache_lock:
-                if cache_key in DatabaseOperations._info_cache:
-                    return DatabaseOperations._info_cache[cache_key]
+            cached = DatabaseOperations._cache_get(cache_key)
+            if cached is not None:
+                return cached
             
-            with get_cursor(dictionary=True) as cursor:
-                # Optimized single query for schema
-                query = """
-                    SELECT COLUMN_NAME as name, DATA_TYPE as type, IS_NULLABLE as nullable, 
-                           COLUMN_DEFAULT as default_value, COLUMN_KEY as key_type
-                    FROM information_schema.COLUMNS 
-                    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
-                    ORDER BY ORDINAL_POSITION
-                """
-                cursor.execute(query, (validated_db, validated_table))
-                columns = cursor.fetchall()
-            
-            # Cache the result
-            with DatabaseOperations._cache_lock:
-                DatabaseOperations._info_cache[cache_key] = columns
+            def load():
+                with get_cursor(dictionary=True, read_only=True) as cursor:
+                    # Optimized single query for schema
+                    query = """
+                        SELECT COLUMN_NAME as name, DATA_TYPE as type, IS_NULLABLE as nullable, 
+                               COLUMN_DEFAULT as default_value, COLUMN_KEY as key_type
+                        FROM information_schema.COLUMNS 
+                        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+                        ORDER BY ORDINAL_POSITION
+                    """
+                    cursor.execute(query, (validated_db, validated_table))
+                    columns = cursor.fetchall()
+                
+                # Cache the result
+                DatabaseOperations._cache_set(cache_key, columns)
+                
+                logger.info(f"Retrieved schema for table {validated_table}")
+                return columns
             
-            logger.info(f"Retrieved schema for table {validated_table}")
-            return columns
+            return _flights.do(('schema', get_server_identity(), validated_db, validated_table), load)
             
         except ValueError as err:
             logger.warning(f"Validation error in get_table_schema: {err}")
@@ -124,21 +206,14 @@ class DatabaseOperations:
     
     @staticmethod
     def get_table_row_count(table_name: str, db_name: str) -> int:
-        """Optimized get table row count - SECURE VERSION"""
+        """Best available row count (see get_table_row_count_info for its accuracy)"""
+        return DatabaseOperations.get_table_row_count_info(table_name, db_name)['count']
+    
+    @staticmethod
+    def get_table_row_count_info(table_name: str, db_name: str, inline_exact: bool = True) -> Dict:
+        """Row count labelled as estimated or exact, with its age in seconds"""
         try:
-            validated_table = DatabaseSecurity.validate_table_name(table_name)
-            validated_db = DatabaseSecurity.validate_database_name(db_name)
-            
-            with get_cursor() as cursor:
-                # Use faster SHOW TABLE STATUS for approximate count
-                cursor.execute(
-                    "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
-                    (validated_db, validated_table)
-                )
-                result = cursor.fetchone()
-                
-                return result[0] if result else 0
-            
+            return RowCountService.get_row_count(table_name, db_name, inline_exact)
         except ValueError as err:
             logger.warning(f"Validation error in get_table_row_count: {err}")
             raise err
@@ -149,13 +224,17 @@ class DatabaseOperations:
     @staticmethod
     def clear_cache():
         """Clear all cached data"""
-        with DatabaseOperations._cache_lock:
-            DatabaseOperations._info_cache.clear()
-        DatabaseOperations.get_databases.cache_clear()
+        # Versioned invalidation: every worker sharing the backend sees it
+        CacheService.invalidate(DatabaseOperations.METADATA_NAMESPACE)
         DatabaseSecurity.clear_cache()
+        RowCountService.clear_cache()
 
 def fetch_database_info(db_name: str) -> Tuple[Optional[str], Optional[str]]:
     """Optimized fetch detailed information about a database - SECURE VERSION (NO SAMPLE DATA)"""
+    # Users opening the same database at once share one metadata pass
+    return _flights.do(('database_info', get_server_identity(), db_name), lambda: _fetch_database_info(db_name))
+
+def _fetch_database_info(db_name: str) -> Tuple[Optional[str], Optional[str]]:
     try:
         validated_db = DatabaseSecurity.validate_database_name(db_name)
         tables = DatabaseOperations.get_tables(validated_db)
@@ -204,7 +283,7 @@ def _process_table_info(table: str, db_name: str) -> str:
     """Helper function to process individual table information - NO SAMPLE DATA"""
     try:
         schema = DatabaseOperations.get_table_schema(table, db_name)
-        row_count = DatabaseOperations.get_table_row_count(table, db_name)
+        row_count = DatabaseOperations.get_table_row_count_info(table, db_name)
         
         result = f"Table {table}:\n"
         
@@ -212,7 +291,7 @@ def _process_table_info(table: str, db_name: str) -> str:
         for column in schema:
             result += f"  {column['name']} {column['type']}\n"
         
-        result += f"  count: {row_count}\n"
+        result += f"  count: {format_row_count(row_count)}\n"
         
         return result
         
@@ -220,57 +299,85 @@ def _process_table_info(table: str, db_name: str) -> str:
         logger.error(f"Error processing table {table}: {e}")
         return f"Table {table}: Error retrieving information\n"
 
-def execute_sql_query(sql_query: str) -> Dict:
-    """Execute SQL query securely - READ-ONLY VERSION WITH TIMING"""
-    try:
-        # Analyze query for security issues (with caching)
-        analysis = DatabaseSecurity.analyze_sql_query(sql_query)
-        
-        if not analysis['is_safe']:
-            logger.warning(f"Unsafe query blocked: {analysis['warnings']}")
-            return {
-                'status': 'error',
-                'message': f"Query blocked for security reasons: {', '.join(analysis['warnings'])}"
-            }
-        
-        # ONLY ALLOW SELECT QUERIES - NO DML OPERATIONS
-        if analysis['query_type'] != 'SELECT':
-            logger.warning(f"Non-SELECT query blocked: {analysis['query_type']}")
-            return {
-                'status': 'error',
-                'message': 'Only SELECT queries are allowed. INSERT, UPDATE, DELETE operations are not permitted.'
-            }
-        
-        # Execute query with timing
-        start_time = time.time()
-        
-        with get_cursor(buffered=True) as cursor:
+def _check_select_query(sql_query: str) -> Optional[Dict]:
+    """Return an error response if the query may not run, else None"""
+    # Analyze query for security issues (with caching)
+    analysis = DatabaseSecurity.analyze_sql_query(sql_query)
+    
+    if not analysis['is_safe']:
+        logger.warning(f"Unsafe query blocked: {analysis['warnings']}")
+        return {
+            'status': 'error',
+            'message': f"Query blocked for security reasons: {', '.join(analysis['warnings'])}"
+        }
+    
+    # ONLY ALLOW SELECT QUERIES - NO DML OPERATIONS
+    if analysis['query_type'] != 'SELECT':
+        logger.warning(f"Non-SELECT query blocked: {analysis['query_type']}")
+        return {
+            'status': 'error',
+            'message': 'Only SELECT queries are allowed. INSERT, UPDATE, DELETE operations are not permitted.'
+        }
+    return None
+
+def format_row_count(row_count: Dict) -> str:
+    """Render a row count so the assistant can tell estimates from exact values"""
+    if row_count['exact']:
+        return f"{row_count['count']} (exact, as of {int(row_count['age_seconds'])}s ago)"
+    return f"~{row_count['count']} (estimated)"
+
+def _select_success(fields, rows, execution_time: float) -> Dict:
+    """Response body for a SELECT that returned ``rows``"""
+    return {
+        'status': 'success',
+        'result': {
+            'fields': fields,
+            'rows': rows
+        },
+        'message': f'Query executed successfully in {execution_time}ms. Data retrieved.',
+        'row_count': len(rows),
+        'execution_time_ms': execution_time,
+        'query_type': 'SELECT'
+    }
+
+def _run_select(sql_query: str) -> Dict:
+    # Execute query with timing
+    start_time = time.time()
+    
+    with get_cursor(buffered=True, read_only=True) as cursor:
+        try:
             cursor.execute(sql_query)
             
             # Only SELECT queries reach this point
             rows = cursor.fetchall()
-            
-            end_time = time.time()
-            execution_time = round((end_time - start_time) * 1000, 2)  # Convert to milliseconds
-            
-            result = {
-                'fields': cursor.column_names,
-                'rows': rows
-            }
-            
-            logger.info(f"SELECT query executed successfully in {execution_time}ms, returned {len(rows)} rows")
-            return {
-                'status': 'success',
-                'result': result,
-                'message': f'Query executed successfully in {execution_time}ms. Data retrieved.',
-                'row_count': len(rows),
-                'execution_time_ms': execution_time,
-                'query_type': 'SELECT'
-            }
+        except mysql.connector.Error:
+            QueryStatsService.record(sql_query, (time.time() - start_time) * 1000, error=True)
+            raise
+        
+        end_time = time.time()
+        execution_time = round((end_time - start_time) * 1000, 2)  # Convert to milliseconds
+        QueryStatsService.record(sql_query, (end_time - start_time) * 1000, len(rows))
+        
+        logger.info(f"SELECT query executed successfully in {execution_time}ms, returned {len(rows)} rows")
+        return _select_success(cursor.column_names, rows, execution_time)
+
+def execute_sql_query(sql_query: str) -> Dict:
+    """Execute SQL query securely - READ-ONLY VERSION WITH TIMING"""
+    try:
+        blocked = _check_select_query(sql_query)
+        if blocked:
+            return blocked
+        
+        # Identical statements already running on this server/database are joined, not repeated
+        key = ('query', get_server_identity(), get_current_db_name(), normalize_query(sql_query))
+        return _flights.do(key, lambda: _run_select(sql_query))
             
     except ValueError as err:
         logger.warning(f"Query validation error: {err}")
         return {'status': 'error', 'message': str(err)}
+    except PoolExhaustedError as err:
+        logger.warning(f"Query rejected, connection pool exhausted: {err}")
+        return {'status': 'error', 'message': 'Database is busy, please retry shortly.'}
     except mysql.connector.Error as err:
         logger.error(f"Database error: {err}")
         return {'status': 'error', 'message': f'Database error: {str(err)}'}
@@ -278,7 +385,50 @@ def execute_sql_query(sql_query: str) -> Dict:
         logger.error(f"Unexpected error in execute_sql_query: {err}")
         return {'status': 'error', 'message': 'Internal server error'}
 
+def execute_sql_queries(sql_queries: List[str], max_concurrency: int) -> Iterator[Tuple[int, Dict]]:
+    """Run independent SELECTs concurrently, yielding (index, result) as each completes.
+
+    Every statement is analyzed before anything executes; rejected ones are
+    yielded first. The rest run on the shared executor, at most
+    ``max_concurrency`` at a time, each on its own pooled connection.
+    """
+    runnable = []
+    for index, sql_query in enumerate(sql_queries):
+        try:
+            blocked = _check_select_query(sql_query)
+        except ValueError as err:
+            blocked = {'status': 'error', 'message': str(err)}
+        if blocked:
+            yield index, blocked
+        else:
+            runnable.append((index, sql_query))
+
+    executor = get_executor()
+    pending = {}
+    queue = iter(runnable)
+    try:
+        while True:
+            # Keep at most max_concurrency statements in flight
+            for index, sql_query in queue:
+                pending[executor.submit(execute_sql_query, sql_query)] = index
+                if len(pending) >= max_concurrency:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    yield index, future.result()
+                except Exception as err:
+                    logger.error(f"Unexpected error in batch query {index}: {err}")
+                    yield index, {'status': 'error', 'message': 'Internal server error'}
+    finally:
+        # Client went away mid-stream: do not start anything still queued
+        for future in pending:
+            future.cancel()
+
 # Legacy functions for backward compatibility
-def get_databases():
+def get_databases(force_refresh: bool = False):
     """Legacy function - redirects to optimized secure version"""
-    return DatabaseOperations.get_databases()
\ No newline at end of file
+    return DatabaseOperations.get_databases(force_refresh)
\ No newline at end of file
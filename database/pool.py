@@ -0,0 +1,228 @@
+"""Bounded MySQL connection pool with background validation"""
+
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+from database.drivers import get_driver
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+    pass
+
+
+class _PooledConnection:
+    """Bookkeeping wrapper around a raw connection owned by the pool"""
+
+    __slots__ = ('connection', 'created_at', 'last_checked')
+
+    def __init__(self, connection):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_checked = now
+
+
+class ConnectionPool:
+    """Connection pool whose checkout path never talks to the server.
+
+    Idle connections are validated by a background thread and connections
+    older than ``max_lifetime`` are recycled, so callers can use a leased
+    connection straight away without an ``is_connected()`` ping. When every
+    connection is leased, ``checkout`` waits up to ``checkout_timeout`` and
+    then raises ``PoolExhaustedError`` instead of opening extra connections.
+    """
+
+    def __init__(self, connect_kwargs: Dict, size: int, checkout_timeout: float,
+                 max_lifetime: float, validate_interval: float):
+        self._connect_kwargs = dict(connect_kwargs)
+        self._size = max(1, size)
+        self._checkout_timeout = checkout_timeout
+        self._max_lifetime = max_lifetime
+        self._validate_interval = validate_interval
+
+        self._idle: List[_PooledConnection] = []
+        self._leased: Dict[int, _PooledConnection] = {}
+        self._total = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._stop_event = threading.Event()
+        self._validator = threading.Thread(
+            target=self._validate_loop, name='db-pool-validator', daemon=True
+        )
+        self._validator.start()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def checkout(self, timeout: Optional[float] = None):
+        """Lease a connection, waiting up to ``timeout`` seconds for one to free up"""
+        timeout = self._checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        expired = []
+        entry = None
+
+        with self._cond:
+            while entry is None:
+                if self._closed:
+                    raise RuntimeError('Connection pool is closed')
+
+                now = time.monotonic()
+                while self._idle:
+                    candidate = self._idle.pop()  # LIFO keeps hot connections hot
+                    if self._is_expired(candidate, now):
+                        self._total -= 1
+                        expired.append(candidate)
+                        continue
+                    entry = candidate
+                    break
+                if entry is not None:
+                    break
+
+                if self._total < self._size:
+                    # Reserve a slot and open the connection outside the lock
+                    self._total += 1
+                    break
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._close_entries(expired)
+                    raise PoolExhaustedError(
+                        f'No database connection available within {timeout}s '
+                        f'({self._size} in use)'
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if entry is not None:
+                self._leased[id(entry.connection)] = entry
+
+        self._close_entries(expired)
+
+        if entry is None:
+            try:
+                entry = _PooledConnection(get_driver().connect(self._connect_kwargs))
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._leased[id(entry.connection)] = entry
+
+        return entry.connection
+
+    def checkin(self, connection, discard: bool = False):
+        """Return a leased connection to the pool (or drop it when ``discard``)"""
+        with self._cond:
+            entry = self._leased.pop(id(connection), None)
+        if entry is None:
+            logger.debug('Ignoring checkin of a connection not leased from this pool')
+            return
+
+        if not discard:
+            try:
+                # Only costs a round trip when the caller left a transaction open
+                if connection.in_transaction:
+                    connection.rollback()
+            except Exception as e:
+                logger.debug('Rollback on checkin failed, discarding connection: %s', e)
+                discard = True
+
+        with self._cond:
+            if discard or self._closed or self._is_expired(entry, time.monotonic()):
+                self._total -= 1
+                drop = True
+            else:
+                entry.last_checked = time.monotonic()
+                self._idle.append(entry)
+                drop = False
+            self._cond.notify()
+
+        if drop:
+            self._close_entries([entry])
+
+    def stats(self) -> Dict:
+        """Snapshot of pool occupancy"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'open': self._total,
+                'idle': len(self._idle),
+                'in_use': len(self._leased),
+                'waiting': self._waiting,
+            }
+
+    def close(self):
+        """Close idle connections; leased ones are closed when checked back in"""
+        self._stop_event.set()
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        self._close_entries(idle)
+
+    def _is_expired(self, entry: _PooledConnection, now: float) -> bool:
+        return self._max_lifetime > 0 and now - entry.created_at >= self._max_lifetime
+
+    def _validate_loop(self):
+        while not self._stop_event.wait(self._validate_interval):
+            try:
+                self._validate_idle()
+            except Exception as e:
+                logger.debug('Idle connection validation failed: %s', e)
+
+    def _validate_idle(self):
+        """Ping connections that sat idle for a full interval and recycle old ones"""
+        now = time.monotonic()
+        with self._cond:
+            due = [e for e in self._idle
+                   if self._is_expired(e, now) or now - e.last_checked >= self._validate_interval]
+            if not due:
+                return
+            # Take them out of circulation while they are being checked
+            self._idle = [e for e in self._idle if e not in due]
+
+        healthy, dead = [], []
+        for entry in due:
+            if self._is_expired(entry, now):
+                dead.append(entry)
+                continue
+            try:
+                entry.connection.ping(reconnect=False)
+                entry.last_checked = time.monotonic()
+                healthy.append(entry)
+            except Exception as e:
+                logger.debug('Dropping idle connection that failed validation: %s', e)
+                dead.append(entry)
+
+        with self._cond:
+            if self._closed:
+                dead.extend(healthy)
+                healthy = []
+            # Older connections go to the bottom of the LIFO stack
+            self._idle[:0] = healthy
+            self._total -= len(dead)
+            self._cond.notify_all()
+
+        self._close_entries(dead)
+        if dead:
+            logger.debug(f'Recycled {len(dead)} idle database connections')
+
+    @staticmethod
+    def _close_entries(entries: List[_PooledConnection]):
+        for entry in entries:
+            try:
+                entry.connection.close()
+            except Exception as e:
+                logger.debug('Failed to close pooled connection: %s', e)
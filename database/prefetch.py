@@ -0,0 +1,166 @@
+"""Speculative execution of SELECTs the assistant is streaming to the user"""
+
+import re
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from config import Config
+from database.connection import (
+    get_current_db_name, get_cursor, get_pool_stats, get_server_identity, statement_timeout
+)
+from database.query_stats import QueryStatsService
+from services.cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_NAMESPACE = 'query_prefetch'
+
+_LEADING_SELECT = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+# Rows read per round trip when discarding the rest of an oversized result
+_DRAIN_BATCH_ROWS = 1000
+
+
+class SqlBlockScanner:
+    """Pick complete ```sql fenced blocks out of a response as it streams"""
+
+    _BLOCK = re.compile(r"```sql[ \t]*\r?\n(.*?)```", re.DOTALL | re.IGNORECASE)
+
+    def __init__(self):
+        self._text = ''
+
+    def feed(self, chunk: str) -> List[str]:
+        """Add a chunk; return the SQL of every block it completed"""
+        self._text += chunk
+        blocks = []
+        end = 0
+        for match in self._BLOCK.finditer(self._text):
+            blocks.append(match.group(1).strip())
+            end = match.end()
+        # Keep only the unfinished tail so the scan stays proportional to it
+        self._text = self._text[end:]
+        return [b for b in blocks if b]
+
+
+class QueryPrefetchService:
+    """Run SELECTs from the assistant's answer before the user clicks "Run".
+
+    Statements that pass ``_check_select_query`` run on a small dedicated
+    pool only while the connection pool has headroom. Each one gets a short
+    checkout timeout and a session statement timeout, and reads at most one
+    row past the cap from an unbuffered cursor (MySQL 8 also stops early on
+    a ``sql_select_limit`` hint). Statistics are recorded when a result is
+    served, not when it is speculatively computed.
+    Results that fit under the row cap are stored for QUERY_PREFETCH_TTL
+    seconds, already serialized unless the result workspace needs the rows.
+    ``/run_sql_query`` consumes them once.
+    """
+
+    _inflight = set()
+    _lock = threading.Lock()
+    _executor = ThreadPoolExecutor(
+        max_workers=Config.QUERY_PREFETCH_WORKERS, thread_name_prefix='sql-prefetch'
+    )
+
+    @staticmethod
+    def _key(sql_query: str) -> Optional[str]:
+        server = get_server_identity()
+        db_name = get_current_db_name()
+        if not server or not db_name:
+            return None
+        return f"{server}|{db_name}|{sql_query.strip().rstrip(';').strip()}"
+
+    @staticmethod
+    def schedule(sql_query: str, dumps: Callable[[Dict], str]):
+        """Queue ``sql_query`` for speculative execution if it is safe and there is capacity"""
+        if not Config.QUERY_PREFETCH_ENABLED:
+            return
+        from database.operations import _check_select_query
+
+        key = QueryPrefetchService._key(sql_query)
+        if key is None:
+            return
+        try:
+            if _check_select_query(sql_query):
+                return
+        except ValueError:
+            return
+
+        stats = get_pool_stats()
+        # Low priority: never compete with requests for the last connections
+        if stats is None or stats['waiting'] or stats['in_use'] >= stats['size'] - 1:
+            logger.debug('Skipping query prefetch, connection pool is busy')
+            return
+
+        with QueryPrefetchService._lock:
+            if key in QueryPrefetchService._inflight or len(QueryPrefetchService._inflight) >= Config.QUERY_PREFETCH_MAX_PENDING:
+                return
+            QueryPrefetchService._inflight.add(key)
+        try:
+            QueryPrefetchService._executor.submit(QueryPrefetchService._run, key, sql_query, dumps)
+        except RuntimeError:
+            with QueryPrefetchService._lock:
+                QueryPrefetchService._inflight.discard(key)
+
+    @staticmethod
+    def take(sql_query: str) -> Optional[Dict]:
+        """Pop a prefetched result or None.
+
+        Entries are ``{'payload': json_text, 'row_count'}``, or with
+        WORKSPACE_ENABLED ``{'result': response_dict, 'row_count'}``.
+        """
+        if not Config.QUERY_PREFETCH_ENABLED:
+            return None
+        key = QueryPrefetchService._key(sql_query)
+        if key is None:
+            return None
+        entry = CacheService.get(PREFETCH_NAMESPACE, key)
+        if entry is None:
+            return None
+        CacheService.delete(PREFETCH_NAMESPACE, key)
+        logger.info(f"Serving prefetched result ({entry['row_count']} rows)")
+        QueryStatsService.record(sql_query, entry['execution_time_ms'], entry['row_count'])
+        return entry
+
+    @staticmethod
+    def _run(key: str, sql_query: str, dumps: Callable[[Dict], str]):
+        from database.operations import _select_success
+
+        try:
+            max_rows = Config.QUERY_PREFETCH_MAX_ROWS
+            start_time = time.time()
+            # Statement-scoped hint, so nothing leaks into the pooled session
+            hinted = _LEADING_SELECT.sub(f"SELECT /*+ SET_VAR(sql_select_limit={max_rows + 1}) */", sql_query, count=1)
+            with get_cursor(buffered=False, checkout_timeout=Config.QUERY_PREFETCH_CHECKOUT_TIMEOUT, read_only=True) as cursor, \
+                    statement_timeout(cursor, Config.QUERY_PREFETCH_TIMEOUT_MS):
+                cursor.execute(hinted)
+                fields = cursor.column_names
+                rows = cursor.fetchmany(max_rows + 1)
+                if len(rows) > max_rows:
+                    # Servers that ignore the hint keep sending; read the rest
+                    # in small batches (bounded by the timeout) and drop it
+                    while cursor.fetchmany(_DRAIN_BATCH_ROWS):
+                        pass
+            execution_time = round((time.time() - start_time) * 1000, 2)
+
+            if len(rows) > max_rows:
+                # Truncated: the real run must produce the full result
+                logger.debug(f"Prefetch discarded, more than {max_rows} rows")
+                return
+            # The server may have switched databases while this ran
+            if QueryPrefetchService._key(sql_query) != key:
+                return
+            result = _select_success(fields, rows, execution_time)
+            if Config.WORKSPACE_ENABLED:
+                # Keep the rows for the workspace instead of serializing twice
+                entry = {'result': result, 'row_count': len(rows), 'execution_time_ms': execution_time}
+            else:
+                entry = {'payload': dumps(result), 'row_count': len(rows), 'execution_time_ms': execution_time}
+            CacheService.set(PREFETCH_NAMESPACE, key, entry, ttl=Config.QUERY_PREFETCH_TTL)
+        except Exception as e:
+            # The user's own run reports (and records) any error
+            logger.debug(f"Query prefetch failed: {e}")
+        finally:
+            with QueryPrefetchService._lock:
+                QueryPrefetchService._inflight.discard(key)
@@ -0,0 +1,227 @@
+"""Per-statement workload statistics, grouped by normalized query digest"""
+
+import bisect
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from database.connection import get_current_db_name
+
+logger = logging.getLogger(__name__)
+
+# Comments, quoted strings, backtick identifiers, then literals; identifiers
+# are matched as a whole so digits inside names (t1, col_2) survive
+_DIGEST_TOKENS = re.compile(
+    r"(?P<comment>/\*.*?\*/|--[^\n]*|#[^\n]*)"
+    r"|(?P<string>'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\")"
+    r"|(?P<ident>`[^`]*`|[A-Za-z_$][\w$]*)"
+    r"|(?P<number>0x[0-9A-Fa-f]+|\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)"
+    r"|(?P<space>\s+)",
+    re.DOTALL
+)
+_OPERATOR = re.compile(r"\s*(<=>|<=|>=|<>|!=|=|<|>)\s*")
+_COMMA = re.compile(r"\s*,\s*")
+_PAREN_SPACE = re.compile(r"\(\s+|\s+\)")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SIGNED_LITERAL = re.compile(r"([(,=<>] ?)-\s*\?")
+_KEYWORDS = frozenset((
+    'SELECT', 'FROM', 'WHERE', 'AND', 'OR', 'NOT', 'IN', 'IS', 'NULL', 'LIKE', 'BETWEEN', 'AS', 'ON',
+    'JOIN', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'CROSS', 'GROUP', 'BY', 'ORDER', 'HAVING', 'LIMIT',
+    'OFFSET', 'ASC', 'DESC', 'DISTINCT', 'UNION', 'ALL', 'CASE', 'WHEN', 'THEN', 'ELSE', 'END',
+    'WITH', 'EXISTS', 'COUNT', 'SUM', 'AVG', 'MIN', 'MAX', 'USING', 'OVER', 'PARTITION',
+))
+
+# Latency histogram: bucket i holds samples below _BOUNDS[i] ms (10% steps up to ~6 minutes)
+_BOUNDS = [0.05 * 1.1 ** i for i in range(166)]
+
+
+def normalize_statement(sql_query: str) -> str:
+    """Query text with literals replaced by ``?`` and value lists folded to ``(...)``"""
+    def replace(match):
+        kind = match.lastgroup
+        if kind == 'comment':
+            return ' '
+        if kind in ('string', 'number'):
+            return '?'
+        if kind == 'space':
+            return ' '
+        token = match.group()
+        return token if token.startswith('`') else token.upper() if token.upper() in _KEYWORDS else token
+
+    text = _DIGEST_TOKENS.sub(replace, sql_query)
+    # Canonical spacing, so "id=?" and "id = ?" share a digest
+    text = _OPERATOR.sub(r' \1 ', text)
+    text = _COMMA.sub(', ', text)
+    text = _PAREN_SPACE.sub(lambda m: m.group().strip(), text)
+    text = _SIGNED_LITERAL.sub(r'\1?', text)
+    text = _VALUE_LIST.sub('(...)', text)
+    return re.sub(r"\s+", ' ', text).strip().rstrip(';').rstrip()
+
+
+def statement_digest(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+class _DigestStats:
+    __slots__ = ('digest', 'database', 'query', 'calls', 'errors', 'rows', 'total_ms', 'min_ms', 'max_ms',
+                 'histogram', 'first_seen', 'last_seen')
+
+    def __init__(self, digest: str, database: Optional[str], query: str):
+        self.digest = digest
+        self.database = database
+        self.query = query
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+        self.histogram: Dict[int, int] = {}
+        self.first_seen = self.last_seen = time.time()
+
+    def add(self, elapsed_ms: float, rows: int, error: bool):
+        self.calls += 1
+        self.errors += int(error)
+        self.rows += rows
+        self.total_ms += elapsed_ms
+        self.min_ms = elapsed_ms if self.min_ms is None else min(self.min_ms, elapsed_ms)
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        bucket = min(bisect.bisect_right(_BOUNDS, elapsed_ms), len(_BOUNDS) - 1)
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+        self.last_seen = time.time()
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Upper bound of the histogram bucket holding the ``pct`` percentile (within 10%)"""
+        if not self.calls:
+            return None
+        rank = math.ceil(pct / 100 * self.calls)
+        seen = 0
+        for bucket in sorted(self.histogram):
+            seen += self.histogram[bucket]
+            if seen >= rank:
+                return min(_BOUNDS[bucket], self.max_ms)
+        return self.max_ms
+
+    def describe(self) -> Dict:
+        return {
+            'digest': self.digest,
+            'database': self.database,
+            'query': self.query,
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else None,
+            'min_ms': round(self.min_ms, 3) if self.min_ms is not None else None,
+            'max_ms': round(self.max_ms, 3),
+            'p95_ms': round(self.percentile(95), 3) if self.calls else None,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+        }
+
+
+class QueryStatsService:
+    """Aggregate executed statements by (database, digest), like pg_stat_statements.
+
+    Literals are replaced before hashing, so the same LLM-generated pattern
+    with different constants counts as one statement. At most
+    QUERY_STATS_MAX_DIGESTS entries are kept; when full, the 5% with the
+    fewest calls are dropped (cold digests go first). Latency percentiles
+    come from a fixed-size log histogram. Statistics are per process, so
+    ``top`` labels its output with the worker it describes.
+    """
+
+    _ORDERS = {
+        'total_time': lambda s: s.total_ms,
+        'mean_time': lambda s: s.total_ms / s.calls,
+        'calls': lambda s: s.calls,
+        'rows': lambda s: s.rows,
+        'errors': lambda s: s.errors,
+    }
+
+    _entries: Dict[Tuple[Optional[str], str], _DigestStats] = {}
+    _lock = threading.Lock()
+    _evictions = 0
+    _since = time.time()
+
+    @staticmethod
+    def record(sql_query: str, elapsed_ms: float, rows: int = 0, error: bool = False,
+               database: Optional[str] = None):
+        """Count one execution of ``sql_query`` against ``database`` (default: the selected one)"""
+        if not Config.QUERY_STATS_ENABLED:
+            return
+        try:
+            normalized = normalize_statement(sql_query)
+        except Exception as e:
+            logger.debug(f"Could not normalize statement for stats: {e}")
+            return
+        digest = statement_digest(normalized)
+        key = (database if database is not None else get_current_db_name(), digest)
+        with QueryStatsService._lock:
+            entry = QueryStatsService._entries.get(key)
+            if entry is None:
+                if len(QueryStatsService._entries) >= Config.QUERY_STATS_MAX_DIGESTS:
+                    QueryStatsService._evict()
+                entry = QueryStatsService._entries[key] = _DigestStats(
+                    digest, key[0], normalized[:Config.QUERY_STATS_MAX_TEXT]
+                )
+            entry.add(elapsed_ms, rows, error)
+
+    @staticmethod
+    def _evict():
+        # Caller holds the lock
+        count = max(1, len(QueryStatsService._entries) // 20)
+        coldest = sorted(QueryStatsService._entries.items(), key=lambda item: (item[1].calls, item[1].last_seen))
+        for key, _ in coldest[:count]:
+            del QueryStatsService._entries[key]
+        QueryStatsService._evictions += count
+
+    @staticmethod
+    def top(order_by: str = 'total_time', limit: int = 20, database: Optional[str] = None) -> Dict:
+        """Top digests by ``order_by`` plus per-database totals"""
+        sort_key = QueryStatsService._ORDERS.get(order_by)
+        if sort_key is None:
+            raise ValueError(f"order_by must be one of {', '.join(QueryStatsService._ORDERS)}")
+        with QueryStatsService._lock:
+            entries = [e for e in QueryStatsService._entries.values()
+                       if database is None or e.database == database]
+            ranked = sorted(entries, key=sort_key, reverse=True)[:max(1, limit)]
+            statements = [e.describe() for e in ranked]
+            databases = {}
+            for e in entries:
+                totals = databases.setdefault(e.database, {'digests': 0, 'calls': 0, 'errors': 0, 'rows': 0, 'total_ms': 0.0})
+                totals['digests'] += 1
+                totals['calls'] += e.calls
+                totals['errors'] += e.errors
+                totals['rows'] += e.rows
+                totals['total_ms'] += e.total_ms
+            evictions, since = QueryStatsService._evictions, QueryStatsService._since
+        for totals in databases.values():
+            totals['total_ms'] = round(totals['total_ms'], 3)
+        return {
+            'statements': statements,
+            'databases': [{'database': name, **totals} for name, totals in databases.items()],
+            'evictions': evictions,
+            'since': since,
+            # Only this worker's executions; each gunicorn worker keeps its own
+            'scope': 'worker',
+            'worker_pid': os.getpid(),
+        }
+
+    @staticmethod
+    def statements(database: Optional[str]) -> List[Dict]:
+        """Every digest recorded for ``database`` (for workload analysis)"""
+        with QueryStatsService._lock:
+            return [e.describe() for e in QueryStatsService._entries.values() if e.database == database]
+
+    @staticmethod
+    def reset():
+        with QueryStatsService._lock:
+            QueryStatsService._entries.clear()
+            QueryStatsService._evictions = 0
+            QueryStatsService._since = time.time()
@@ -0,0 +1,161 @@
+"""Read-replica routing with health checks and replication-lag limits"""
+
+import random
+import threading
+import logging
+from typing import Dict, List, Optional, Union
+from config import Config
+from database.pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+ROUTING_WEIGHTED = 'weighted'
+ROUTING_LEAST_CONNECTIONS = 'least_connections'
+
+
+def parse_endpoints(value: Union[str, List, None]) -> List[Dict]:
+    """Replica endpoints from "host[:port[:weight]],..." or a list of dicts/strings"""
+    if not value:
+        return []
+    items = value.split(',') if isinstance(value, str) else value
+    endpoints = []
+    for item in items:
+        if isinstance(item, dict):
+            host, port, weight = item.get('host'), item.get('port'), item.get('weight')
+        else:
+            parts = str(item).strip().split(':')
+            host = parts[0]
+            port = parts[1] if len(parts) > 1 else None
+            weight = parts[2] if len(parts) > 2 else None
+        if not host:
+            continue
+        endpoints.append({
+            'host': host.strip(),
+            'port': int(port or 3306),
+            'weight': max(float(weight or 1), 0.0),
+        })
+    return endpoints
+
+
+class Replica:
+    """One replica endpoint: its pool and last known health"""
+
+    def __init__(self, endpoint: Dict, connect_kwargs: Dict):
+        self.host = endpoint['host']
+        self.port = endpoint['port']
+        self.weight = endpoint['weight']
+        self.healthy = False  # unknown until the first check passes
+        self.lag_seconds = None
+        self.error = None
+        self.pool = ConnectionPool(
+            dict(connect_kwargs, host=self.host, port=self.port),
+            size=Config.REPLICA_POOL_SIZE,
+            checkout_timeout=Config.DB_POOL_CHECKOUT_TIMEOUT,
+            max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+            validate_interval=Config.DB_POOL_VALIDATE_INTERVAL
+        )
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def describe(self) -> Dict:
+        return {'endpoint': self.name, 'healthy': self.healthy, 'error': self.error}
+
+
+class ReplicaSet:
+    """Route reads across replicas that are up and within the lag threshold.
+
+    A background thread checks each replica every REPLICA_HEALTH_INTERVAL
+    seconds with ``SHOW REPLICA STATUS`` (``SHOW SLAVE STATUS`` on older
+    servers); a replica is used only while replication is running and
+    ``Seconds_Behind_Source``/``Seconds_Behind_Master`` is at most
+    REPLICA_MAX_LAG_SECONDS. ``choose`` picks among healthy replicas by
+    weight or by fewest connections in use per unit of weight, and returns
+    None when none qualifies so callers fall back to the primary.
+    """
+
+    def __init__(self, endpoints: List[Dict], connect_kwargs: Dict):
+        self.replicas = [Replica(e, connect_kwargs) for e in endpoints if e['weight'] > 0]
+        self._stop_event = threading.Event()
+        self._checker = threading.Thread(target=self._check_loop, name='db-replica-health', daemon=True)
+        self._checker.start()
+
+    def choose(self) -> Optional[Replica]:
+        candidates = [r for r in self.replicas if r.healthy]
+        if not candidates:
+            return None
+        if Config.REPLICA_ROUTING == ROUTING_WEIGHTED:
+            return random.choices(candidates, weights=[r.weight for r in candidates])[0]
+
+        def load(replica):
+            stats = replica.pool.stats()
+            return (stats['in_use'] + stats['waiting']) / replica.weight
+
+        return min(candidates, key=load)
+
+    def mark_failed(self, replica: Replica, error: BaseException):
+        """Take a replica out of rotation until the next successful health check"""
+        if replica.healthy:
+            logger.warning(f"Replica {replica.name} failed, routing reads elsewhere: {error}")
+        replica.healthy = False
+        replica.error = str(error)
+
+    def stats(self) -> List[Dict]:
+        return [dict(r.describe(), lag_seconds=r.lag_seconds, pool=r.pool.stats()) for r in self.replicas]
+
+    def close(self):
+        self._stop_event.set()
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def _check_loop(self):
+        while True:
+            for replica in self.replicas:
+                if self._stop_event.is_set():
+                    return
+                self._check(replica)
+            if self._stop_event.wait(Config.REPLICA_HEALTH_INTERVAL):
+                return
+
+    def _check(self, replica: Replica):
+        try:
+            lag = self._replication_lag(replica)
+            healthy = lag is not None and lag <= Config.REPLICA_MAX_LAG_SECONDS
+            error = None if healthy else (
+                'Replication is not running' if lag is None else f'Lag {lag}s exceeds {Config.REPLICA_MAX_LAG_SECONDS}s'
+            )
+        except Exception as e:
+            lag, healthy, error = None, False, str(e)
+        if healthy != replica.healthy:
+            logger.info(f"Replica {replica.name} is now {'in' if healthy else 'out of'} rotation"
+                        + (f": {error}" if error else ''))
+        replica.lag_seconds = lag
+        replica.error = error
+        replica.healthy = healthy
+
+    @staticmethod
+    def _replication_lag(replica: Replica) -> Optional[float]:
+        """Seconds behind the source, or None when replication is stopped or not set up"""
+        connection = replica.pool.checkout(Config.REPLICA_HEALTH_INTERVAL)
+        broken = False
+        try:
+            cursor = connection.cursor(dictionary=True, buffered=True)
+            try:
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                except Exception:
+                    # Servers before MySQL 8.0.22
+                    cursor.execute("SHOW SLAVE STATUS")
+                status = cursor.fetchone()
+            finally:
+                cursor.close()
+        except Exception:
+            broken = True
+            raise
+        finally:
+            replica.pool.checkin(connection, discard=broken)
+        if not status:
+            return None
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        return float(lag) if lag is not None else None
@@ -0,0 +1,147 @@
+"""Row counts labelled as estimated or exact, refreshed in the background"""
+
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+import mysql.connector
+from config import Config
+from database.connection import get_cursor, get_server_identity, statement_timeout
+from database.security import DatabaseSecurity
+
+logger = logging.getLogger(__name__)
+
+
+class RowCountService:
+    """Serve table sizes without blocking requests on full scans.
+
+    ``information_schema.TABLES.TABLE_ROWS`` is only an InnoDB estimate. Small
+    tables are counted exactly inline, cut off after ROW_COUNT_INLINE_TIMEOUT_MS
+    in case the estimate was far off; large ones (and inline counts that ran
+    out of time) return the estimate (or the last exact count) and get an
+    exact ``COUNT(*)`` scheduled on a small background pool. Callers that
+    must not wait on a count pass ``inline_exact=False`` and always get the
+    estimate path. Counts are keyed by server and the least recently used
+    are dropped beyond ROW_COUNT_MAX_ENTRIES.
+    """
+
+    _counts: 'OrderedDict[str, Dict]' = OrderedDict()
+    _refreshing = set()
+    _lock = threading.Lock()
+    # Bumped by clear_cache so refreshes started before it are discarded
+    _generation = 0
+    _executor = ThreadPoolExecutor(
+        max_workers=Config.ROW_COUNT_REFRESH_WORKERS, thread_name_prefix='row-count'
+    )
+
+    @staticmethod
+    def get_row_count(table_name: str, db_name: str, inline_exact: bool = True) -> Dict:
+        """Return ``{'count', 'exact', 'as_of', 'age_seconds'}`` for a table"""
+        validated_table = DatabaseSecurity.validate_table_name(table_name)
+        validated_db = DatabaseSecurity.validate_database_name(db_name)
+        cache_key = f"{get_server_identity()}/{validated_db}.{validated_table}"
+
+        with RowCountService._lock:
+            cached = RowCountService._counts.get(cache_key)
+            if cached is not None:
+                RowCountService._counts.move_to_end(cache_key)
+            generation = RowCountService._generation
+        if cached and time.time() - cached['as_of'] < Config.ROW_COUNT_CACHE_TTL:
+            return RowCountService._describe(cached)
+
+        if cached is None:
+            estimate = RowCountService._estimate(validated_table, validated_db)
+            if inline_exact and estimate <= Config.ROW_COUNT_EXACT_THRESHOLD:
+                try:
+                    count = RowCountService._count_exact(
+                        validated_table, validated_db, Config.ROW_COUNT_INLINE_TIMEOUT_MS
+                    )
+                    return RowCountService._describe(RowCountService._store(cache_key, count, True, generation))
+                except mysql.connector.Error as e:
+                    # Larger than estimated (or the server is busy): finish in the background
+                    logger.info(f"Inline row count for {cache_key} gave up: {e}")
+            cached = RowCountService._store(cache_key, estimate, False, generation)
+
+        # Large or stale: serve what we have and refresh off the request path
+        RowCountService._schedule_refresh(cache_key, validated_table, validated_db)
+        return RowCountService._describe(cached)
+
+    @staticmethod
+    def clear_cache():
+        """Forget all counts and ignore refreshes that are still running"""
+        with RowCountService._lock:
+            RowCountService._counts.clear()
+            RowCountService._generation += 1
+
+    @staticmethod
+    def _describe(entry: Dict) -> Dict:
+        return {
+            'count': entry['count'],
+            'exact': entry['exact'],
+            'as_of': entry['as_of'],
+            'age_seconds': round(time.time() - entry['as_of'], 1),
+        }
+
+    @staticmethod
+    def _store(cache_key: str, count: int, exact: bool, generation: int) -> Dict:
+        entry = {'count': count, 'exact': exact, 'as_of': time.time()}
+        with RowCountService._lock:
+            if generation != RowCountService._generation:
+                return entry
+            previous = RowCountService._counts.get(cache_key)
+            # A fresh estimate never replaces an exact count
+            if exact or not previous or not previous['exact']:
+                RowCountService._counts[cache_key] = entry
+                RowCountService._counts.move_to_end(cache_key)
+                while len(RowCountService._counts) > Config.ROW_COUNT_MAX_ENTRIES:
+                    RowCountService._counts.popitem(last=False)
+            else:
+                entry = previous
+        return entry
+
+    @staticmethod
+    def _schedule_refresh(cache_key: str, table_name: str, db_name: str):
+        with RowCountService._lock:
+            if cache_key in RowCountService._refreshing:
+                return
+            RowCountService._refreshing.add(cache_key)
+            generation = RowCountService._generation
+        try:
+            RowCountService._executor.submit(
+                RowCountService._refresh, cache_key, table_name, db_name, generation
+            )
+        except RuntimeError as e:
+            logger.debug('Row count refresh not scheduled: %s', e)
+            with RowCountService._lock:
+                RowCountService._refreshing.discard(cache_key)
+
+    @staticmethod
+    def _refresh(cache_key: str, table_name: str, db_name: str, generation: int):
+        try:
+            count = RowCountService._count_exact(table_name, db_name, Config.ROW_COUNT_TIMEOUT_MS)
+            RowCountService._store(cache_key, count, True, generation)
+            logger.debug(f"Refreshed exact row count for {cache_key}: {count}")
+        except Exception as e:
+            logger.warning(f"Background row count for {cache_key} failed: {e}")
+        finally:
+            with RowCountService._lock:
+                RowCountService._refreshing.discard(cache_key)
+
+    @staticmethod
+    def _estimate(table_name: str, db_name: str) -> int:
+        with get_cursor(read_only=True) as cursor:
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+                (db_name, table_name)
+            )
+            result = cursor.fetchone()
+        return int(result[0] or 0) if result else 0
+
+    @staticmethod
+    def _count_exact(table_name: str, db_name: str, timeout_ms: int) -> int:
+        # Names are validated identifiers, so quoting with backticks is safe
+        with get_cursor(read_only=True) as cursor, statement_timeout(cursor, timeout_ms):
+            cursor.execute(f"SELECT COUNT(*) FROM `{db_name}`.`{table_name}`")
+            return int(cursor.fetchone()[0])
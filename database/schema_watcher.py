@@ -0,0 +1,154 @@
+"""Incremental schema change detection for the selected database"""
+
+import hashlib
+import threading
+import logging
+from typing import Dict, List, Optional
+from config import Config
+from database.connection import get_cursor, get_current_db_name, get_pool_stats
+from database.operations import DatabaseOperations
+
+logger = logging.getLogger(__name__)
+
+# One row per base table: column count plus an order-independent checksum of
+# the column attributes the assistant is told about (see get_table_schema).
+# BIT_XOR(CRC32(...)) avoids GROUP_CONCAT's length limit.
+_FINGERPRINT_QUERY = """
+    SELECT c.TABLE_NAME, COUNT(*),
+           BIT_XOR(CRC32(CONCAT_WS('|', c.ORDINAL_POSITION, c.COLUMN_NAME, c.DATA_TYPE, c.IS_NULLABLE,
+                                   IFNULL(c.COLUMN_DEFAULT, '<null>'), c.COLUMN_KEY)))
+    FROM information_schema.COLUMNS c
+    JOIN information_schema.TABLES t
+      ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+    WHERE c.TABLE_SCHEMA = %s AND t.TABLE_TYPE = 'BASE TABLE'
+    GROUP BY c.TABLE_NAME
+"""
+
+_COLUMN_ATTRIBUTES = (('type', 'type'), ('nullable', 'nullable'), ('default_value', 'default'), ('key_type', 'key'))
+
+
+class SchemaWatcher:
+    """Detect DDL changes and push only the difference.
+
+    Every SCHEMA_WATCH_INTERVAL seconds a daemon thread fingerprints the
+    selected database per table and compares it with this process's
+    baseline. Changed tables get their cached schema replaced, and the chat
+    sessions held by this process get a short delta (instead of the full
+    schema) in front of their next prompt. Baselines are per process because every worker has to notify
+    its own sessions; the shared metadata cache only carries the latest
+    fingerprint for ``schema_fingerprint``. Selecting a database starts new
+    baselines.
+    """
+
+    _thread = None
+    _start_lock = threading.Lock()
+    _wake = threading.Event()
+    _baselines: Dict[str, Dict[str, str]] = {}
+
+    @classmethod
+    def watch(cls):
+        """Start the watcher if enabled and take a baseline right away"""
+        if cls.ensure_started():
+            cls._baselines.clear()
+            cls._wake.set()
+
+    @classmethod
+    def ensure_started(cls) -> bool:
+        """Run the watcher in this process (workers holding chat sessions need their own)"""
+        if Config.SCHEMA_WATCH_INTERVAL <= 0:
+            return False
+        if cls._thread is None:
+            with cls._start_lock:
+                if cls._thread is None:
+                    cls._thread = threading.Thread(target=cls._run, name='schema-watcher', daemon=True)
+                    cls._thread.start()
+        return True
+
+    @classmethod
+    def _run(cls):
+        while True:
+            cls._wake.wait(Config.SCHEMA_WATCH_INTERVAL)
+            cls._wake.clear()
+            db_name = get_current_db_name()
+            if not db_name or get_pool_stats() is None:
+                continue
+            try:
+                changes = SchemaWatcher.check(db_name)
+                if changes:
+                    SchemaWatcher._push(db_name, changes)
+            except Exception as e:
+                logger.warning(f"Schema check for {db_name} failed: {e}")
+
+    @staticmethod
+    def fingerprint_tables(db_name: str) -> Dict[str, str]:
+        """Per-table fingerprints for ``db_name`` (one aggregate query)"""
+        with get_cursor() as cursor:
+            cursor.execute(_FINGERPRINT_QUERY, (db_name,))
+            return {row[0]: f"{row[1]}:{row[2]}" for row in cursor.fetchall()}
+
+    @staticmethod
+    def schema_fingerprint(db_name: str) -> str:
+        """Digest of the whole schema, from the last fingerprint any worker took"""
+        tables = DatabaseOperations._cache_get(f"fingerprint_{db_name}")
+        if tables is None:
+            tables = SchemaWatcher.fingerprint_tables(db_name)
+            DatabaseOperations._cache_set(f"fingerprint_{db_name}", tables)
+        digest = hashlib.sha1(repr(sorted(tables.items())).encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def check(db_name: str) -> Optional[List[str]]:
+        """Compare ``db_name`` with its baseline; returns change descriptions or None"""
+        current = SchemaWatcher.fingerprint_tables(db_name)
+        baseline = SchemaWatcher._baselines.get(db_name)
+        SchemaWatcher._baselines[db_name] = current
+        DatabaseOperations._cache_set(f"fingerprint_{db_name}", current)
+        if baseline is None or baseline == current:
+            return None
+
+        added = sorted(set(current) - set(baseline))
+        dropped = sorted(set(baseline) - set(current))
+        altered = sorted(t for t in set(current) & set(baseline) if current[t] != baseline[t])
+        logger.info(f"Schema change in {db_name}: {len(added)} added, {len(dropped)} dropped, {len(altered)} altered")
+
+        previous = {table: DatabaseOperations._cache_get(f"schema_{db_name}_{table}") for table in altered}
+        for table in added + dropped + altered:
+            DatabaseOperations._cache_delete(f"schema_{db_name}_{table}")
+        if added or dropped:
+            DatabaseOperations._cache_delete(f"tables_{db_name}")
+
+        changes = []
+        for table in added:
+            columns = DatabaseOperations.get_table_schema(table, db_name)
+            changes.append(f"New table {table}: " + ', '.join(f"{c['name']} {c['type']}" for c in columns))
+        for table in dropped:
+            changes.append(f"Dropped table {table}")
+        for table in altered:
+            columns = DatabaseOperations.get_table_schema(table, db_name)
+            changes.append(f"Table {table}: " + SchemaWatcher._describe_column_changes(previous[table], columns))
+        return changes
+
+    @staticmethod
+    def _describe_column_changes(old: Optional[List[Dict]], new: List[Dict]) -> str:
+        if old is None:
+            # Never loaded into the cache, so only the current shape is known
+            return 'columns are now ' + ', '.join(f"{c['name']} {c['type']}" for c in new)
+        old_by_name = {c['name']: c for c in old}
+        new_by_name = {c['name']: c for c in new}
+        parts = [f"added column {c['name']} {c['type']}" for c in new if c['name'] not in old_by_name]
+        parts += [f"dropped column {c['name']}" for c in old if c['name'] not in new_by_name]
+        for column in new:
+            before = old_by_name.get(column['name'])
+            if before is None:
+                continue
+            for attribute, label in _COLUMN_ATTRIBUTES:
+                if str(before.get(attribute)) != str(column.get(attribute)):
+                    parts.append(f"column {column['name']} {label} {before.get(attribute)} -> {column.get(attribute)}")
+        return '; '.join(parts) or 'column order changed'
+
+    @staticmethod
+    def _push(db_name: str, changes: List[str]):
+        from services.gemini_service import GeminiService
+
+        message = f"Schema change detected in database {db_name}:\n" + '\n'.join(f"- {c}" for c in changes)
+        GeminiService.queue_note_for_all(message)
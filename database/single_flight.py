@@ -0,0 +1,60 @@
+"""Collapse concurrent identical calls into one in-flight execution"""
+
+import re
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+# Quoted literals and identifiers are kept verbatim; other whitespace runs collapse
+_SQL_TOKENS = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)|\s+", re.DOTALL)
+
+
+def normalize_query(sql_query: str) -> str:
+    """Canonical text for grouping identical statements (whitespace and trailing ';')"""
+    collapsed = _SQL_TOKENS.sub(lambda m: m.group(1) or ' ', sql_query)
+    return collapsed.strip().rstrip(';').rstrip()
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Share one execution of ``fn`` among callers that arrive while it runs.
+
+    The first caller for a key runs the function; callers that arrive before
+    it finishes wait and receive the same result (or exception). Nothing is
+    cached afterwards, so the next call after completion runs again.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
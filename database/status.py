@@ -0,0 +1,142 @@
+"""Background-tracked database connection status"""
+
+import threading
+import time
+import logging
+from typing import Dict, Optional, Tuple
+from config import Config
+from database.connection import (
+    get_cursor, get_current_db_name, get_pool_stats, get_replica_stats, get_server_identity, is_server_configured
+)
+from services.cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseStatusService:
+    """Serve connection health and the database list from a cached snapshot.
+
+    A daemon thread checks the server every STATUS_REFRESH_INTERVAL seconds
+    (or immediately after ``refresh_now``), so ``/db_status`` and its SSE
+    stream never touch MySQL on the request path. The snapshot version only
+    changes when its content does, which is what subscribers wait on.
+    """
+
+    _snapshot: Optional[Dict] = None
+    _version = 0
+    _cond = threading.Condition()
+    _wake = threading.Event()
+    _thread = None
+    _start_lock = threading.Lock()
+
+    @classmethod
+    def ensure_started(cls):
+        # Started on first use so no thread exists in a pre-fork master
+        if cls._thread is None:
+            with cls._start_lock:
+                if cls._thread is None:
+                    cls._thread = threading.Thread(target=cls._run, name='db-status', daemon=True)
+                    cls._thread.start()
+
+    @classmethod
+    def get_snapshot(cls) -> Tuple[int, Dict]:
+        """Return (version, snapshot) without doing any database work"""
+        cls.ensure_started()
+        with cls._cond:
+            if cls._snapshot is None:
+                return cls._version, cls._cheap_snapshot()
+            return cls._version, cls._with_age(cls._snapshot)
+
+    @classmethod
+    def wait_for_change(cls, since_version: int, timeout: float) -> Optional[Tuple[int, Dict]]:
+        """Block until the snapshot differs from ``since_version``; None on timeout"""
+        cls.ensure_started()
+        with cls._cond:
+            if not cls._cond.wait_for(lambda: cls._version != since_version, timeout):
+                return None
+            return cls._version, cls._with_age(cls._snapshot)
+
+    @classmethod
+    def refresh_now(cls):
+        """Ask the background thread to re-check right away (after connect/select/disconnect)"""
+        cls.ensure_started()
+        cls._wake.set()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            try:
+                cls._publish(cls._collect())
+            except Exception as e:
+                logger.warning(f"Database status refresh failed: {e}")
+            cls._wake.wait(Config.STATUS_REFRESH_INTERVAL)
+            cls._wake.clear()
+
+    @staticmethod
+    def _cheap_snapshot() -> Dict:
+        from database.operations import DatabaseOperations
+
+        # Before the first background check: pool state plus whatever list is cached
+        server = get_server_identity()
+        entry = CacheService.get(DatabaseOperations.DATABASES_NAMESPACE, server) if server else None
+        return {
+            'connected': is_server_configured() and get_pool_stats() is not None,
+            'healthy': None,
+            'databases': entry['databases'] if entry else [],
+            'current_database': get_current_db_name(),
+            'checked_at': None,
+            'age_seconds': None,
+        }
+
+    @staticmethod
+    def _collect() -> Dict:
+        from database.operations import DatabaseOperations
+
+        snapshot = {
+            'connected': False,
+            'healthy': False,
+            'databases': [],
+            'current_database': get_current_db_name(),
+            'databases_age_seconds': None,
+            'error': None,
+            'replicas': [],
+        }
+        # Only look at a server the user has connected to; never create a pool here
+        if is_server_configured() and get_pool_stats() is not None:
+            snapshot['connected'] = True
+            try:
+                with get_cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchall()
+                snapshot['healthy'] = True
+            except Exception as e:
+                snapshot['error'] = str(e)
+            if snapshot['healthy']:
+                dbs = DatabaseOperations.get_databases()
+                if dbs.get('status') == 'success':
+                    snapshot['databases'] = dbs.get('databases', [])
+                    snapshot['databases_age_seconds'] = dbs.get('age_seconds')
+            # Lag figures change every check; only membership in rotation is published
+            snapshot['replicas'] = [
+                {'endpoint': r['endpoint'], 'healthy': r['healthy'], 'error': r['error']} for r in get_replica_stats()
+            ]
+        snapshot['checked_at'] = time.time()
+        return snapshot
+
+    @classmethod
+    def _publish(cls, snapshot: Dict):
+        volatile = ('checked_at', 'databases_age_seconds')
+        with cls._cond:
+            previous = cls._snapshot
+            cls._snapshot = snapshot
+            if previous is None or any(
+                previous.get(k) != snapshot.get(k) for k in snapshot if k not in volatile
+            ):
+                cls._version += 1
+                cls._cond.notify_all()
+
+    @staticmethod
+    def _with_age(snapshot: Dict) -> Dict:
+        result = dict(snapshot)
+        result['age_seconds'] = round(time.time() - snapshot['checked_at'], 1)
+        return result
@@ -0,0 +1,296 @@
+"""Per-session DuckDB workspace for re-shaping query results locally"""
+
+import datetime
+import decimal
+import itertools
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_FILTER_OPS = {
+    '=': '=', '!=': '<>', '<': '<', '<=': '<=', '>': '>', '>=': '>=',
+    'contains': 'ILIKE', 'in': 'IN', 'is_null': 'IS NULL', 'not_null': 'IS NOT NULL',
+}
+_AGGREGATES = {
+    'count': 'count({})', 'count_distinct': 'count(DISTINCT {})',
+    'sum': 'sum({})', 'avg': 'avg({})', 'min': 'min({})', 'max': 'max({})',
+}
+
+
+class WorkspaceError(Exception):
+    """Invalid operation, unknown result, or workspace unavailable"""
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _duckdb_type(values) -> str:
+    sample = next((v for v in values if v is not None), None)
+    if isinstance(sample, bool):
+        return 'BOOLEAN'
+    if isinstance(sample, int):
+        return 'BIGINT'
+    if isinstance(sample, (float, decimal.Decimal)):
+        return 'DOUBLE'
+    if isinstance(sample, datetime.datetime):
+        return 'TIMESTAMP'
+    if isinstance(sample, datetime.date):
+        return 'DATE'
+    if isinstance(sample, (bytes, bytearray)):
+        return 'BLOB'
+    return 'VARCHAR'
+
+
+def _unique_names(fields: Sequence[str]) -> List[str]:
+    seen = {}
+    names = []
+    for field in fields:
+        count = seen.get(field, 0) + 1
+        seen[field] = count
+        names.append(field if count == 1 else f"{field}_{count}")
+    return names
+
+
+class _Workspace:
+    def __init__(self, connection):
+        self.connection = connection
+        self.lock = threading.Lock()
+        self.results: 'OrderedDict[str, Dict]' = OrderedDict()
+        self.last_used = time.monotonic()
+
+
+class ResultWorkspace:
+    """Keep recent result sets per session in an embedded DuckDB database.
+
+    Each session gets its own in-memory DuckDB connection capped at
+    WORKSPACE_MEMORY_LIMIT, holding its last WORKSPACE_MAX_RESULTS results;
+    the least recently used session is evicted beyond WORKSPACE_MAX_SESSIONS
+    and idle ones after WORKSPACE_IDLE_TTL. Loading happens in the
+    background, so the query response is not delayed. Follow-up filter,
+    sort, aggregate and pivot requests are compiled from a structured spec
+    with validated identifiers and bound values and run locally.
+    Requires the optional ``duckdb`` package (``pyarrow`` speeds up loading).
+
+    Workspaces live in the worker process that ran the query: gunicorn.conf.py
+    runs a single worker unless sticky sessions keep each user on one worker.
+    """
+
+    _workspaces: 'OrderedDict[str, _Workspace]' = OrderedDict()
+    _lock = threading.Lock()
+    _ids = itertools.count(1)
+    _executor = ThreadPoolExecutor(max_workers=Config.WORKSPACE_LOAD_WORKERS, thread_name_prefix='workspace-load')
+
+    @staticmethod
+    def enabled() -> bool:
+        return Config.WORKSPACE_ENABLED
+
+    @staticmethod
+    def _connect():
+        try:
+            import duckdb
+        except ImportError as e:
+            raise WorkspaceError("WORKSPACE_ENABLED requires the 'duckdb' package") from e
+        connection = duckdb.connect(':memory:')
+        connection.execute(f"SET memory_limit = '{Config.WORKSPACE_MEMORY_LIMIT}'")
+        connection.execute(f"SET threads = {int(Config.WORKSPACE_THREADS)}")
+        return connection
+
+    @staticmethod
+    def _workspace(session_key: str, create: bool) -> Optional[_Workspace]:
+        evicted = []
+        with ResultWorkspace._lock:
+            now = time.monotonic()
+            for key, ws in list(ResultWorkspace._workspaces.items()):
+                if now - ws.last_used > Config.WORKSPACE_IDLE_TTL:
+                    evicted.append(ResultWorkspace._workspaces.pop(key))
+            workspace = ResultWorkspace._workspaces.get(session_key)
+            if workspace is None and create:
+                workspace = ResultWorkspace._workspaces[session_key] = _Workspace(ResultWorkspace._connect())
+                while len(ResultWorkspace._workspaces) > Config.WORKSPACE_MAX_SESSIONS:
+                    evicted.append(ResultWorkspace._workspaces.popitem(last=False)[1])
+            if workspace is not None:
+                ResultWorkspace._workspaces.move_to_end(session_key)
+                workspace.last_used = now
+        for ws in evicted:
+            with ws.lock:
+                ws.connection.close()
+        return workspace
+
+    @staticmethod
+    def store(session_key: str, fields: Sequence[str], rows: List[Sequence]) -> Optional[str]:
+        """Schedule loading a result into the session's workspace; returns its result id"""
+        if not ResultWorkspace.enabled() or not fields or len(rows) > Config.WORKSPACE_MAX_ROWS:
+            return None
+        try:
+            workspace = ResultWorkspace._workspace(session_key, create=True)
+        except WorkspaceError as e:
+            logger.warning(f"Result workspace unavailable: {e}")
+            return None
+
+        result_id = f"r{next(ResultWorkspace._ids)}"
+        columns = _unique_names(list(fields))
+        with workspace.lock:
+            future = ResultWorkspace._executor.submit(ResultWorkspace._load, workspace, result_id, columns, rows)
+            workspace.results[result_id] = {'columns': columns, 'loaded': future, 'row_count': len(rows)}
+            while len(workspace.results) > Config.WORKSPACE_MAX_RESULTS:
+                old_id, _ = workspace.results.popitem(last=False)
+                workspace.connection.execute(f"DROP TABLE IF EXISTS {old_id}")
+        return result_id
+
+    @staticmethod
+    def _load(workspace: _Workspace, result_id: str, columns: List[str], rows: List[Sequence]):
+        data = {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+        with workspace.lock:
+            if result_id not in workspace.results:
+                return
+            try:
+                import pyarrow
+                workspace.connection.register(f"{result_id}_arrow", pyarrow.table(data))
+                workspace.connection.execute(f"CREATE TABLE {result_id} AS SELECT * FROM {result_id}_arrow")
+                workspace.connection.unregister(f"{result_id}_arrow")
+                return
+            except ImportError:
+                pass
+            except Exception as e:
+                logger.debug(f"Arrow load failed for {result_id}, inserting rows instead: {e}")
+            definition = ', '.join(f"{_quote(name)} {_duckdb_type(data[name])}" for name in columns)
+            workspace.connection.execute(f"CREATE OR REPLACE TABLE {result_id} ({definition})")
+            placeholders = ', '.join('?' for _ in columns)
+            workspace.connection.executemany(f"INSERT INTO {result_id} VALUES ({placeholders})", [list(r) for r in rows])
+
+    @staticmethod
+    def query(session_key: str, result_id: str, spec: Dict) -> Dict:
+        """Run a filter/sort/group/pivot spec against a stored result"""
+        workspace = ResultWorkspace._workspace(session_key, create=False)
+        entry = workspace.results.get(result_id) if workspace else None
+        if entry is None:
+            raise WorkspaceError('Result not found in workspace (it may have been evicted).')
+        entry['loaded'].result(timeout=Config.WORKSPACE_LOAD_TIMEOUT)
+
+        columns = entry['columns']
+        where, params = ResultWorkspace._where(columns, spec.get('filters') or [])
+        limit = max(1, min(int(spec.get('limit') or 1000), Config.WORKSPACE_MAX_PAGE))
+        offset = max(0, int(spec.get('offset') or 0))
+        start = time.perf_counter()
+        with workspace.lock:
+            if spec.get('pivot'):
+                sql, select_params, output = ResultWorkspace._pivot(workspace, result_id, columns, spec['pivot'], where, params)
+            else:
+                sql, select_params, output = ResultWorkspace._select(result_id, columns, spec, where)
+            sql = f"{sql}{ResultWorkspace._order_by(output, spec.get('sort') or [])}"
+            total = workspace.connection.execute(f"SELECT count(*) FROM ({sql}) AS t", select_params + params).fetchone()[0]
+            cursor = workspace.connection.execute(f"{sql} LIMIT {limit} OFFSET {offset}", select_params + params)
+            rows = cursor.fetchall()
+            fields = [d[0] for d in cursor.description]
+        return {
+            'fields': fields,
+            'rows': rows,
+            'total': total,
+            'offset': offset,
+            'execution_time_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    @staticmethod
+    def _column(columns: List[str], name) -> str:
+        if name not in columns:
+            raise WorkspaceError(f"Unknown column: {name}")
+        return _quote(name)
+
+    @staticmethod
+    def _where(columns: List[str], filters: List[Dict]) -> Tuple[str, List]:
+        clauses, params = [], []
+        for f in filters:
+            column = ResultWorkspace._column(columns, f.get('column'))
+            op = _FILTER_OPS.get(f.get('op'))
+            if op is None:
+                raise WorkspaceError(f"Unsupported filter: {f.get('op')}")
+            if op in ('IS NULL', 'IS NOT NULL'):
+                clauses.append(f"{column} {op}")
+            elif op == 'IN':
+                values = list(f.get('value') or [])
+                if not values:
+                    raise WorkspaceError("'in' filter needs a non-empty list")
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+            elif op == 'ILIKE':
+                clauses.append(f"CAST({column} AS VARCHAR) ILIKE ?")
+                params.append(f"%{f.get('value', '')}%")
+            else:
+                clauses.append(f"{column} {op} ?")
+                params.append(f.get('value'))
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    @staticmethod
+    def _aggregate(columns: List[str], agg: Dict) -> Tuple[str, str]:
+        fn = agg.get('fn')
+        if fn not in _AGGREGATES:
+            raise WorkspaceError(f"Unsupported aggregate: {fn}")
+        column = agg.get('column')
+        expression = '*' if fn == 'count' and not column else ResultWorkspace._column(columns, column)
+        return _AGGREGATES[fn].format(expression), agg.get('alias') or (f"{fn}_{column}" if column else fn)
+
+    @staticmethod
+    def _select(result_id: str, columns: List[str], spec: Dict, where: str) -> Tuple[str, List, List[str]]:
+        group_by = [ResultWorkspace._column(columns, c) for c in spec.get('group_by') or []]
+        aggregates = [ResultWorkspace._aggregate(columns, a) for a in spec.get('aggregates') or []]
+        if not group_by and not aggregates:
+            return f"SELECT * FROM {result_id}{where}", [], columns
+        select = group_by + [f"{expr} AS {_quote(alias)}" for expr, alias in aggregates]
+        sql = f"SELECT {', '.join(select)} FROM {result_id}{where}"
+        if group_by:
+            sql += f" GROUP BY {', '.join(group_by)}"
+        return sql, [], list(spec.get('group_by') or []) + [alias for _, alias in aggregates]
+
+    @staticmethod
+    def _pivot(workspace: _Workspace, result_id: str, columns: List[str], pivot: Dict, where: str,
+               params: List) -> Tuple[str, List, List[str]]:
+        # Conditional aggregation keeps every value bound as a parameter
+        on = ResultWorkspace._column(columns, pivot.get('on'))
+        rows = [ResultWorkspace._column(columns, c) for c in pivot.get('rows') or []]
+        fn = pivot.get('fn', 'sum')
+        if fn not in _AGGREGATES:
+            raise WorkspaceError(f"Unsupported aggregate: {fn}")
+        value = ResultWorkspace._column(columns, pivot.get('value')) if pivot.get('value') else '1'
+        distinct = workspace.connection.execute(
+            f"SELECT DISTINCT {on} FROM {result_id}{where} ORDER BY 1 NULLS LAST LIMIT {Config.WORKSPACE_PIVOT_MAX_COLUMNS + 1}",
+            params
+        ).fetchall()
+        if len(distinct) > Config.WORKSPACE_PIVOT_MAX_COLUMNS:
+            raise WorkspaceError(f"Pivot column has more than {Config.WORKSPACE_PIVOT_MAX_COLUMNS} distinct values")
+        select, select_params, output = list(rows), [], list(pivot.get('rows') or [])
+        for (key,) in distinct:
+            label = 'NULL' if key is None else str(key)
+            condition = f"{on} IS NULL" if key is None else f"{on} = ?"
+            if key is not None:
+                select_params.append(key)
+            select.append(f"{_AGGREGATES[fn].format(f'CASE WHEN {condition} THEN {value} END')} AS {_quote(label)}")
+            output.append(label)
+        sql = f"SELECT {', '.join(select)} FROM {result_id}{where}"
+        if rows:
+            sql += f" GROUP BY {', '.join(rows)}"
+        return sql, select_params, output
+
+    @staticmethod
+    def _order_by(output: List[str], sort: List[Dict]) -> str:
+        terms = []
+        for s in sort:
+            if s.get('column') not in output:
+                raise WorkspaceError(f"Cannot sort by {s.get('column')}")
+            terms.append(f"{_quote(s['column'])} {'DESC' if s.get('desc') else 'ASC'} NULLS LAST")
+        return f" ORDER BY {', '.join(terms)}" if terms else ''
+
+    @staticmethod
+    def drop(session_key: str):
+        """Close a session's workspace (e.g. on disconnect)"""
+        with ResultWorkspace._lock:
+            workspace = ResultWorkspace._workspaces.pop(session_key, None)
+        if workspace is not None:
+            with workspace.lock:
+                workspace.connection.close()
@@ -0,0 +1,41 @@
+"""Gunicorn settings for DB-Genie.
+
+The app is built once in the master and forked into workers. Heavy SDK
+modules are imported before forking and the GC is told to leave those
+objects alone, so workers share them copy-on-write instead of each paying
+the import time and memory. Override any setting with GUNICORN_* env vars
+or command-line flags.
+
+Connection settings, chat sessions, query jobs, result workspaces, query
+statistics and admission limits are held per worker process, so the
+default is one worker with threads. More than one worker needs a proxy
+that pins each session to one worker; set GUNICORN_STICKY_SESSIONS=true
+once it does.
+"""
+
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+if workers > 1 and os.getenv('GUNICORN_STICKY_SESSIONS', 'false').lower() != 'true':
+    raise RuntimeError(
+        'GUNICORN_WORKERS > 1 needs sticky sessions (per-worker state); '
+        'route each session to one worker and set GUNICORN_STICKY_SESSIONS=true'
+    )
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+# Threaded workers: long-lived responses (STATUS_STREAM_ENABLED SSE) each hold a
+# thread, so switch to an async worker class before enabling them
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = True
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, before workers fork"""
+    from app import preload_sdks
+
+    preload_sdks()
+    # Move everything allocated so far to a permanent generation so GC
+    # passes in the workers do not touch (and un-share) those pages
+    gc.freeze()
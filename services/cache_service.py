@@ -0,0 +1,262 @@
+"""Pluggable cache/state backend shared across gunicorn workers"""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _encode(value) -> str:
+    # JSON rather than pickle: shared stores must never execute what they load
+    return json.dumps(value, default=str, separators=(',', ':'))
+
+
+class LocalLRUBackend:
+    """In-process LRU with per-entry TTL (one copy per worker)"""
+
+    name = 'local'
+
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._data = OrderedDict()
+        # Version counters live outside the LRU so eviction cannot reset them
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            value, expires_at = item
+            if expires_at and expires_at < time.time():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: Optional[float]):
+        expires_at = time.time() + ttl if ttl else 0
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+
+class SharedMemoryBackend:
+    """Single-host store shared by all workers: SQLite in WAL mode on /dev/shm.
+
+    SQLite memory-maps the file and handles cross-process locking, so every
+    worker on the host reads the same entries without a network hop.
+    """
+
+    name = 'shared'
+
+    def __init__(self, path: str, max_entries: int):
+        self._path = path
+        self._max_entries = max_entries
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, touched_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_touched ON cache (touched_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("PRAGMA mmap_size=268435456")
+            self._local.conn = conn
+        return conn
+
+    # Reads refresh an entry's recency at most this often (seconds), so hot
+    # keys do not turn every read into a write
+    TOUCH_INTERVAL = 1.0
+
+    def get(self, key: str):
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, expires_at, touched_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None or (row[1] and row[1] < now):
+            return _MISSING
+        if now - row[2] >= self.TOUCH_INTERVAL:
+            conn.execute("UPDATE cache SET touched_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value, ttl: Optional[float]):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, touched_at) VALUES (?, ?, ?, ?)",
+            (key, _encode(value), now + ttl if ttl else 0, now)
+        )
+        # Cheap probabilistic trim (about 1 in 64 writes) keeps the table bounded
+        # without a sweeper thread; least recently read or written entries go first
+        if random.random() < 1 / 64:
+            conn.execute(
+                "DELETE FROM cache WHERE instr(key, ':__version__') = 0 AND ("
+                "(expires_at > 0 AND expires_at < ?) OR key IN "
+                "(SELECT key FROM cache ORDER BY touched_at DESC LIMIT -1 OFFSET ?))",
+                (now, self._max_entries)
+            )
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def incr(self, key: str) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            value = (json.loads(row[0]) if row else 0) + 1
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, touched_at) VALUES (?, ?, 0, ?)",
+                (key, _encode(value), time.time())
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+
+class RedisBackend:
+    """Redis (or any RESP-compatible server such as Valkey/KeyDB/Dragonfly)"""
+
+    name = 'redis'
+
+    def __init__(self, url: str, prefix: str = 'dbgenie:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key: str):
+        raw = self._client.get(self._prefix + key)
+        return _MISSING if raw is None else json.loads(raw)
+
+    def set(self, key: str, value, ttl: Optional[float]):
+        self._client.set(self._prefix + key, _encode(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key: str):
+        self._client.delete(self._prefix + key)
+
+    def incr(self, key: str) -> int:
+        return int(self._client.incr(self._prefix + key))
+
+
+class CacheService:
+    """Namespaced cache with versioned invalidation.
+
+    Keys are stored under the namespace's current version, so
+    ``invalidate(namespace)`` is a single counter bump that every worker
+    sharing the backend observes on its next read; stale entries simply
+    age out.
+    """
+
+    _backend = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_backend(cls):
+        if cls._backend is None:
+            with cls._lock:
+                if cls._backend is None:
+                    cls._backend = cls._build_backend(Config.CACHE_BACKEND)
+                    logger.info(f"Cache backend: {cls._backend.name}")
+        return cls._backend
+
+    @classmethod
+    def set_backend(cls, backend):
+        """Swap the backend (e.g. in tests or benchmarks)"""
+        with cls._lock:
+            cls._backend = backend
+
+    @staticmethod
+    def _build_backend(name: str):
+        if name == 'local':
+            return LocalLRUBackend(Config.CACHE_MAX_ENTRIES)
+        if name == 'shared':
+            path = Config.CACHE_SHARED_PATH or os.path.join(
+                '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'dbgenie-cache.sqlite'
+            )
+            return SharedMemoryBackend(path, Config.CACHE_MAX_ENTRIES)
+        if name == 'redis':
+            return RedisBackend(Config.CACHE_REDIS_URL)
+        raise ValueError(f"Unknown cache backend: {name}")
+
+    @staticmethod
+    def _version(backend, namespace: str) -> int:
+        version = backend.get(f"{namespace}:__version__")
+        return 0 if version is _MISSING else int(version)
+
+    @staticmethod
+    def get(namespace: str, key: str, default: Any = None) -> Any:
+        try:
+            backend = CacheService.get_backend()
+            version = CacheService._version(backend, namespace)
+            value = backend.get(f"{namespace}:v{version}:{key}")
+            return default if value is _MISSING else value
+        except Exception as e:
+            # The cache is an optimisation: fall through to the source of truth
+            logger.warning(f"Cache read failed for {namespace}:{key}: {e}")
+            return default
+
+    @staticmethod
+    def set(namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        try:
+            backend = CacheService.get_backend()
+            version = CacheService._version(backend, namespace)
+            backend.set(f"{namespace}:v{version}:{key}", value, Config.CACHE_DEFAULT_TTL if ttl is None else ttl)
+        except Exception as e:
+            logger.warning(f"Cache write failed for {namespace}:{key}: {e}")
+
+    @staticmethod
+    def delete(namespace: str, key: str):
+        try:
+            backend = CacheService.get_backend()
+            version = CacheService._version(backend, namespace)
+            backend.delete(f"{namespace}:v{version}:{key}")
+        except Exception as e:
+            logger.warning(f"Cache delete failed for {namespace}:{key}: {e}")
+
+    @staticmethod
+    def invalidate(namespace: str) -> Optional[int]:
+        """Drop every entry in ``namespace`` for all workers; returns the new version"""
+        try:
+            return CacheService.get_backend().incr(f"{namespace}:__version__")
+        except Exception as e:
+            logger.warning(f"Cache invalidation failed for {namespace}: {e}")
+            return None
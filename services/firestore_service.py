@@ -1,20 +1,33 @@
 # File: services/firestore_service.py
 """Firestore service for conversation storage"""
 
-import firebase_admin
-from firebase_admin import credentials, firestore
 from config import Config
 from datetime import datetime
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
 class FirestoreService:
     _db = None
+    # firestore.ArrayUnion, or the emulator's equivalent; set by initialize()
+    _array_union = None
+    _init_lock = threading.Lock()
 
     @classmethod
     def initialize(cls):
-        """Initialize Firebase Admin SDK"""
+        """Initialize the conversation store for Config.FIRESTORE_BACKEND"""
+        if Config.FIRESTORE_BACKEND == 'memory':
+            from services.local_backends import InMemoryFirestore, ArrayUnion
+            cls._db = InMemoryFirestore()
+            cls._array_union = ArrayUnion
+            logger.info("Using in-memory Firestore emulator")
+            return
+        if Config.FIRESTORE_BACKEND != 'firebase':
+            raise ValueError(f"Unknown Firestore backend: {Config.FIRESTORE_BACKEND}")
+        # Heavy SDK imports deferred until the first conversation access
+        import firebase_admin
+        from firebase_admin import credentials, firestore
         if not firebase_admin._apps:
             try:
                 # Validate credentials first
@@ -33,13 +46,24 @@ class FirestoreService:
             except Exception as e:
                 logger.error(f"Failed to initialize Firebase Admin SDK: {e}")
                 raise
+        cls._array_union = firestore.ArrayUnion
         cls._db = firestore.client()
 
+    @classmethod
+    def set_db(cls, db, array_union=None):
+        """Use the given Firestore-compatible client (e.g. an emulator)"""
+        if array_union is None:
+            from services.local_backends import ArrayUnion as array_union
+        cls._db = db
+        cls._array_union = array_union
+
     @classmethod
     def get_db(cls):
-        """Get Firestore database instance"""
+        """Get Firestore database instance, initializing it on first use"""
         if cls._db is None:
-            cls.initialize()
+            with cls._init_lock:
+                if cls._db is None:
+                    cls.initialize()
         return cls._db
 
     @staticmethod
@@ -57,7 +81,7 @@ class FirestoreService:
                 })
 
             conversation_ref.update({
-                'messages': firestore.ArrayUnion([{
+                'messages': FirestoreService._array_union([{
                     'sender': sender,
                     'content': message,
                     'timestamp': datetime.now()
@@ -1,25 +1,125 @@
 """Gemini AI service for chat functionality with DB-Genie identity"""
 import logging
 import textwrap
-import google.generativeai as genai
+import threading
+import time
 from config import Config
+from services.cache_service import CacheService
+from services.response_cache import ResponseCache
+from services.intent_service import IntentService
+from services.resilience import CircuitBreaker, CircuitOpenError, backoff_delay, is_retryable
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
-genai.configure(api_key=Config.GEMINI_API_KEY)
-
-# Load Gemini model (as per current best practices)
-model = genai.GenerativeModel(model_name="models/gemini-2.5-flash")
+# Chat model for the configured backend, built on first use
+_model = None
+_model_lock = threading.Lock()
+# Optional second model used while the primary is failing
+_fallback_model = None
+# One circuit breaker per model name
+_breakers = {}
 
 # In-memory chat session store
 chat_sessions = {}
+# Version of the shared history each local session was built from
+_session_versions = {}
+# Model each local session talks to (the fallback after a failover)
+_session_models = {}
+# Context notes (e.g. schema changes) waiting for each conversation's next prompt
+_pending_notes = {}
+_notes_lock = threading.Lock()
+# Older notes are dropped beyond this many per conversation
+_MAX_PENDING_NOTES = 10
+
+# Shared cache namespace holding {'version', 'history'} per conversation, so a
+# conversation can continue on whichever worker receives the next request
+CHAT_HISTORY_NAMESPACE = 'chat_history'
+# The system prompt and its acknowledgement open every session's history
+_PREAMBLE_LENGTH = 2
+
+class _TextChunk:
+    """Chunk carrying text the service adds to a stream itself"""
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+class _InterruptedNotice(_TextChunk):
+    """Closing notice of a stream that could not be completed"""
+    __slots__ = ()
+    interrupted = True
+
 
 class GeminiService:
 
     # Settings
     STRICT_MODE = True
     ENABLE_CONTEXT_ENHANCEMENT = True
+    MODEL_NAME = "models/gemini-2.5-flash"
+
+    @staticmethod
+    def get_model():
+        """Return the chat model for Config.LLM_BACKEND ('gemini' or 'fake')"""
+        global _model
+        if _model is None:
+            with _model_lock:
+                if _model is None:
+                    _model = GeminiService._build_model(Config.LLM_BACKEND)
+        return _model
+
+    @staticmethod
+    def set_model(model):
+        """Swap the chat model (anything with ``start_chat``); clears existing sessions"""
+        global _model
+        with _model_lock:
+            _model = model
+        chat_sessions.clear()
+        _session_versions.clear()
+        _session_models.clear()
+        with _notes_lock:
+            _pending_notes.clear()
+
+    @staticmethod
+    def get_fallback_model():
+        """Model named by GEMINI_FALLBACK_MODEL, or None when no fallback is configured"""
+        global _fallback_model
+        if not Config.GEMINI_FALLBACK_MODEL or Config.LLM_BACKEND != 'gemini':
+            return None
+        if _fallback_model is None:
+            with _model_lock:
+                if _fallback_model is None:
+                    _fallback_model = GeminiService._build_model('gemini', Config.GEMINI_FALLBACK_MODEL)
+        return _fallback_model
+
+    @staticmethod
+    def _breaker(model_name):
+        with _model_lock:
+            if model_name not in _breakers:
+                _breakers[model_name] = CircuitBreaker(
+                    model_name, Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_RESET_SECONDS
+                )
+            return _breakers[model_name]
+
+    @staticmethod
+    def _build_model(backend, model_name=None):
+        if backend == 'fake':
+            from services.local_backends import FakeChatModel
+            logger.info('Using simulated LLM backend')
+            return FakeChatModel(
+                first_token_latency=Config.FAKE_LLM_FIRST_TOKEN_MS / 1000,
+                tokens_per_second=Config.FAKE_LLM_TOKENS_PER_SEC,
+                response_tokens=Config.FAKE_LLM_RESPONSE_TOKENS,
+                chunk_tokens=Config.FAKE_LLM_CHUNK_TOKENS
+            )
+        if backend != 'gemini':
+            raise ValueError(f"Unknown LLM backend: {backend}")
+        # Heavy SDK import deferred until the first chat needs it
+        import google.generativeai as genai
+        # Configure Gemini API
+        genai.configure(api_key=Config.GEMINI_API_KEY)
+        # Load Gemini model (as per current best practices)
+        return genai.GenerativeModel(model_name=model_name or GeminiService.MODEL_NAME)
 
     @staticmethod
     def get_system_prompt():
@@ -69,43 +169,243 @@ class GeminiService:
 
     @staticmethod
     def get_or_create_chat_session(conversation_id, history=None):
-        """Create a Gemini chat session if it doesn't exist"""
-        if conversation_id not in chat_sessions:
-            system_message = {
-                "role": "user",
-                "parts": [GeminiService.get_system_prompt()]
-            }
-            system_response = {
-                "role": "model",
-                "parts": [
-                    "I understand. I am DB-Genie from ABN Alliance. How can I assist with your database tasks today?"
-                ]
-            }
-
-            initial_history = [system_message, system_response]
-            if history:
-                initial_history.extend(history)
-
-            chat_sessions[conversation_id] = model.start_chat(history=initial_history)
+        """Create a Gemini chat session if it doesn't exist.
+
+        A local session is rebuilt when another worker has published a newer
+        history for the conversation to the shared cache.
+        """
+        shared = CacheService.get(CHAT_HISTORY_NAMESPACE, conversation_id)
+        shared_version = shared['version'] if shared else 0
+
+        if conversation_id in chat_sessions and shared_version <= _session_versions.get(conversation_id, 0):
+            return chat_sessions[conversation_id]
+
+        if shared:
+            history = shared['history']
+
+        system_message = {
+            "role": "user",
+            "parts": [GeminiService.get_system_prompt()]
+        }
+        system_response = {
+            "role": "model",
+            "parts": [
+                "I understand. I am DB-Genie from ABN Alliance. How can I assist with your database tasks today?"
+            ]
+        }
+
+        initial_history = [system_message, system_response]
+        if history:
+            initial_history.extend(history)
+
+        chat_sessions[conversation_id] = GeminiService.get_model().start_chat(history=initial_history)
+        _session_versions[conversation_id] = shared_version
+        _session_models[conversation_id] = GeminiService.MODEL_NAME
+
+        # This worker now holds a session that must hear about DDL changes
+        from database.schema_watcher import SchemaWatcher
+        SchemaWatcher.ensure_started()
 
         return chat_sessions[conversation_id]
 
     @staticmethod
-    def send_message(conversation_id, message, history=None, retry_attempts=3):
+    def _serialize_history(history):
+        """Convert SDK Content objects (or plain dicts) to JSON-safe dicts"""
+        items = []
+        for content in history:
+            if isinstance(content, dict):
+                items.append({'role': content['role'], 'parts': [str(part) for part in content['parts']]})
+            else:
+                items.append({'role': content.role, 'parts': [getattr(part, 'text', '') for part in content.parts]})
+        return items
+
+    @staticmethod
+    def _publish_history(conversation_id):
+        """Share the session's history with the other workers"""
+        session = chat_sessions.get(conversation_id)
+        if session is None or not hasattr(session, 'history'):
+            return
+        try:
+            version = _session_versions.get(conversation_id, 0) + 1
+            CacheService.set(CHAT_HISTORY_NAMESPACE, conversation_id, {
+                'version': version,
+                'history': GeminiService._serialize_history(session.history[_PREAMBLE_LENGTH:])
+            }, ttl=Config.CHAT_HISTORY_TTL)
+            _session_versions[conversation_id] = version
+        except Exception as e:
+            logger.warning(f'Failed to publish chat history for {conversation_id}: {e}')
+
+    @staticmethod
+    def _publish_when_done(conversation_id, responses):
+        """Pass the stream through, then publish the completed exchange"""
+        for chunk in responses:
+            yield chunk
+        GeminiService._publish_history(conversation_id)
+
+    @staticmethod
+    def send_message(conversation_id, message, history=None, retry_attempts=None):
         """Send a message to Gemini and get response"""
         chat_session = GeminiService.get_or_create_chat_session(conversation_id, history)
 
+        # Template questions ("show tables", "count rows in orders") are answered locally
+        quick_answer = IntentService.answer(message)
+        if quick_answer is not None:
+            GeminiService._record_exchange(chat_session, message, quick_answer)
+            return GeminiService._publish_when_done(conversation_id, ResponseCache.replay(quick_answer))
+
+        scope = None
+        if ResponseCache.enabled():
+            scope = ResponseCache.scope()
+            cached = ResponseCache.lookup(scope, message) if scope else None
+            if cached is not None:
+                GeminiService._record_exchange(chat_session, message, cached)
+                return GeminiService._publish_when_done(conversation_id, ResponseCache.replay(cached))
+        prompt = message
+
         if GeminiService.ENABLE_CONTEXT_ENHANCEMENT:
             message = GeminiService._enhance_message_if_needed(message)
 
-        for attempt in range(retry_attempts):
+        with _notes_lock:
+            notes = _pending_notes.pop(conversation_id, None)
+        if notes:
+            message = '\n\n'.join(notes + [message])
+
+        from database.index_advisor import IndexAdvisor
+        if IndexAdvisor.is_index_question(message):
+            advice = IndexAdvisor.assistant_context()
+            if advice:
+                message = f"{message}\n\n{advice}"
+                # Advice follows the live workload, so it is not cached
+                scope = None
+
+        responses = GeminiService._stream_with_retries(
+            conversation_id, chat_session, message,
+            Config.LLM_RETRY_ATTEMPTS if retry_attempts is None else retry_attempts
+        )
+        if scope:
+            responses = ResponseCache.record(scope, prompt, responses)
+        try:
+            return GeminiService._started(GeminiService._publish_when_done(conversation_id, responses))
+        except Exception:
+            if notes:
+                # The model never saw them; keep them for the next attempt
+                with _notes_lock:
+                    _pending_notes[conversation_id] = (notes + _pending_notes.get(conversation_id, []))[-_MAX_PENDING_NOTES:]
+            raise
+
+    @staticmethod
+    def _started(responses):
+        """Run a stream up to its first chunk now, so setup errors (and an open
+        circuit) reach the caller before any response headers are sent"""
+        try:
+            first = next(responses)
+        except StopIteration:
+            return iter(())
+
+        def resume():
+            yield first
+            yield from responses
+
+        return resume()
+
+    @staticmethod
+    def _pick_model():
+        """(name, model) to call next: the primary unless its circuit is open"""
+        if GeminiService._breaker(GeminiService.MODEL_NAME).allow():
+            return GeminiService.MODEL_NAME, GeminiService.get_model()
+        fallback = GeminiService.get_fallback_model()
+        if fallback is not None and GeminiService._breaker(Config.GEMINI_FALLBACK_MODEL).allow():
+            logger.warning(f'Primary model unavailable, using fallback {Config.GEMINI_FALLBACK_MODEL}')
+            return Config.GEMINI_FALLBACK_MODEL, fallback
+        raise CircuitOpenError('The assistant is temporarily unavailable, please retry shortly.')
+
+    @staticmethod
+    def _stream_with_retries(conversation_id, chat_session, message, retry_attempts):
+        """Stream a reply, retrying transient failures with jittered backoff.
+
+        A failure before the first chunk retries the request from the same
+        history (on the fallback model if the primary's circuit opened).
+        A failure after text was streamed asks a fresh session to continue
+        from what was already sent, so nothing is repeated or lost. Retried
+        sessions replace the conversation's session with a clean history,
+        built on the model that answered; the next message moves it back
+        once the primary is available again.
+        """
+        base_history = list(chat_session.history)
+        model_name, model = GeminiService._pick_model()
+        session = chat_session if _session_models.get(conversation_id) == model_name else None
+        emitted = []
+        failures = 0
+        resumes = 0
+
+        while True:
+            prompt = message
+            if session is None:
+                history = base_history
+                if emitted:
+                    history = base_history + [
+                        {'role': 'user', 'parts': [message]},
+                        {'role': 'model', 'parts': [''.join(emitted)]}
+                    ]
+                    prompt = ('Your previous answer was cut off. Continue it exactly where it stopped, '
+                              'without repeating anything already written.')
+                session = model.start_chat(history=history)
+            breaker = GeminiService._breaker(model_name)
+            settled = False
             try:
-                responses = chat_session.send_message(message, stream=True)
-                return responses
+                for chunk in session.send_message(prompt, stream=True):
+                    emitted.append(getattr(chunk, 'text', '') or '')
+                    yield chunk
+                breaker.record_success()
+                settled = True
+                break
             except Exception as e:
-                logger.error(f'Attempt {attempt + 1} failed: {e}')
-                if attempt == retry_attempts - 1:
-                    raise e
+                retryable = is_retryable(e)
+                if retryable:
+                    breaker.record_failure()
+                    settled = True
+                session = None
+                if emitted:
+                    resumes += 1
+                    logger.warning(f'Stream for {conversation_id} failed after {len(emitted)} chunks: {e}')
+                    if not retryable or resumes > Config.LLM_RESUME_ATTEMPTS:
+                        notice = '\n\n[The response was interrupted. Please ask again to get the rest.]'
+                        emitted.append(notice)
+                        yield _InterruptedNotice(notice)
+                        break
+                else:
+                    failures += 1
+                    logger.error(f'Attempt {failures} failed: {e}')
+                    if not retryable or failures >= retry_attempts:
+                        # Do not leave a session holding a half-finished request
+                        chat_sessions[conversation_id] = model.start_chat(history=base_history)
+                        _session_models[conversation_id] = model_name
+                        raise
+            finally:
+                # Non-retryable errors and closed streams say nothing about the model
+                if not settled:
+                    breaker.release()
+            time.sleep(backoff_delay(failures + resumes - 1, Config.LLM_RETRY_BASE_DELAY, Config.LLM_RETRY_MAX_DELAY))
+            model_name, model = GeminiService._pick_model()
+
+        if session is not chat_session:
+            # Keep one clean exchange in the history, whatever it took to produce it
+            chat_sessions[conversation_id] = model.start_chat(history=base_history + [
+                {'role': 'user', 'parts': [message]},
+                {'role': 'model', 'parts': [''.join(emitted)]}
+            ])
+            _session_models[conversation_id] = model_name
+
+    @staticmethod
+    def _record_exchange(chat_session, message, reply):
+        """Add an answer produced without the LLM to the session history"""
+        try:
+            chat_session.history.extend([
+                {'role': 'user', 'parts': [message]},
+                {'role': 'model', 'parts': [reply]}
+            ])
+        except Exception as e:
+            logger.warning(f'Could not record cached exchange in chat history: {e}')
 
     @staticmethod
     def _enhance_message_if_needed(message):
@@ -138,17 +438,36 @@ class GeminiService:
     def notify_gemini(conversation_id, message):
         """Send message to Gemini silently (no response expected)"""
         logger.debug(f'Notifying Gemini: {message}')
-        if conversation_id in chat_sessions:
+        if conversation_id in chat_sessions or CacheService.get(CHAT_HISTORY_NAMESPACE, conversation_id):
             try:
-                chat_sessions[conversation_id].send_message(message)
+                GeminiService.get_or_create_chat_session(conversation_id).send_message(message)
+                GeminiService._publish_history(conversation_id)
             except Exception as e:
                 logger.error(f'Error notifying Gemini: {e}')
         else:
             logger.warning(f'No chat session found for conversation_id: {conversation_id}')
 
+    @staticmethod
+    def queue_note_for_all(message):
+        """Queue a note for every chat session held by this worker.
+
+        Nothing is sent now; the note is put in front of each conversation's
+        next prompt to the model, so idle conversations cost no calls.
+        """
+        with _notes_lock:
+            for conversation_id in list(chat_sessions):
+                notes = _pending_notes.setdefault(conversation_id, [])
+                notes.append(message)
+                del notes[:-_MAX_PENDING_NOTES]
+
     @staticmethod
     def reset_chat_session(conversation_id):
         """Reset the chat session for reuse"""
+        CacheService.delete(CHAT_HISTORY_NAMESPACE, conversation_id)
+        _session_versions.pop(conversation_id, None)
+        _session_models.pop(conversation_id, None)
+        with _notes_lock:
+            _pending_notes.pop(conversation_id, None)
         if conversation_id in chat_sessions:
             del chat_sessions[conversation_id]
             logger.info(f'Chat session reset for conversation_id: {conversation_id}')
@@ -0,0 +1,138 @@
+"""Local fast path for trivial schema questions (no LLM round-trip)"""
+
+import logging
+import re
+from typing import Dict, List, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = r"(?:(?:can|could) you )?(?:please )?(?:(?:show|list|get|give|display)(?: me)? )?(?:all )?(?:the )?"
+_TABLE = r"(?:the )?`?(?P<table>\w+)`?(?: table)?"
+
+# (intent, pattern) in priority order; a prompt must match in full
+_CATALOGUE = [
+    ('tables', re.compile(_PREFIX + r"(?:what are the )?tables(?: (?:in|of) (?:this|the|my) (?:database|db))?")),
+    ('tables', re.compile(r"what tables (?:are there|do (?:i|we) have|exist)")),
+    ('columns', re.compile(r"(?:describe|desc) " + _TABLE)),
+    ('columns', re.compile(_PREFIX + r"(?:columns|fields|schema|structure) (?:of|in|for) " + _TABLE)),
+    ('count', re.compile(_PREFIX + r"(?:count|number) (?:of )?(?:the )?rows (?:in|of) " + _TABLE)),
+    ('count', re.compile(r"how many rows (?:are )?(?:in|does) " + _TABLE + r"(?: have)?")),
+    ('count', re.compile(r"count " + _TABLE)),
+    ('preview', re.compile(_PREFIX + r"(?:first|top) (?P<limit>\d+) (?:rows|records) (?:of|from|in) " + _TABLE)),
+    ('preview', re.compile(_PREFIX + r"(?P<limit>\d+) (?:rows|records) (?:of|from|in) " + _TABLE)),
+    ('preview', re.compile(r"(?:preview|sample|show(?: me)?) " + _TABLE)),
+]
+
+
+class IntentService:
+    """Recognize template questions and answer them from cached metadata.
+
+    SQL comes from ``DatabaseSecurity.get_safe_query_template`` with a table
+    name resolved against the selected database, so only known tables ever
+    reach a query. Anything that does not match the catalogue in full, or
+    names an unknown table, returns None and goes to the LLM.
+    """
+
+    @staticmethod
+    def _normalize(prompt: str) -> str:
+        text = ' '.join(prompt.lower().split())
+        return text.rstrip(' ?.!').replace(' please', '')
+
+    @staticmethod
+    def match(prompt: str) -> Optional[Dict]:
+        """Return {'intent', 'table', 'limit'} for a catalogue question, else None"""
+        text = IntentService._normalize(prompt)
+        if len(text) > 120:
+            return None
+        for intent, pattern in _CATALOGUE:
+            found = pattern.fullmatch(text)
+            if found:
+                groups = found.groupdict()
+                return {'intent': intent, 'table': groups.get('table'), 'limit': groups.get('limit')}
+        return None
+
+    @staticmethod
+    def _resolve_table(name: str, tables: List[str]) -> Optional[str]:
+        by_lower = {t.lower(): t for t in tables}
+        for candidate in (name, name + 's', name[:-1] if name.endswith('s') else None):
+            if candidate and candidate in by_lower:
+                return by_lower[candidate]
+        return None
+
+    @staticmethod
+    def answer(prompt: str) -> Optional[str]:
+        """Markdown answer for a catalogue question, or None to fall back to the LLM"""
+        if not Config.NL_FAST_PATH_ENABLED:
+            return None
+        matched = IntentService.match(prompt)
+        if matched is None:
+            return None
+
+        from database.connection import get_current_db_name
+        from database.operations import DatabaseOperations
+
+        db_name = get_current_db_name()
+        if not db_name:
+            return None
+        try:
+            tables = DatabaseOperations.get_tables(db_name)
+            if matched['intent'] == 'tables':
+                return IntentService._answer_tables(db_name, tables)
+
+            table = IntentService._resolve_table(matched['table'], tables)
+            if table is None:
+                return None
+            if matched['intent'] == 'columns':
+                return IntentService._answer_columns(table, DatabaseOperations.get_table_schema(table, db_name))
+            if matched['intent'] == 'count':
+                # Cached or estimated only: the chat request never waits on COUNT(*)
+                row_count = DatabaseOperations.get_table_row_count_info(table, db_name, inline_exact=False)
+                return IntentService._answer_count(table, row_count)
+            limit = min(int(matched['limit'] or 10), Config.NL_FAST_PATH_MAX_ROWS)
+            return IntentService._answer_preview(table, limit)
+        except Exception as e:
+            # Any metadata problem: let the LLM handle the question instead
+            logger.debug(f"Fast path skipped for '{prompt}': {e}")
+            return None
+
+    @staticmethod
+    def _sql(query_type: str, table: str, columns: str = '', conditions: str = '') -> str:
+        from database.security import DatabaseSecurity
+
+        template = DatabaseSecurity.get_safe_query_template(query_type, table)
+        return ' '.join(template.format(columns=columns, conditions=conditions).split())
+
+    @staticmethod
+    def _answer_tables(db_name: str, tables: List[str]) -> str:
+        if not tables:
+            return f"The database `{db_name}` has no tables."
+        listing = '\n'.join(f"- `{t}`" for t in tables)
+        return f"The database `{db_name}` has {len(tables)} tables:\n\n{listing}\n"
+
+    @staticmethod
+    def _answer_columns(table: str, columns: List[Dict]) -> str:
+        rows = '\n'.join(
+            f"| `{c['name']}` | {c['type']} | {c['nullable']} | {c['key_type'] or ''} |" for c in columns
+        )
+        return (
+            f"Table `{table}` has {len(columns)} columns:\n\n"
+            f"| Column | Type | Nullable | Key |\n|---|---|---|---|\n{rows}\n\n"
+            f"```sql\n{IntentService._sql('SELECT', table, '*', 'LIMIT 10')}\n```\n"
+        )
+
+    @staticmethod
+    def _answer_count(table: str, row_count: Dict) -> str:
+        from database.operations import format_row_count
+
+        return (
+            f"Table `{table}` has {format_row_count(row_count)} rows. "
+            f"Run this for the current exact count:\n\n```sql\n{IntentService._sql('COUNT', table)}\n```\n"
+        )
+
+    @staticmethod
+    def _answer_preview(table: str, limit: int) -> str:
+        return (
+            f"Here are the first {limit} rows of `{table}`. Click **Run** to see them:\n\n"
+            f"```sql\n{IntentService._sql('SELECT', table, '*', f'LIMIT {limit}')}\n```\n"
+        )
@@ -0,0 +1,179 @@
+"""Deterministic local stand-ins for the Gemini and Firestore backends"""
+
+import threading
+import time
+import uuid
+import zlib
+import random
+import copy
+from typing import Dict, Iterator, List, Optional
+
+_VOCABULARY = (
+    'the', 'query', 'table', 'index', 'rows', 'join', 'column', 'filter', 'select',
+    'database', 'schema', 'result', 'customers', 'orders', 'value', 'group', 'sort',
+    'primary', 'key', 'faster', 'scan', 'count', 'limit', 'where', 'and', 'with',
+)
+
+
+class _Chunk:
+    """Mimics a streamed Gemini response chunk"""
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeChatSession:
+    """Chat session that answers with seeded pseudo-text at a simulated rate"""
+
+    def __init__(self, model: 'FakeChatModel', history: Optional[List[Dict]] = None):
+        self._model = model
+        self.history = list(history or [])
+
+    def send_message(self, message, stream: bool = False):
+        text = message if isinstance(message, str) else str(message)
+        self.history.append({'role': 'user', 'parts': [text]})
+        chunks = self._model.render_reply(text)
+        if not stream:
+            # Notifications: answer in one piece after the first-token delay
+            time.sleep(self._model.first_token_latency)
+            reply = ''.join(chunks)
+            self.history.append({'role': 'model', 'parts': [reply]})
+            return _Chunk(reply)
+        return self._stream(chunks)
+
+    def _stream(self, chunks: List[str]) -> Iterator[_Chunk]:
+        model = self._model
+        time.sleep(model.first_token_latency)
+        emitted = []
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(model.chunk_tokens / model.tokens_per_second)
+            emitted.append(chunk)
+            yield _Chunk(chunk)
+        self.history.append({'role': 'model', 'parts': [''.join(emitted)]})
+
+
+class FakeChatModel:
+    """Token-stream simulator with the ``start_chat`` interface of a Gemini model.
+
+    Replies are a pure function of the prompt, so runs are reproducible.
+    """
+
+    def __init__(self, first_token_latency: float = 0.3, tokens_per_second: float = 50.0,
+                 response_tokens: int = 200, chunk_tokens: int = 8):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = max(tokens_per_second, 1e-3)
+        self.response_tokens = response_tokens
+        self.chunk_tokens = max(chunk_tokens, 1)
+
+    def start_chat(self, history=None) -> FakeChatSession:
+        return FakeChatSession(self, history)
+
+    def render_reply(self, prompt: str) -> List[str]:
+        rng = random.Random(zlib.crc32(prompt.encode('utf-8')))
+        tokens = [rng.choice(_VOCABULARY) for _ in range(self.response_tokens)]
+        table = rng.choice(('customers', 'orders', 'products'))
+        tokens += ['\n```sql\n', f'SELECT * FROM {table} LIMIT 10;', '\n```\n']
+        return [
+            ' '.join(tokens[i:i + self.chunk_tokens]) + ' '
+            for i in range(0, len(tokens), self.chunk_tokens)
+        ]
+
+
+class ArrayUnion:
+    """Emulator counterpart of ``firestore.ArrayUnion``"""
+    __slots__ = ('values',)
+
+    def __init__(self, values):
+        self.values = list(values)
+
+
+class _Snapshot:
+    def __init__(self, doc_id: str, data: Optional[Dict]):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class _DocumentReference:
+    def __init__(self, store: 'InMemoryFirestore', collection: str, doc_id: str):
+        self._store = store
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self) -> _Snapshot:
+        with self._store._lock:
+            return _Snapshot(self.id, copy.deepcopy(self._store._docs(self._collection).get(self.id)))
+
+    def set(self, data: Dict):
+        with self._store._lock:
+            self._store._docs(self._collection)[self.id] = copy.deepcopy(data)
+
+    def update(self, fields: Dict):
+        with self._store._lock:
+            doc = self._store._docs(self._collection).get(self.id)
+            if doc is None:
+                raise ValueError(f'No document to update: {self._collection}/{self.id}')
+            for key, value in fields.items():
+                # firestore.ArrayUnion exposes the values it appends as .values
+                if type(value).__name__ == 'ArrayUnion':
+                    current = doc.setdefault(key, [])
+                    current.extend(copy.deepcopy(v) for v in value.values if v not in current)
+                else:
+                    doc[key] = copy.deepcopy(value)
+
+    def delete(self):
+        with self._store._lock:
+            self._store._docs(self._collection).pop(self.id, None)
+
+
+class _Query:
+    _OPS = {
+        '==': lambda a, b: a == b,
+        '!=': lambda a, b: a != b,
+        '<': lambda a, b: a < b,
+        '<=': lambda a, b: a <= b,
+        '>': lambda a, b: a > b,
+        '>=': lambda a, b: a >= b,
+    }
+
+    def __init__(self, store: 'InMemoryFirestore', collection: str, filters=()):
+        self._store = store
+        self._collection = collection
+        self._filters = tuple(filters)
+
+    def where(self, field: str, op: str, value) -> '_Query':
+        return _Query(self._store, self._collection, self._filters + ((field, self._OPS[op], value),))
+
+    def get(self) -> List[_Snapshot]:
+        with self._store._lock:
+            docs = copy.deepcopy(list(self._store._docs(self._collection).items()))
+        return [
+            _Snapshot(doc_id, data) for doc_id, data in docs
+            if all(field in data and op(data[field], value) for field, op, value in self._filters)
+        ]
+
+    stream = get
+
+
+class _CollectionReference(_Query):
+    def document(self, doc_id: Optional[str] = None) -> _DocumentReference:
+        return _DocumentReference(self._store, self._collection, doc_id or uuid.uuid4().hex)
+
+
+class InMemoryFirestore:
+    """Thread-safe emulator for the subset of the Firestore client DB-Genie uses"""
+
+    def __init__(self):
+        self._collections: Dict[str, Dict[str, Dict]] = {}
+        self._lock = threading.RLock()
+
+    def collection(self, name: str) -> _CollectionReference:
+        return _CollectionReference(self, name)
+
+    def _docs(self, collection: str) -> Dict[str, Dict]:
+        return self._collections.setdefault(collection, {})
@@ -0,0 +1,161 @@
+"""Opt-in semantic cache for assistant answers to near-identical questions"""
+
+import hashlib
+import logging
+import re
+import time
+import zlib
+from typing import Iterator, List, Optional, Set
+from config import Config
+from services.cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_NAMESPACE = 'response_cache'
+
+# MinHash signature of _NUM_HASHES values, bucketed into _BANDS bands of
+# _ROWS_PER_BAND for locality-sensitive lookup
+_NUM_HASHES = 32
+_BANDS = 8
+_ROWS_PER_BAND = _NUM_HASHES // _BANDS
+_PRIME = (1 << 61) - 1
+_SEEDS = [((i * 0x9E3779B1 + 1) % _PRIME, (i * 0x85EBCA77 + 7) % _PRIME) for i in range(1, _NUM_HASHES + 1)]
+
+_STOPWORDS = frozenset((
+    'a', 'an', 'the', 'me', 'my', 'please', 'can', 'could', 'you', 'show', 'give', 'list', 'get',
+    'what', 'are', 'is', 'of', 'for', 'to', 'in', 'on', 'all', 'i', 'want', 'would', 'like',
+))
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+
+class _ReplayChunk:
+    """Streamed-chunk stand-in carrying a slice of a cached answer"""
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ResponseCache:
+    """Answers keyed by schema fingerprint plus a MinHash of the normalized prompt.
+
+    Entries live in the shared CacheService backend, so every worker reuses
+    them and the backend's TTL/LRU bounds their lifetime. Each band of a
+    prompt's signature indexes up to RESPONSE_CACHE_MAX_PER_BAND recent
+    entries; a lookup scores the candidates it finds there and accepts the
+    best one at or above RESPONSE_CACHE_THRESHOLD. Numbers must match
+    exactly, so "top 10" never replays an answer for "top 5".
+    """
+
+    @staticmethod
+    def enabled() -> bool:
+        return Config.RESPONSE_CACHE_ENABLED
+
+    @staticmethod
+    def scope() -> Optional[str]:
+        """Cache scope for the selected database, None when it cannot be fingerprinted"""
+        from database.connection import get_current_db_name, get_server_identity
+
+        server = get_server_identity()
+        db_name = get_current_db_name()
+        if not server or not db_name:
+            return None
+        try:
+            from database.schema_watcher import SchemaWatcher
+            return f"{server}|{db_name}|{SchemaWatcher.schema_fingerprint(db_name)}"
+        except Exception as e:
+            logger.debug(f"Response cache disabled for this request: {e}")
+            return None
+
+    @staticmethod
+    def _tokens(prompt: str) -> List[str]:
+        return [t for t in _TOKEN_RE.findall(prompt.lower()) if t not in _STOPWORDS]
+
+    @staticmethod
+    def _shingles(tokens: List[str]) -> Set[str]:
+        # Words plus adjacent pairs, so word order still counts for something
+        return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+    @staticmethod
+    def _signature(shingles: Set[str]) -> List[int]:
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles]
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in _SEEDS]
+
+    @staticmethod
+    def _band_keys(scope: str, signature: List[int]) -> List[str]:
+        keys = []
+        for band in range(_BANDS):
+            rows = signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND]
+            digest = hashlib.sha1(repr(rows).encode('utf-8')).hexdigest()[:16]
+            keys.append(f"{scope}|band{band}|{digest}")
+        return keys
+
+    @staticmethod
+    def lookup(scope: str, prompt: str) -> Optional[str]:
+        """Best cached answer for a similar prompt, or None"""
+        tokens = ResponseCache._tokens(prompt)
+        if not tokens:
+            return None
+        signature = ResponseCache._signature(ResponseCache._shingles(tokens))
+        numbers = sorted(t for t in tokens if t.isdigit())
+
+        candidates = set()
+        for band_key in ResponseCache._band_keys(scope, signature):
+            candidates.update(CacheService.get(RESPONSE_CACHE_NAMESPACE, band_key) or ())
+
+        best, best_score = None, Config.RESPONSE_CACHE_THRESHOLD
+        for entry_id in candidates:
+            entry = CacheService.get(RESPONSE_CACHE_NAMESPACE, f"{scope}|entry|{entry_id}")
+            if not entry or entry['numbers'] != numbers:
+                continue
+            score = sum(a == b for a, b in zip(signature, entry['signature'])) / _NUM_HASHES
+            if score >= best_score:
+                best, best_score = entry, score
+        if best is None:
+            return None
+        logger.info(f"Response cache hit (similarity {best_score:.2f}, cached {int(time.time() - best['created_at'])}s ago)")
+        return best['response']
+
+    @staticmethod
+    def store(scope: str, prompt: str, response: str):
+        tokens = ResponseCache._tokens(prompt)
+        if not tokens or not response.strip():
+            return
+        signature = ResponseCache._signature(ResponseCache._shingles(tokens))
+        entry_id = hashlib.sha1(' '.join(tokens).encode('utf-8')).hexdigest()[:20]
+        ttl = Config.RESPONSE_CACHE_TTL
+        CacheService.set(RESPONSE_CACHE_NAMESPACE, f"{scope}|entry|{entry_id}", {
+            'signature': signature,
+            'numbers': sorted(t for t in tokens if t.isdigit()),
+            'response': response,
+            'created_at': time.time(),
+        }, ttl=ttl)
+        for band_key in ResponseCache._band_keys(scope, signature):
+            # Most recent first; older ids beyond the cap are evicted from the band
+            ids = [i for i in CacheService.get(RESPONSE_CACHE_NAMESPACE, band_key) or () if i != entry_id]
+            CacheService.set(RESPONSE_CACHE_NAMESPACE, band_key,
+                             [entry_id] + ids[:Config.RESPONSE_CACHE_MAX_PER_BAND - 1], ttl=ttl)
+
+    @staticmethod
+    def replay(response: str) -> Iterator[_ReplayChunk]:
+        """Stream a cached answer in chunks, like a live response"""
+        size = max(Config.RESPONSE_CACHE_REPLAY_CHUNK_CHARS, 1)
+        for start in range(0, len(response), size):
+            yield _ReplayChunk(response[start:start + size])
+
+    @staticmethod
+    def record(scope: str, prompt: str, responses) -> Iterator:
+        """Pass a live stream through and cache it once it completes cleanly"""
+        parts = []
+        interrupted = False
+        for chunk in responses:
+            parts.append(getattr(chunk, 'text', '') or '')
+            interrupted = interrupted or getattr(chunk, 'interrupted', False)
+            yield chunk
+        if interrupted:
+            # A cut-short answer must not be replayed to similar prompts
+            return
+        try:
+            ResponseCache.store(scope, prompt, ''.join(parts))
+        except Exception as e:
+            logger.warning(f"Failed to cache response: {e}")
@@ -3,9 +3,8 @@ import {
   addMessage,
   addGenieResponseWithTypingEffect,
   appendGenieStreamChunk,
+  finishGenieStream,
 } from "./components/message-handler.js";
-import { wrapCodeBlocks } from "./components/code-blocks.js";
-import { markdownService } from "./services/markdown-service.js";
 
 // —————————————————————————————————————————————————————————
 // 1) handleAIResponse: Called when server returns { status, response }
@@ -58,6 +57,16 @@ export async function sendUserInput(elements) {
       body: JSON.stringify({ prompt, conversation_id: convId }),
     });
 
+    if (resp.status === 429) {
+      // Admission control: show the server's reason and when to retry
+      const data = await resp.json().catch(() => ({}));
+      const retryAfter = resp.headers.get("Retry-After");
+      handleError(elements, {
+        status: "error",
+        message: `${data.message || "Too many requests."}${retryAfter ? ` Retry in ${retryAfter}s.` : ""}`,
+      });
+      return;
+    }
     if (!resp.ok) {
       throw new Error(`HTTP error! status: ${resp.status}`);
     }
@@ -75,7 +84,6 @@ export async function sendUserInput(elements) {
 
     const reader = resp.body.getReader();
     const decoder = new TextDecoder("utf-8");
-    let fullResponse = "";
     let genieMessageElements = null; // To hold the elements for Genie's response
 
     while (true) {
@@ -83,7 +91,6 @@ export async function sendUserInput(elements) {
       if (done) break;
 
       const chunk = decoder.decode(value, { stream: true });
-      fullResponse += chunk;
 
       if (!genieMessageElements) {
         // Create the initial message element for Genie's response
@@ -100,16 +107,8 @@ export async function sendUserInput(elements) {
         detail: { conversation_id: dispatchedConvId, preview: prompt },
       })
     );
-    // After the stream is complete, process markdown and code blocks
-    if (genieMessageElements) {
-      const contentContainer =
-        genieMessageElements.textDiv.querySelector(".content-wrapper");
-      if (contentContainer) {
-        contentContainer.innerHTML =
-          markdownService.processFullMarkdown(fullResponse);
-        wrapCodeBlocks(contentContainer, elements);
-      }
-    }
+    // Blocks were rendered as they completed; flush the unfinished tail
+    finishGenieStream(genieMessageElements);
   } catch (error) {
     console.error("Streaming fetch error:", error);
     handleError(elements, {
@@ -2,7 +2,7 @@
 
 import { showNotification } from "./notifications.js";
 import { renderMermaid } from "./mermaid-helper.js";
-import { executeSqlString } from "../sql.js";
+import { executeSqlStatements } from "../sql.js";
 
 /**
  * Enhanced code block functionality without styling concerns.
@@ -190,7 +190,7 @@ function createRunButton(codeText, elements) {
     `;
 
     try {
-      await executeSqlString(elements, codeText);
+      await executeSqlStatements(elements, codeText);
     } finally {
       runBtn.classList.remove("code-block__button--loading");
       runBtn.innerHTML = `
@@ -210,8 +210,9 @@ function createRunButton(codeText, elements) {
  * Handle Mermaid diagram rendering
  */
 function handleMermaidDiagram(pre, codeText) {
-  // Skip if already processed
-  if (pre.parentNode.querySelector(".mermaid-diagram")) return;
+  // Skip if already processed (check this block's own container, not any
+  // diagram in the same message)
+  if (pre.previousElementSibling?.classList.contains("mermaid-diagram")) return;
 
   const diagramContainer = document.createElement("div");
   diagramContainer.className = "mermaid-diagram";
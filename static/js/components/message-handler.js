@@ -2,6 +2,7 @@
 import { markdownService } from "../services/markdown-service.js";
 import { optimizedTypeWriter, createThinkingAnimation } from "./typewriter.js";
 import { wrapCodeBlocks } from "./code-blocks.js";
+import { StreamingMarkdownRenderer } from "./stream-renderer.js";
 import { scrollToBottom } from "../utils/scroll-utils.js";
 
 /**
@@ -71,48 +72,24 @@ export function addMessage(elements, content, sender) {
 
 /**
  * Appends a chunk of streamed AI response to the message content.
- * Creates the contentWrapper if it doesn't exist.
+ * Creates the contentWrapper and its streaming renderer on the first chunk;
+ * rendering is incremental and batched per animation frame.
  */
 export function appendGenieStreamChunk(elements, genieMessageElements, chunk) {
-  const textDiv = genieMessageElements.textDiv;
-  let contentContainer = textDiv.querySelector(".content-wrapper");
-
-  if (!contentContainer) {
-    contentContainer = document.createElement("div");
+  if (!genieMessageElements.stream) {
+    const contentContainer = document.createElement("div");
     contentContainer.className = "content-wrapper";
-    textDiv.appendChild(contentContainer);
-  }
-
-  // Maintain a raw-text buffer on the container so we can incrementally
-  // process partial markdown without losing the original stream.
-  const prevRaw = contentContainer.getAttribute("data-raw") || "";
-  const newRaw = prevRaw + chunk;
-  contentContainer.setAttribute("data-raw", newRaw);
-
-  // Process the partial markdown into HTML and update the container.
-  // The markdownService handles sanitization and semantic class additions
-  // so code blocks / mermaid detection will work incrementally.
-  try {
-    const processed = markdownService.processPartialMarkdown(newRaw, null);
-    // Replace innerHTML with the processed partial HTML
-    contentContainer.innerHTML = processed;
-
-    // Ensure interactive features on code blocks are applied incrementally.
-    // wrapCodeBlocks is idempotent and will skip already-processed blocks.
-    requestAnimationFrame(() => {
-      try {
-        wrapCodeBlocks(contentContainer, elements);
-      } catch (e) {
-        console.debug?.("wrapCodeBlocks incremental error:", e);
-      }
-    });
-  } catch (e) {
-    // Fallback: append as plain text if partial parse fails.
-    contentContainer.textContent = newRaw;
-    console.debug?.("Partial render failed, falling back to text.", e);
+    genieMessageElements.textDiv.appendChild(contentContainer);
+    genieMessageElements.stream = new StreamingMarkdownRenderer(elements, contentContainer);
   }
+  genieMessageElements.stream.push(chunk);
+}
 
-  scrollToBottom(elements);
+/**
+ * Render whatever is still pending once the stream has ended.
+ */
+export function finishGenieStream(genieMessageElements) {
+  genieMessageElements?.stream?.finish();
 }
 
 /**
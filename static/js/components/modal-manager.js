@@ -5,8 +5,10 @@
  * Manages SQL query results display and data visualization preparation
  */
 
+import { VirtualGrid } from "./virtual-grid.js";
+
 let latestFields = [];
-let latestRows = [];
+let activeGrid = null;
 
 // Show query result modal
 export function showModal(elements) {
@@ -16,10 +18,35 @@ export function showModal(elements) {
 // Hide query result modal
 export function hideModal(elements) {
   elements.queryResultModal.classList.replace("flex", "hidden");
+  setResultChoices([]);
+  // Free the grid now: its resize listener would otherwise outlive the modal
+  if (activeGrid) {
+    activeGrid.destroy();
+    activeGrid = null;
+  }
+}
+
+// Statement picker for multi-statement runs; hidden for fewer than two choices
+export function setResultChoices(choices, selected, onPick) {
+  const picker = document.getElementById("query-result-picker");
+  if (!picker) return;
+  picker.replaceChildren(
+    ...choices.map(({ label, disabled }, i) => {
+      const option = new Option(label, String(i), false, i === selected);
+      option.disabled = Boolean(disabled);
+      return option;
+    })
+  );
+  picker.onchange = choices.length > 1 ? () => onPick(Number(picker.value)) : null;
+  picker.classList.toggle("hidden", choices.length < 2);
 }
 
 // Clear all rows from table
 export function clearTable(tableElem) {
+  if (activeGrid && activeGrid.table === tableElem) {
+    activeGrid.destroy();
+    activeGrid = null;
+  }
   while (tableElem.rows.length > 0) {
     tableElem.deleteRow(0);
   }
@@ -42,32 +69,19 @@ export function renderQueryResults(elements, fields, rows) {
     return;
   }
 
-  // Create table header
-  const headerRow = elements.queryResultTable.insertRow(-1);
-  fields.forEach((colName) => {
-    const th = document.createElement("th");
-    th.textContent = colName;
-    th.className = "px-2 py-1 text-center text-sm md:text-base";
-    headerRow.appendChild(th);
-  });
-
-  // Populate table rows
-  rows.forEach((rowVals) => {
-    const rowElem = elements.queryResultTable.insertRow(-1);
-    rowVals.forEach((cellVal) => {
-      const td = rowElem.insertCell(-1);
-      td.textContent = cellVal;
-      td.className = "px-2 py-1 text-center text-sm md:text-base";
-    });
-  });
+  // Only the visible window of rows is rendered; see virtual-grid.js
+  const table = elements.queryResultTable;
+  const viewport = table.closest(".overflow-auto") || table.parentElement;
+  activeGrid = new VirtualGrid(table, viewport, fields);
+  activeGrid.append(rows);
 
   setupShowVizButton(fields, rows);
+  return activeGrid;
 }
 
 // Setup visualization button for query results
 function setupShowVizButton(fields, rows) {
   latestFields = fields.slice();
-  latestRows = rows.map((r) => r.slice());
 
   const showVizBtn = document.getElementById("show-viz-btn");
   document.getElementById("show-viz-container").classList.remove("hidden");
@@ -79,7 +93,7 @@ function setupShowVizButton(fields, rows) {
   freshShowVizBtn.addEventListener("click", () => {
     try {
       sessionStorage.setItem("viz_fields", JSON.stringify(latestFields));
-      sessionStorage.setItem("viz_rows", JSON.stringify(latestRows));
+      sessionStorage.setItem("viz_rows", JSON.stringify(rows));
       // open the visualization tool in a new tab (root-relative)
       window.open("/static/visualize.html", "_blank");
     } catch (err) {
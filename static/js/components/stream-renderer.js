@@ -0,0 +1,158 @@
+// static/js/components/stream-renderer.js
+
+/**
+ * Streaming Markdown Renderer - Incremental rendering of a streamed AI answer
+ * The raw text is split into completed blocks and an open tail. Completed
+ * blocks are parsed once and appended to the DOM; only the tail is re-parsed,
+ * and at most once per animation frame however many chunks arrived. Mermaid
+ * diagrams render when their closing fence arrives, never from partial code.
+ */
+
+import { markdownService } from "../services/markdown-service.js";
+import { wrapCodeBlocks } from "./code-blocks.js";
+import { scrollToBottom } from "../utils/scroll-utils.js";
+
+const FENCE = /^(`{3,}|~{3,})\s*([\w-]*)/;
+const LIST_ITEM = /^([-*+]|\d+[.)])(\s|$)/;
+
+export class StreamingMarkdownRenderer {
+  /**
+   * @param {Object} elements - DOM references (for code block buttons and scrolling)
+   * @param {HTMLElement} container - The message's content wrapper
+   */
+  constructor(elements, container) {
+    this.elements = elements;
+    this.container = container;
+    this.text = "";
+    this.committed = 0; // End of the last block appended to the DOM
+    this.scanned = 0; // Start of the first line not yet scanned
+    this.fence = null; // { marker, info } while inside a top-level fenced block
+    this.afterBlank = false;
+    this.frame = null;
+    this.finished = false;
+
+    this.tail = document.createElement("div");
+    this.tail.className = "stream-tail";
+    this.tailCode = null; // Text node of an open fenced block, appended to in place
+    this.tailRendered = ""; // Tail source currently shown
+    this.container.appendChild(this.tail);
+  }
+
+  push(chunk) {
+    if (this.finished || !chunk) return;
+    this.text += chunk;
+    if (this.frame === null) {
+      this.frame = requestAnimationFrame(() => {
+        this.frame = null;
+        this.flush();
+      });
+    }
+  }
+
+  // Commit what's complete and redraw the tail; runs once per frame
+  flush() {
+    this._scan();
+    this._renderTail();
+    scrollToBottom(this.elements);
+  }
+
+  /** Render everything that is left and drop the tail; returns the full text */
+  finish() {
+    if (this.finished) return this.text;
+    if (this.frame !== null) cancelAnimationFrame(this.frame);
+    this.frame = null;
+    this._scan();
+    this._commit(this.text.length);
+    this.tail.remove();
+    this.finished = true;
+    markdownService.clearPartialCache();
+    scrollToBottom(this.elements);
+    return this.text;
+  }
+
+  // Find block boundaries in the newly completed lines
+  _scan() {
+    const text = this.text;
+    let newline;
+    while ((newline = text.indexOf("\n", this.scanned)) !== -1) {
+      const start = this.scanned;
+      const line = text.slice(start, newline);
+      this.scanned = newline + 1;
+
+      if (this.fence) {
+        const close = FENCE.exec(line);
+        if (close && !close[2] && close[1][0] === this.fence.marker[0] && close[1].length >= this.fence.marker.length) {
+          this.fence = null;
+          this._commit(this.scanned);
+        }
+        continue;
+      }
+
+      if (!line.trim()) {
+        this.afterBlank = true;
+        continue;
+      }
+
+      const open = FENCE.exec(line);
+      if (open) {
+        // An unindented fence always starts a new block
+        this._commit(start);
+        this.fence = { marker: open[1], info: open[2].toLowerCase() };
+      } else if (this.afterBlank && !/^\s/.test(line) && !LIST_ITEM.test(line)) {
+        // New top-level block; list items and indented lines may continue a list
+        this._commit(start);
+      }
+      this.afterBlank = false;
+    }
+  }
+
+  // Parse text[committed:end] once and append it before the tail
+  _commit(end) {
+    const source = this.text.slice(this.committed, end);
+    this.committed = end;
+    if (!source.trim()) return;
+
+    const staging = document.createElement("div");
+    staging.innerHTML = markdownService.processFullMarkdown(source);
+    // Highlighting, buttons and Mermaid rendering, once per completed block
+    if (staging.querySelector("pre")) wrapCodeBlocks(staging, this.elements);
+    const nodes = document.createDocumentFragment();
+    while (staging.firstChild) nodes.appendChild(staging.firstChild);
+    this.container.insertBefore(nodes, this.tail);
+
+    this.tail.replaceChildren();
+    this.tailCode = null;
+    this.tailRendered = "";
+  }
+
+  _renderTail() {
+    const tail = this.text.slice(this.committed);
+    if (tail === this.tailRendered) return;
+
+    if (this.fence) {
+      const body = tail.slice(tail.indexOf("\n") + 1);
+      if (this.fence.info === "mermaid" || markdownService.isMermaidContent(body)) {
+        // Partial diagram source is not shown; it renders once the fence closes
+        if (!this.tail.querySelector(".mermaid-diagram")) {
+          this.tail.innerHTML = '<div class="mermaid-diagram">Drawing diagram…</div>';
+          this.tailCode = null;
+        }
+      } else if (this.tailCode && tail.startsWith(this.tailRendered)) {
+        // Still in the same code block: append only the new characters
+        this.tailCode.appendData(tail.slice(this.tailRendered.length));
+      } else {
+        const pre = document.createElement("pre");
+        const code = document.createElement("code");
+        code.className = "hljs";
+        this.tailCode = document.createTextNode(body);
+        code.appendChild(this.tailCode);
+        pre.appendChild(code);
+        this.tail.replaceChildren(pre);
+      }
+    } else {
+      this.tailCode = null;
+      this.tail.innerHTML = markdownService.processPartialMarkdown(tail, null);
+    }
+    this.tailRendered = tail;
+  }
+}
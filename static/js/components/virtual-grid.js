@@ -0,0 +1,292 @@
+// static/js/components/virtual-grid.js
+
+/**
+ * Virtual Grid - Windowed rendering of large query results
+ * Rows live in a columnar buffer; only the rows inside the scroll viewport
+ * (plus a small overscan) exist in the DOM, and those <tr> elements are
+ * reused while scrolling, so the node count stays constant.
+ */
+
+const CELL_CLASS = "px-2 py-1 text-center text-sm md:text-base";
+const DEFAULT_ROW_HEIGHT = 32; // px, replaced by the measured height of the first row
+const OVERSCAN = 8; // Extra rows rendered above and below the viewport
+const WIDTH_SAMPLE = 1000; // Rows sampled to size columns (stops widths jumping on scroll)
+const MAX_COLUMN_CH = 40;
+
+const NUMERIC = /^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$/;
+const collator = new Intl.Collator(undefined, { numeric: true, sensitivity: "base" });
+
+// ============================
+// Columnar buffer
+// ============================
+
+/**
+ * Column-major storage with typed sort keys.
+ * Every column keeps its raw values (for display); columns whose values are
+ * all numbers (or numeric strings, e.g. DECIMAL) also keep a Float64Array of
+ * keys, with NaN for NULL. A single non-numeric value drops the keys.
+ */
+export class ColumnarBuffer {
+  constructor(fields) {
+    this.fields = fields.slice();
+    this.length = 0;
+    this.columns = fields.map(() => ({ values: [], keys: new Float64Array(1024), numeric: true }));
+  }
+
+  append(rows) {
+    this.columns.forEach((column, c) => {
+      let keys = column.keys;
+      if (column.numeric && keys.length < this.length + rows.length) {
+        keys = new Float64Array(Math.max(keys.length * 2, this.length + rows.length));
+        keys.set(column.keys.subarray(0, this.length));
+        column.keys = keys;
+      }
+      for (let r = 0; r < rows.length; r++) {
+        const value = rows[r][c];
+        column.values.push(value);
+        if (!column.numeric) continue;
+        if (value === null || value === undefined) {
+          keys[this.length + r] = NaN;
+        } else if (typeof value === "number") {
+          keys[this.length + r] = value;
+        } else if (typeof value === "string" && NUMERIC.test(value.trim())) {
+          keys[this.length + r] = Number(value);
+        } else {
+          column.numeric = false;
+          column.keys = null;
+        }
+      }
+    });
+    this.length += rows.length;
+  }
+
+  value(row, col) {
+    return this.columns[col].values[row];
+  }
+
+  /**
+   * Row order for a column: a Uint32Array permutation of row indexes.
+   * Numeric columns compare Float64Array keys; NULLs always sort last.
+   */
+  sortedOrder(col, descending) {
+    const order = new Uint32Array(this.length);
+    for (let i = 0; i < order.length; i++) order[i] = i;
+    const column = this.columns[col];
+    const sign = descending ? -1 : 1;
+
+    if (column.numeric) {
+      const keys = column.keys;
+      order.sort((a, b) => {
+        const x = keys[a];
+        const y = keys[b];
+        if (x !== x) return y !== y ? a - b : 1;
+        if (y !== y) return -1;
+        return (x - y) * sign || a - b;
+      });
+      return order;
+    }
+
+    const values = column.values;
+    order.sort((a, b) => {
+      const x = values[a];
+      const y = values[b];
+      if (x === null || x === undefined) return y === null || y === undefined ? a - b : 1;
+      if (y === null || y === undefined) return -1;
+      return collator.compare(String(x), String(y)) * sign || a - b;
+    });
+    return order;
+  }
+}
+
+// ============================
+// Windowed grid
+// ============================
+
+export class VirtualGrid {
+  /**
+   * @param {HTMLTableElement} table - Table to render into (its rows are replaced)
+   * @param {HTMLElement} viewport - Scrolling ancestor of the table
+   */
+  constructor(table, viewport, fields) {
+    this.table = table;
+    this.viewport = viewport;
+    this.buffer = new ColumnarBuffer(fields);
+    this.order = null; // Uint32Array permutation while sorted
+    this.sort = null; // { col, descending }
+    this.rowHeight = DEFAULT_ROW_HEIGHT;
+    this.measured = false;
+    this.frame = null;
+    this.pool = [];
+    this.headers = [];
+    this.columnWidths = fields.map((name) => String(name).length);
+
+    this._onScroll = () => this.scheduleRender();
+    this._build();
+    this.viewport.addEventListener("scroll", this._onScroll, { passive: true });
+    window.addEventListener("resize", this._onScroll);
+  }
+
+  _build() {
+    const { table, buffer } = this;
+    table.replaceChildren();
+
+    const thead = table.createTHead();
+    const headerRow = thead.insertRow(-1);
+    buffer.fields.forEach((name, col) => {
+      const th = document.createElement("th");
+      th.textContent = name;
+      th.className = `${CELL_CLASS} cursor-pointer select-none`;
+      th.style.whiteSpace = "nowrap";
+      th.title = "Sort";
+      th.addEventListener("click", () => this.toggleSort(col));
+      headerRow.appendChild(th);
+      this.headers.push(th);
+    });
+
+    this.body = table.createTBody();
+    // Spacers stand in for the rows above and below the rendered window
+    this.topSpacer = this._spacer();
+    this.bottomSpacer = this._spacer();
+    this.body.append(this.topSpacer, this.bottomSpacer);
+  }
+
+  _spacer() {
+    const tr = document.createElement("tr");
+    tr.setAttribute("aria-hidden", "true");
+    const td = tr.insertCell(-1);
+    td.colSpan = Math.max(1, this.buffer.fields.length);
+    td.style.padding = "0";
+    td.style.border = "0";
+    td.style.height = "0px";
+    return tr;
+  }
+
+  _rowElement() {
+    const tr = document.createElement("tr");
+    tr.style.height = `${this.rowHeight}px`;
+    for (let c = 0; c < this.buffer.fields.length; c++) {
+      const td = tr.insertCell(-1);
+      td.className = CELL_CLASS;
+      td.style.whiteSpace = "nowrap";
+      td.style.overflow = "hidden";
+      td.style.textOverflow = "ellipsis";
+      td.style.maxWidth = `${MAX_COLUMN_CH + 2}ch`;
+    }
+    return tr;
+  }
+
+  append(rows) {
+    if (!rows || rows.length === 0) return;
+    const start = this.buffer.length;
+    this.buffer.append(rows);
+    this._widen(start);
+    if (this.sort) {
+      this.order = this.buffer.sortedOrder(this.sort.col, this.sort.descending);
+    }
+    this.scheduleRender();
+  }
+
+  // Size columns from the first rows once, so recycled rows don't reflow the table
+  _widen(start) {
+    if (start >= WIDTH_SAMPLE) return;
+    const end = Math.min(this.buffer.length, WIDTH_SAMPLE);
+    for (let c = 0; c < this.columnWidths.length; c++) {
+      let width = this.columnWidths[c];
+      for (let r = start; r < end; r++) {
+        const value = this.buffer.value(r, c);
+        if (value !== null && value !== undefined) width = Math.max(width, String(value).length);
+      }
+      this.columnWidths[c] = width;
+      this.headers[c].style.minWidth = `${Math.min(width, MAX_COLUMN_CH) + 2}ch`;
+    }
+  }
+
+  toggleSort(col) {
+    if (!this.sort || this.sort.col !== col) {
+      this.sort = { col, descending: false };
+    } else if (!this.sort.descending) {
+      this.sort.descending = true;
+    } else {
+      this.sort = null;
+    }
+    this.order = this.sort ? this.buffer.sortedOrder(col, this.sort.descending) : null;
+
+    this.headers.forEach((th, i) => {
+      const name = this.buffer.fields[i];
+      const active = this.sort && this.sort.col === i;
+      th.textContent = active ? `${name} ${this.sort.descending ? "▼" : "▲"}` : name;
+      th.setAttribute("aria-sort", active ? (this.sort.descending ? "descending" : "ascending") : "none");
+    });
+    this.viewport.scrollTop = 0;
+    this.scheduleRender();
+  }
+
+  // Coalesce scroll, resize and append bursts into one render per frame
+  scheduleRender() {
+    if (this.frame !== null) return;
+    this.frame = requestAnimationFrame(() => {
+      this.frame = null;
+      this.render();
+    });
+  }
+
+  render() {
+    const total = this.buffer.length;
+    // Offset of the first data row inside the scrolled content
+    const bodyTop =
+      this.body.getBoundingClientRect().top - this.viewport.getBoundingClientRect().top + this.viewport.scrollTop;
+    const scrollTop = Math.max(0, this.viewport.scrollTop - bodyTop);
+    const visible = Math.ceil(this.viewport.clientHeight / this.rowHeight) + OVERSCAN * 2;
+
+    const first = Math.max(0, Math.min(Math.floor(scrollTop / this.rowHeight) - OVERSCAN, total - visible));
+    const count = Math.min(visible, total);
+
+    // Grow the pool to fit the viewport; it never grows with the data
+    while (this.pool.length < count) {
+      const tr = this._rowElement();
+      this.body.insertBefore(tr, this.bottomSpacer);
+      this.pool.push(tr);
+    }
+
+    const columns = this.buffer.columns;
+    for (let i = 0; i < this.pool.length; i++) {
+      const tr = this.pool[i];
+      if (i >= count) {
+        tr.style.display = "none";
+        continue;
+      }
+      tr.style.display = "";
+      const index = first + i;
+      const row = this.order ? this.order[index] : index;
+      const cells = tr.cells;
+      for (let c = 0; c < cells.length; c++) {
+        const value = columns[c].values[row];
+        const text = value === null || value === undefined ? "" : String(value);
+        if (cells[c].textContent !== text) {
+          cells[c].textContent = text;
+          cells[c].title = text.length > MAX_COLUMN_CH ? text : "";
+        }
+      }
+    }
+
+    this.topSpacer.cells[0].style.height = `${Math.max(0, first) * this.rowHeight}px`;
+    this.bottomSpacer.cells[0].style.height = `${Math.max(0, total - first - count) * this.rowHeight}px`;
+
+    if (!this.measured && count > 0) {
+      const height = this.pool[0].getBoundingClientRect().height;
+      this.measured = true;
+      if (height > 0 && Math.abs(height - this.rowHeight) > 0.5) {
+        this.rowHeight = height;
+        this.pool.forEach((tr) => (tr.style.height = `${height}px`));
+        this.scheduleRender();
+      }
+    }
+  }
+
+  destroy() {
+    if (this.frame !== null) cancelAnimationFrame(this.frame);
+    this.frame = null;
+    this.viewport.removeEventListener("scroll", this._onScroll);
+    window.removeEventListener("resize", this._onScroll);
+  }
+}
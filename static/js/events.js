@@ -1,11 +1,12 @@
 // static/js/events.js
 
-import { handleConnectDb, executeSqlString } from "./sql.js";
+import { handleConnectDb, executeSqlStatements } from "./sql.js";
 import {
   addMessage,
   wrapCodeBlocks,
   scrollToBottom,
   showNotification,
+  hideModal,
 } from "./ui.js";
 import { sendUserInput } from "./chat.js";
 
@@ -628,7 +629,7 @@ const setupSqlQueryExecution = (elements) => {
     const orig = elements.setButtonLoading ? elements.setButtonLoading(elements.executeQueryButton) : null;
 
     try {
-      await executeSqlString(elements, sqlQ);
+      await executeSqlStatements(elements, sqlQ);
     } finally {
       if (elements.clearButtonLoading) {
         elements.clearButtonLoading(elements.executeQueryButton, orig);
@@ -640,14 +641,10 @@ const setupSqlQueryExecution = (elements) => {
   });
 
   // Close query result modal
-  elements.closeBtn.addEventListener("click", () => {
-    elements.queryResultModal.classList.replace("flex", "hidden");
-  });
+  elements.closeBtn.addEventListener("click", () => hideModal(elements));
 
   window.addEventListener("click", (ev) => {
-    if (ev.target === elements.queryResultModal) {
-      elements.queryResultModal.classList.replace("flex", "hidden");
-    }
+    if (ev.target === elements.queryResultModal) hideModal(elements);
   });
 };
 
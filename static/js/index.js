@@ -227,6 +227,81 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   });
 
+  // Live status: poll the server's snapshot, or subscribe to pushes when enabled
+  subscribeToDbStatus();
+
   // d) Initialize the application
   initializeApp(elements);
 });
+
+// 8) Follow connection status. /db_status is a cached snapshot (it never
+//    reaches MySQL), so polling is cheap; the SSE stream is used only when
+//    the server enables it, since each open stream holds a server thread.
+async function subscribeToDbStatus() {
+  let info = {};
+  try {
+    info = await (await fetch("/db_status")).json();
+  } catch {
+    // Fall through to polling with the default interval
+  }
+
+  if (info.stream && typeof window.EventSource === "function") {
+    const source = new EventSource("/db_status_stream");
+    source.onmessage = (event) => {
+      try {
+        applyDbStatus(JSON.parse(event.data));
+      } catch {
+        // Ignore malformed events
+      }
+    };
+    return;
+  }
+
+  const interval = Math.max(5, Number(info.poll_interval) || 15) * 1000;
+  setInterval(async () => {
+    if (document.hidden) return;
+    try {
+      const status = await (await fetch("/db_status")).json();
+      if (status.status === "ok") applyDbStatus(status);
+    } catch {
+      // Transient network error; try again next interval
+    }
+  }, interval);
+}
+
+// Only touches the DOM when connectivity or the database list changed.
+function applyDbStatus(status) {
+  const connected = Boolean(status.connected);
+  const dropdown = elements.databasesDropdown;
+
+  if (connected && Array.isArray(status.databases) && status.databases.length > 0) {
+    const shown = Array.from(dropdown.options).map((o) => o.value).filter(Boolean);
+    const changed =
+      shown.length !== status.databases.length ||
+      shown.some((db, i) => db !== status.databases[i]);
+    if (changed) {
+      const selected = dropdown.value || status.current_database || "";
+      const frag = document.createDocumentFragment();
+      const placeholderOpt = document.createElement("option");
+      placeholderOpt.value = "";
+      placeholderOpt.textContent = "Select database...";
+      frag.appendChild(placeholderOpt);
+      status.databases.forEach((db) => {
+        const opt = document.createElement("option");
+        opt.value = db;
+        opt.textContent = db;
+        opt.selected = db === selected;
+        frag.appendChild(opt);
+      });
+      dropdown.replaceChildren(frag);
+    }
+  }
+
+  if (connected !== Boolean(elements.serverConnected)) {
+    elements.serverConnected = connected;
+    if (!connected) dropdown.innerHTML = "";
+    if (typeof window.updateConnectionStatus === "function") {
+      window.updateConnectionStatus(connected, status.current_database || "");
+    }
+  }
+}
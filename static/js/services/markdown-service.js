@@ -196,6 +196,11 @@ class MarkdownService {
     });
   }
 
+  // Used while streaming, before a fenced block has been closed
+  isMermaidContent(code) {
+    return this._isMermaidContent(code);
+  }
+
   _extractLanguage(className) {
     const match = className.match(/language-(\w+)/);
     return match ? match[1] : "";
@@ -1,6 +1,11 @@
 // static/js/sql.js
 
-import { showNotification, renderQueryResults, clearTable } from "./ui.js";
+import {
+  showNotification,
+  renderQueryResults,
+  clearTable,
+  setResultChoices,
+} from "./ui.js";
 
 // —————————————————————————————————————————————————————————
 // 1) fetchDatabases: Populate the <select id="databases"> on load
@@ -73,7 +78,7 @@ export async function handleConnectDb(elements) {
 }
 
 // —————————————————————————————————————————————————————————
-// 3) executeSqlString: Called both from “Run” buttons and “Execute” editor
+// 3) executeSqlString: Run the text as one query (see executeSqlStatements)
 // —————————————————————————————————————————————————————————
 export async function executeSqlString(elements, sqlText) {
   // Prevent executing queries if server is not connected
@@ -103,3 +108,127 @@ export async function executeSqlString(elements, sqlText) {
     showNotification(elements, "Failed to execute query", "error");
   }
 }
+
+// —————————————————————————————————————————————————————————
+// 4) executeSqlBatch: Run independent SELECTs concurrently; onResult is
+//    called once per statement, in completion order, with { index, ...result }
+// —————————————————————————————————————————————————————————
+export async function executeSqlBatch(elements, sqlTexts, onResult) {
+  if (!elements?.serverConnected) {
+    showNotification(elements, 'Not connected to any database server', 'error');
+    return;
+  }
+  try {
+    const resp = await fetch("/run_sql_queries", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ sql_queries: sqlTexts }),
+    });
+    if (!resp.ok || !resp.body) {
+      const data = await resp.json().catch(() => ({}));
+      showNotification(elements, data.message || "Failed to execute queries", "error");
+      return;
+    }
+
+    const reader = resp.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let newline;
+      while ((newline = buffer.indexOf("\n")) !== -1) {
+        const line = buffer.slice(0, newline);
+        buffer = buffer.slice(newline + 1);
+        if (line.trim()) onResult(JSON.parse(line));
+      }
+    }
+  } catch {
+    showNotification(elements, "Failed to execute queries", "error");
+  }
+}
+
+// —————————————————————————————————————————————————————————
+// 5) executeSqlStatements: Entry point for “Run” and “Execute”; several
+//    SELECTs go through executeSqlBatch, anything else runs as one query.
+//    Batch results are not kept in the workspace and never use prefetches.
+// —————————————————————————————————————————————————————————
+// Same rule as the server's SELECT check (DatabaseSecurity._QUERY_TYPE_PATTERNS)
+const SELECT_START = /^\s*SELECT\b/i;
+
+export async function executeSqlStatements(elements, sqlText) {
+  // Leading comments are dropped so the server sees the SELECT first
+  const statements = splitSqlStatements(sqlText).map(stripLeadingComments);
+  if (statements.length < 2 || !statements.every((s) => SELECT_START.test(s))) {
+    return executeSqlString(elements, sqlText);
+  }
+
+  const results = new Array(statements.length);
+  let shown = null;
+  const labels = statements.map((s, i) => `#${i + 1} ${s.replace(/\s+/g, " ").slice(0, 60)}`);
+  const show = (index) => {
+    shown = index;
+    const result = results[index];
+    if (result.status === "success" && result.result) {
+      renderQueryResults(elements, result.result.fields, result.result.rows);
+    } else {
+      renderQueryResults(elements, [], []);
+      showNotification(elements, result.message, "error");
+    }
+    refreshChoices();
+  };
+  // Statements still running are listed but cannot be picked yet
+  const refreshChoices = () =>
+    setResultChoices(
+      labels.map((label, i) => ({ label, disabled: !results[i] })),
+      shown,
+      show
+    );
+
+  await executeSqlBatch(elements, statements, (result) => {
+    results[result.index] = result;
+    // Open the modal on the first success; the picker switches between the rest
+    if (shown === null && result.status === "success") show(result.index);
+    else if (shown !== null) refreshChoices();
+  });
+
+  const received = results.filter(Boolean);
+  if (received.length === 0) return;
+  const failed = received.filter((r) => r.status !== "success").length;
+  if (shown === null) show(results.findIndex(Boolean));
+  showNotification(
+    elements,
+    `${received.length - failed} of ${statements.length} queries succeeded`,
+    failed ? "warning" : "success"
+  );
+}
+
+// Split on semicolons outside quotes and comments; empty statements are dropped
+function splitSqlStatements(sqlText) {
+  const statements = [];
+  let start = 0;
+  let i = 0;
+  while (i < sqlText.length) {
+    const ch = sqlText[i];
+    if (ch === "'" || ch === '"' || ch === "`") {
+      i++;
+      while (i < sqlText.length && sqlText[i] !== ch) i += sqlText[i] === "\\" ? 2 : 1;
+    } else if ((ch === "-" && sqlText[i + 1] === "-") || ch === "#") {
+      while (i < sqlText.length && sqlText[i] !== "\n") i++;
+    } else if (ch === "/" && sqlText[i + 1] === "*") {
+      const end = sqlText.indexOf("*/", i + 2);
+      i = end === -1 ? sqlText.length : end + 1;
+    } else if (ch === ";") {
+      statements.push(sqlText.slice(start, i));
+      start = i + 1;
+    }
+    i++;
+  }
+  statements.push(sqlText.slice(start));
+  return statements.filter((s) => stripLeadingComments(s) !== "");
+}
+
+function stripLeadingComments(statement) {
+  return statement.replace(/^(\s+|--[^\n]*(\n|$)|#[^\n]*(\n|$)|\/\*[\s\S]*?\*\/)*/, "").trim();
+}
@@ -15,6 +15,7 @@ import {
   hideModal,
   clearTable,
   renderQueryResults,
+  setResultChoices,
 } from "./components/modal-manager.js";
 import {
   showNotification,
@@ -46,6 +47,7 @@ export {
   hideModal,
   clearTable,
   renderQueryResults,
+  setResultChoices,
 
   // Notifications
   showNotification,
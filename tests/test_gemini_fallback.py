@@ -0,0 +1,82 @@
+"""Failover to GEMINI_FALLBACK_MODEL and back, with the simulated LLM"""
+
+import os
+import time
+
+# Config refuses to load without a secret key; keep the LLM local
+os.environ.setdefault('SECRET_KEY', 'test-only-secret')
+os.environ['LLM_BACKEND'] = 'fake'
+
+import pytest
+
+from config import Config
+from services import gemini_service
+from services.gemini_service import GeminiService
+from services.local_backends import FakeChatModel, FakeChatSession
+
+
+class _Unavailable(Exception):
+    code = 503
+
+
+class _RecordingSession(FakeChatSession):
+    def send_message(self, message, stream=False):
+        self._model.prompts.append(message)
+        if self._model.down:
+            raise _Unavailable('model unavailable')
+        return super().send_message(message, stream=stream)
+
+
+class _RecordingModel(FakeChatModel):
+    def __init__(self):
+        super().__init__(first_token_latency=0, tokens_per_second=1e6, response_tokens=16)
+        self.prompts = []
+        self.down = False
+
+    def start_chat(self, history=None):
+        return _RecordingSession(self, history)
+
+
+@pytest.fixture
+def models(monkeypatch):
+    primary, fallback = _RecordingModel(), _RecordingModel()
+    monkeypatch.setattr(Config, 'GEMINI_FALLBACK_MODEL', 'models/fallback')
+    monkeypatch.setattr(Config, 'LLM_RETRY_ATTEMPTS', 2)
+    monkeypatch.setattr(Config, 'LLM_RETRY_BASE_DELAY', 0)
+    monkeypatch.setattr(Config, 'LLM_BREAKER_FAILURES', 1)
+    monkeypatch.setattr(Config, 'LLM_BREAKER_RESET_SECONDS', 0.05)
+    monkeypatch.setattr(Config, 'RESPONSE_CACHE_ENABLED', False)
+    monkeypatch.setattr(GeminiService, 'ENABLE_CONTEXT_ENHANCEMENT', False)
+    monkeypatch.setattr(GeminiService, 'get_fallback_model', staticmethod(lambda: fallback))
+    monkeypatch.setattr(gemini_service, '_breakers', {})
+    GeminiService.set_model(primary)
+    yield primary, fallback
+    GeminiService.set_model(None)
+
+
+def _ask(conversation_id, message):
+    return ''.join(chunk.text for chunk in GeminiService.send_message(conversation_id, message))
+
+
+def test_conversation_returns_to_primary_after_recovery(models):
+    primary, fallback = models
+    breaker = GeminiService._breaker(GeminiService.MODEL_NAME)
+
+    primary.down = True
+    first = _ask('conv-1', 'list the largest tables')
+    assert first
+    assert primary.prompts == ['list the largest tables']
+    assert fallback.prompts == ['list the largest tables']
+    assert breaker.state == breaker.OPEN
+
+    primary.down = False
+    time.sleep(Config.LLM_BREAKER_RESET_SECONDS)
+    assert _ask('conv-1', 'which of them has no index')
+
+    # The second message reached the primary, on a session carrying the first exchange
+    assert primary.prompts[-1] == 'which of them has no index'
+    assert fallback.prompts == ['list the largest tables']
+    assert breaker.state == breaker.CLOSED
+    history = gemini_service.chat_sessions['conv-1'].history
+    assert {'role': 'model', 'parts': [first]} in history
+    assert gemini_service._session_models['conv-1'] == GeminiService.MODEL_NAME